@@ -0,0 +1,87 @@
+"""
+Compare two benchmark result files written by benchmarks/run.py:
+
+    python -m benchmarks.compare before.json after.json --threshold 10
+
+Prints the change of every metric per benchmark and exits with status 1 when
+the best time or the peak memory of a benchmark grew by more than threshold
+percent.
+"""
+import argparse
+import json
+import sys
+
+# (metric, label, True when lower is better)
+METRICS = [
+    ("seconds", "time", True),
+    ("best_seconds", "best time", True),
+    ("records_per_second", "throughput", False),
+    ("first_record_seconds", "first record", True),
+    ("peak_memory_bytes", "peak memory", True),
+]
+# The best time is the least noisy one between runs
+GATED = ("best_seconds", "peak_memory_bytes")
+
+
+def change(before: float, after: float) -> float:
+    if not before or after is None:
+        return None
+    return (after - before) / before * 100
+
+
+def compare(before: dict, after: dict, threshold: float) -> list:
+    """
+    Returns (benchmark, label, before, after, change, regressed) rows for the
+    benchmarks present in both results.
+    """
+    rows = []
+    for name, old in before["results"].items():
+        new = after["results"].get(name)
+        if new is None:
+            continue
+        for metric, label, lower in METRICS:
+            pct = change(old.get(metric), new.get(metric))
+            worse = pct is not None and (pct if lower else -pct) > threshold
+            regressed = worse and metric in GATED
+            rows.append((name, label, old.get(metric), new.get(metric), pct, regressed))
+    return rows
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument(
+        "--threshold", type=float, default=10.0, help="allowed regression in percent"
+    )
+    args = parser.parse_args(argv)
+
+    with open(args.before, encoding="utf-8") as f:
+        before = json.load(f)
+    with open(args.after, encoding="utf-8") as f:
+        after = json.load(f)
+
+    print(f"before: {before['meta'].get('commit')}")
+    print(f"after:  {after['meta'].get('commit')}")
+    if before["meta"].get("dataset") != after["meta"].get("dataset"):
+        print("warning: the results were measured on different datasets")
+
+    regressions = 0
+    for name, label, old, new, pct, regressed in compare(
+        before, after, args.threshold
+    ):
+        regressions += regressed
+        pct = "n/a" if pct is None else f"{pct:+.1f}%"
+        flag = "  REGRESSION" if regressed else ""
+        print(
+            f"{name:32} {label:14} {old or 0:>14.4f} {new or 0:>14.4f} {pct:>9}{flag}"
+        )
+
+    skipped = set(before["results"]) ^ set(after["results"])
+    if skipped:
+        print(f"only in one result: {', '.join(sorted(skipped))}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
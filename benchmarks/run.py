@@ -0,0 +1,286 @@
+"""
+Run the benchmarks against a local mock Pax8 API and write the results as
+JSON, e.g. to compare two commits with benchmarks/compare.py:
+
+    python -m benchmarks.run --output before.json
+    python -m benchmarks.run --invoice-items 50000 --latency 0.02 -o after.json
+
+Every benchmark reports its records, the median and best wall time over the
+repeats, the throughput, the time to the first record and the peak memory
+traced by tracemalloc during one extra run.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "src"))
+
+# pylint: disable=wrong-import-position
+from pax8 import Pax8Client
+from pax8 import filters as fi
+from pax8 import types as t
+from pax8.codec import get_codec
+from benchmarks.server import Dataset, MockPax8Server
+
+PAGE = 200
+
+
+class Context:
+    def __init__(self, client: Pax8Client, server: MockPax8Server, parallel: int):
+        self.client = client
+        self.server = server
+        self.dataset = server.dataset
+        self.parallel = parallel
+        self.__pages = None
+        self.__items = None
+
+    @property
+    def invoice_item_pages(self) -> list:
+        if self.__pages is None:
+            items = self.dataset.invoice_items
+            self.__pages = [
+                json.dumps({"content": items[i : i + PAGE]}).encode("utf-8")
+                for i in range(0, len(items), PAGE)
+            ]
+        return self.__pages
+
+    @property
+    def invoice_items(self) -> list:
+        if self.__items is None:
+            self.__items = t.InvoiceItem.objectify_many(self.dataset.invoice_items)
+        return self.__items
+
+
+BENCHMARKS: Dict[str, Callable[[Context], Iterable]] = {}
+
+
+def benchmark(name: str):
+    def register(fn: Callable[[Context], Iterable]):
+        BENCHMARKS[name] = fn
+        return fn
+
+    return register
+
+
+@benchmark("companies.list")
+def companies_list(ctx: Context):
+    return ctx.client.Company.list(fi.CompanyFilter(size=PAGE), iterate=True)
+
+
+@benchmark("companies.list.parallel")
+def companies_list_parallel(ctx: Context):
+    return ctx.client.Company.list(
+        fi.CompanyFilter(size=PAGE), parallel=ctx.parallel, ordered=False
+    )
+
+
+@benchmark("companies.list.stream")
+def companies_list_stream(ctx: Context):
+    return ctx.client.Company.list(fi.CompanyFilter(size=PAGE), stream=True)
+
+
+@benchmark("subscriptions.list")
+def subscriptions_list(ctx: Context):
+    return ctx.client.Subscription.list(fi.SubscriptionFilter(size=PAGE), iterate=True)
+
+
+@benchmark("invoice_items.list")
+def invoice_items_list(ctx: Context):
+    return ctx.client.Invoice.list_items(
+        "inv-0000", fi.InvoiceItemFilter(size=PAGE), iterate=True
+    )
+
+
+@benchmark("invoice_items.list.stream")
+def invoice_items_list_stream(ctx: Context):
+    return ctx.client.Invoice.list_items(
+        "inv-0000", fi.InvoiceItemFilter(size=PAGE), stream=True
+    )
+
+
+@benchmark("invoice_items.list.columnar")
+def invoice_items_list_columnar(ctx: Context):
+    batch = ctx.client.Invoice.list_items(
+        "inv-0000", fi.InvoiceItemFilter(size=PAGE), columnar=True
+    )
+    return range(len(batch))
+
+
+@benchmark("usage_lines.list")
+def usage_lines_list(ctx: Context):
+    return ctx.client.UsageSummary.list_usage_lines(
+        "us-0000", fi.UsageSummaryLineFilter(size=PAGE), iterate=True
+    )
+
+
+@benchmark("invoice_items.decode")
+def invoice_items_decode(ctx: Context):
+    loads = ctx.client.conn.codec.loads
+    return (item for page in ctx.invoice_item_pages for item in loads(page)["content"])
+
+
+@benchmark("invoice_items.objectify")
+def invoice_items_objectify(ctx: Context):
+    return t.InvoiceItem.objectify_many(ctx.dataset.invoice_items)
+
+
+@benchmark("invoice_items.serialize")
+def invoice_items_serialize(ctx: Context):
+    t.Pax8Resource.serialize_many(ctx.invoice_items, io.StringIO())
+    return range(len(ctx.invoice_items))
+
+
+def consume(records: Iterable) -> tuple:
+    """
+    Exhaust records without holding on to them, returning the record count,
+    the time to the first record and the total time.
+    """
+    started = time.perf_counter()
+    first, count = None, 0
+    for _ in records:
+        if first is None:
+            first = time.perf_counter() - started
+        count += 1
+    return count, first, time.perf_counter() - started
+
+
+def measure(fn: Callable[[Context], Iterable], ctx: Context, repeat: int) -> dict:
+    """
+    Run fn once to warm up the server and client caches, then repeat times
+    for the timings and once more under tracemalloc for the peak memory.
+    """
+    consume(fn(ctx))
+    times, firsts = [], []
+    count = requests = 0
+    for _ in range(repeat):
+        before = ctx.server.requests
+        started = time.perf_counter()
+        count, first, _ = consume(fn(ctx))
+        times.append(time.perf_counter() - started)
+        firsts.append(first if first is not None else times[-1])
+        requests = ctx.server.requests - before
+
+    tracemalloc.start()
+    try:
+        consume(fn(ctx))
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    seconds = statistics.median(times)
+    return {
+        "records": count,
+        "requests": requests,
+        "seconds": seconds,
+        "best_seconds": min(times),
+        "records_per_second": count / seconds if seconds else None,
+        "first_record_seconds": statistics.median(firsts),
+        "peak_memory_bytes": peak,
+    }
+
+
+def commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+            cwd=os.path.dirname(__file__) or ".",
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv: list = None) -> dict:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("-o", "--output", help="write the results to this JSON file")
+    parser.add_argument("-k", "--filter", default="", help="run benchmarks matching")
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    parser.add_argument("--companies", type=int, default=1000)
+    parser.add_argument("--subscriptions", type=int, default=5000)
+    parser.add_argument("--invoice-items", type=int, default=10000)
+    parser.add_argument("--usage-lines", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="seconds added to every response"
+    )
+    parser.add_argument(
+        "--bandwidth", type=int, default=None, help="server bytes per second"
+    )
+    parser.add_argument("--parallel", type=int, default=4)
+    parser.add_argument("--codec", default=None, help="JSON codec of the client")
+    parser.add_argument("--list", action="store_true", help="list the benchmarks")
+    args = parser.parse_args(argv)
+
+    names = [name for name in BENCHMARKS if args.filter in name]
+    if args.list:
+        print("\n".join(names))
+        return {}
+
+    dataset = Dataset(
+        companies=args.companies,
+        subscriptions=args.subscriptions,
+        invoice_items=args.invoice_items,
+        usage_lines=args.usage_lines,
+        seed=args.seed,
+    )
+    results = {}
+    server = MockPax8Server(dataset, latency=args.latency, bandwidth=args.bandwidth)
+    with server:
+        client = Pax8Client(
+            "benchmark",
+            "benchmark",
+            cache_token=False,
+            codec=args.codec,
+            **server.urls,
+        )
+        ctx = Context(client, server, args.parallel)
+        for name in names:
+            results[name] = result = measure(BENCHMARKS[name], ctx, args.repeat)
+            print(
+                f"{name:32} {result['records']:>8} records "
+                f"{result['seconds']:>9.4f}s "
+                f"{result['records_per_second'] or 0:>12.0f}/s "
+                f"first {result['first_record_seconds']:.4f}s "
+                f"peak {result['peak_memory_bytes'] / 2**20:>8.2f} MiB",
+                file=sys.stderr,
+            )
+        client.conn.close()
+
+    report = {
+        "meta": {
+            "commit": commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "codec": get_codec(args.codec).name,
+            "dataset": dataset.sizes,
+            "latency": args.latency,
+            "bandwidth": args.bandwidth,
+            "parallel": args.parallel,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    else:
+        json.dump(report, sys.stdout, indent=2, sort_keys=True)
+        print()
+    return report
+
+
+if __name__ == "__main__":
+    main()
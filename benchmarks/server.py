@@ -0,0 +1,468 @@
+"""
+Local fake of the Pax8 API for offline benchmarks.
+
+Serves deterministic, paginated companies, contacts, subscriptions,
+invoices, invoice items, usage summaries and usage lines from a seeded
+dataset, filtered on record fields and sorted like the API, with
+configurable sizes, per-response latency and bandwidth:
+
+    with MockPax8Server(Dataset(invoice_items=20000), latency=0.05) as server:
+        client = Pax8Client("id", "secret", cache_token=False, **server.urls)
+"""
+import hashlib
+import json
+import random
+import socket
+import threading
+import time
+from collections import deque
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+START = date(2023, 1, 1)
+COUNTRIES = ["US", "GB", "SE", "DE", "AU", "CA"]
+PRODUCTS = [(f"prod-{i:04d}", f"Product {i}", f"SKU-{i:04d}") for i in range(50)]
+PAGING = ("page", "size", "sort", "sortDirection", "sort_direction")
+
+
+class Dataset:
+    """
+    Seeded records of every benchmarked resource. Nested lists hang off the
+    first parent: invoice "inv-0000" has the invoice items and usage summary
+    "us-0000" has the usage lines.
+    """
+
+    def __init__(
+        self,
+        companies: int = 1000,
+        subscriptions: int = 5000,
+        invoices: int = 100,
+        invoice_items: int = 10000,
+        usage_summaries: int = 100,
+        usage_lines: int = 10000,
+        contacts: int = 3,
+        seed: int = 0,
+    ):
+        rng = random.Random(seed)
+        self.sizes = {
+            "companies": companies,
+            "subscriptions": subscriptions,
+            "invoices": invoices,
+            "invoice_items": invoice_items,
+            "usage_summaries": usage_summaries,
+            "usage_lines": usage_lines,
+            "contacts": contacts,
+            "seed": seed,
+        }
+        self.companies = [self.company(rng, i) for i in range(companies)]
+        self.contacts = [self.contact(rng, i) for i in range(contacts)]
+        self.subscriptions = [self.subscription(rng, i) for i in range(subscriptions)]
+        self.invoices = [self.invoice(rng, i) for i in range(invoices)]
+        self.invoice_items = [self.invoice_item(rng, i) for i in range(invoice_items)]
+        self.usage_summaries = [
+            self.usage_summary(rng, i) for i in range(usage_summaries)
+        ]
+        self.usage_lines = [self.usage_line(rng, i) for i in range(usage_lines)]
+
+    def company_id(self, rng: random.Random) -> str:
+        return f"co-{rng.randrange(max(self.sizes['companies'], 1)):06d}"
+
+    def subscription_id(self, rng: random.Random) -> str:
+        return f"sub-{rng.randrange(max(self.sizes['subscriptions'], 1)):06d}"
+
+    @staticmethod
+    def day(rng: random.Random, days: int = 365) -> str:
+        return (START + timedelta(days=rng.randrange(days))).isoformat()
+
+    @staticmethod
+    def company(rng: random.Random, i: int) -> dict:
+        return {
+            "id": f"co-{i:06d}",
+            "name": f"Company {i}",
+            "address": {
+                "street": f"{rng.randrange(1, 999)} Main Street",
+                "city": f"City {rng.randrange(100)}",
+                "postalCode": f"{rng.randrange(10000, 99999)}",
+                "country": rng.choice(COUNTRIES),
+            },
+            "phone": f"555-{rng.randrange(1000, 9999)}",
+            "website": f"https://company{i}.example.com",
+            "externalId": f"ext-{i}",
+            "billOnBehalfOfEnabled": rng.random() < 0.5,
+            "selfServiceAllowed": rng.random() < 0.5,
+            "orderApprovalRequired": rng.random() < 0.2,
+            "status": rng.choice(["Active", "Active", "Active", "Inactive"]),
+            "updatedDate": f"{Dataset.day(rng)}T{rng.randrange(24):02d}:00:00Z",
+        }
+
+    @staticmethod
+    def contact(rng: random.Random, i: int) -> dict:
+        return {
+            "firstName": f"First{i}",
+            "lastName": f"Last{i}",
+            "email": f"contact{i}@example.com",
+            "types": [
+                {"type": rng.choice(["Admin", "Billing", "Technical"]), "primary": True}
+            ],
+        }
+
+    def subscription(self, rng: random.Random, i: int) -> dict:
+        product = rng.choice(PRODUCTS)
+        return {
+            "id": f"sub-{i:06d}",
+            "companyId": self.company_id(rng),
+            "productId": product[0],
+            "quantity": str(rng.randrange(1, 500)),
+            "startDate": self.day(rng),
+            "createdDate": self.day(rng),
+            "billingStart": self.day(rng),
+            "updatedDate": self.day(rng),
+            "status": rng.choice(["Active", "Active", "Cancelled"]),
+            "price": rng.randrange(1, 100),
+            "billingTerm": rng.choice(["Monthly", "Annual"]),
+            "partnerCost": round(rng.uniform(1, 100), 2),
+            "currencyCode": "USD",
+        }
+
+    def invoice(self, rng: random.Random, i: int) -> dict:
+        total = round(rng.uniform(100, 100000), 2)
+        return {
+            "id": f"inv-{i:04d}",
+            "status": rng.choice(["Paid", "Unpaid"]),
+            "invoiceDate": self.day(rng),
+            "dueDate": self.day(rng),
+            "balance": total,
+            "carriedBalance": 0.0,
+            "total": total,
+            "partnerName": "Benchmark Partner",
+            "companyId": self.company_id(rng),
+            "externalId": f"ext-inv-{i}",
+        }
+
+    def invoice_item(self, rng: random.Random, i: int) -> dict:
+        product = rng.choice(PRODUCTS)
+        quantity = rng.randrange(1, 500)
+        price = round(rng.uniform(1, 50), 2)
+        company = self.company_id(rng)
+        return {
+            "id": f"item-{i:07d}",
+            "purchaseOrderNumber": f"PO-{rng.randrange(100000)}",
+            "type": "subscription",
+            "companyId": company,
+            "externalId": f"ext-{company}",
+            "companyName": f"Company {company[3:]}",
+            "startPeriod": "2023-01-01",
+            "endPeriod": "2023-01-31",
+            "quantity": quantity,
+            "unitOfMeasure": "User",
+            "term": rng.choice(["Monthly", "Annual"]),
+            "sku": product[2],
+            "description": f"{product[1]} subscription",
+            "rateType": rng.choice(["Flat", "volume"]),
+            "chargeType": "per",
+            "price": price,
+            "subTotal": round(price * quantity, 2),
+            "cost": round(price * 0.8, 2),
+            "costTotal": round(price * 0.8 * quantity, 2),
+            "offeredBy": "Pax8",
+            "billedByPax8": True,
+            "total": round(price * quantity, 2),
+            "productId": product[0],
+            "productName": product[1],
+            "billingFee": 0.0,
+            "billingFeeRate": 0.0,
+            "amountDue": round(price * quantity, 2),
+            "currencyCode": "USD",
+        }
+
+    def usage_summary(self, rng: random.Random, i: int) -> dict:
+        product = rng.choice(PRODUCTS)
+        return {
+            "id": f"us-{i:04d}",
+            "productId": product[0],
+            "resourceGroup": f"rg-{rng.randrange(20)}",
+            "vendorName": "Microsoft",
+            "currentCharges": round(rng.uniform(0, 1000), 2),
+            "partnerTotal": round(rng.uniform(0, 1000), 2),
+            "isTrial": False,
+            "subscriptionId": self.subscription_id(rng),
+            "companyId": self.company_id(rng),
+            "currencyCode": "USD",
+        }
+
+    def usage_line(self, rng: random.Random, i: int) -> dict:
+        product = rng.choice(PRODUCTS)
+        quantity = rng.randrange(1, 100)
+        price = round(rng.uniform(0.01, 5), 4)
+        return {
+            "usageSummaryId": "us-0000",
+            "usageDate": self.day(rng, 31),
+            "productName": product[1],
+            "productId": product[0],
+            "unitOfMeasure": "Hours",
+            "quantity": quantity,
+            "currentCharges": round(price * quantity, 4),
+            "currentProfit": round(price * quantity * 0.2, 4),
+            "partnerTotal": round(price * quantity * 0.8, 4),
+            "unitPrice": price,
+            "isTrial": False,
+        }
+
+    def route(self, path: str) -> Tuple[List[dict], dict]:
+        """
+        Returns the records of a list endpoint, or (None, record) for a single
+        resource. Unknown paths raise KeyError.
+        """
+        parts = path.strip("/").split("/")[1:]
+        top = {
+            "companies": self.companies,
+            "subscriptions": self.subscriptions,
+            "invoices": self.invoices,
+        }
+        nested = {
+            ("companies", "contacts"): lambda _: self.contacts,
+            ("invoices", "items"): self.invoice_items_of,
+            ("usage-summaries", "usage-lines"): self.usage_lines_of,
+            ("subscriptions", "usage-summaries"): lambda _: self.usage_summaries,
+        }
+        if len(parts) == 1:
+            return top[parts[0]], None
+        if len(parts) == 2:
+            by_id = {
+                "companies": self.companies,
+                "subscriptions": self.subscriptions,
+                "invoices": self.invoices,
+                "usage-summaries": self.usage_summaries,
+            }
+            record = next(r for r in by_id[parts[0]] if r["id"] == parts[1])
+            return None, record
+        if len(parts) == 3:
+            return nested[parts[0], parts[2]](parts[1]), None
+        raise KeyError(path)
+
+    @staticmethod
+    def select(records: List[dict], qs: dict) -> List[dict]:
+        """
+        Apply the equality filters and the sort of a list request. Query
+        parameters that are not fields of the records are ignored, and
+        numeric strings sort as numbers.
+        """
+        fields = records[0] if records else {}
+        filters = {k: v for k, v in qs.items() if k not in PAGING and k in fields}
+        if filters:
+            records = [
+                r
+                for r in records
+                if all(str(r.get(k)) == v for k, v in filters.items())
+            ]
+
+        sort = qs.get("sort")
+        if sort in fields:
+
+            def key(record):
+                value = record.get(sort)
+                try:
+                    return (0, float(value), "")
+                except (TypeError, ValueError):
+                    return (1, 0, str(value))
+
+            direction = qs.get("sortDirection") or qs.get("sort_direction")
+            records = sorted(records, key=key, reverse=direction == "desc")
+        return records
+
+    def invoice_items_of(self, id: str) -> List[dict]:
+        return self.invoice_items if id == "inv-0000" else []
+
+    def usage_lines_of(self, id: str) -> List[dict]:
+        return self.usage_lines if id == "us-0000" else []
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "MockPax8Server"
+
+    def setup(self):
+        super().setup()
+        # Headers and body are separate writes, avoid the delayed ACK stall
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, *args):
+        pass
+
+    def send_body(self, status: int, body: bytes, headers: dict = None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+        if not server.bandwidth:
+            self.wfile.write(body)
+            return
+
+        chunk = max(int(server.bandwidth * 0.01), 1)
+        for start in range(0, len(body), chunk):
+            self.wfile.write(body[start : start + chunk])
+            self.wfile.flush()
+            time.sleep(0.01)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with self.server.lock:
+            self.server.logins += 1
+        self.send_body(
+            200,
+            b'{"token_type": "Bearer", "access_token": "benchmark", '
+            b'"expires_in": 86400}',
+        )
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            server.headers = dict(self.headers)
+            failure = server.failures.popleft() if server.failures else None
+        if failure is not None:
+            self.send_body(failure[0], b"{}", failure[1])
+            return
+
+        try:
+            body = server.body(self.path)
+        except (KeyError, StopIteration, ValueError):
+            self.send_body(404, b"{}")
+            return
+
+        if not server.etags:
+            self.send_body(200, body)
+            return
+        etag = f'"{hashlib.sha1(body).hexdigest()[:16]}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_body(304, b"", {"ETag": etag})
+        else:
+            self.send_body(200, body, {"ETag": etag})
+
+
+class MockPax8Server(ThreadingHTTPServer):
+    """
+    Threaded HTTP server answering like the Pax8 API on 127.0.0.1. Responses
+    are encoded once and reused, so the server costs little CPU next to the
+    client under test. latency delays every response by that many seconds,
+    and bandwidth (bytes per second) trickles the body out in chunks.
+    fail() makes the next GETs answer with an error status instead. With
+    etags, responses carry an ETag and a matching If-None-Match is answered
+    with 304 Not Modified. headers holds the headers of the last GET, and
+    update() changes a record between requests.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        dataset: Dataset = None,
+        latency: float = 0.0,
+        bandwidth: int = None,
+        max_page_size: int = 200,
+        port: int = 0,
+        etags: bool = False,
+    ):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.dataset = dataset if dataset is not None else Dataset()
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.max_page_size = max_page_size
+        self.etags = etags
+        self.headers: Dict[str, str] = {}
+        self.requests = 0
+        self.logins = 0
+        self.failures = deque()
+        self.lock = threading.Lock()
+        self.__bodies: Dict[str, bytes] = {}
+        self.__thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}"
+
+    @property
+    def urls(self) -> dict:
+        """
+        Client keyword arguments pointing every API at this server.
+        """
+        return {
+            "base_url": f"{self.url}/v1/",
+            "app_url": f"{self.url}/v3/",
+            "login_url": f"{self.url}/login",
+        }
+
+    def fail(self, status: int, count: int = 1, headers: dict = None):
+        """
+        Answer the next count GET requests with status and headers, e.g. 401
+        to reject the token or 503 with a Retry-After header.
+        """
+        with self.lock:
+            self.failures.extend([(status, headers or {})] * count)
+
+    def update(self, records: str, id: str, **fields) -> dict:
+        """
+        Change fields of the record with id in a dataset list (e.g.
+        "companies"), and drop the encoded responses so it is served.
+        """
+        record = next(r for r in getattr(self.dataset, records) if r["id"] == id)
+        record.update(fields)
+        with self.lock:
+            self.__bodies.clear()
+        return record
+
+    def body(self, path: str) -> bytes:
+        body = self.__bodies.get(path)
+        if body is not None:
+            return body
+
+        url = urlsplit(path)
+        qs = {k: v[0] for k, v in parse_qs(url.query).items()}
+        records, record = self.dataset.route(url.path)
+        if records is None:
+            body = json.dumps(record).encode("utf-8")
+        else:
+            records = self.dataset.select(records, qs)
+            size = min(int(qs.get("size") or 10), self.max_page_size)
+            number = int(qs.get("page") or 0)
+            total = len(records)
+            body = json.dumps(
+                {
+                    "content": records[number * size : (number + 1) * size],
+                    "page": {
+                        "size": size,
+                        "totalElements": total,
+                        "totalPages": (total + size - 1) // size,
+                        "number": number,
+                    },
+                }
+            ).encode("utf-8")
+
+        with self.lock:
+            self.__bodies[path] = body
+        return body
+
+    def start(self) -> "MockPax8Server":
+        self.__thread = threading.Thread(
+            target=self.serve_forever, name="pax8-mock", daemon=True
+        )
+        self.__thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self) -> "MockPax8Server":
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
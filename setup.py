@@ -39,6 +39,14 @@ setup(
     include_package_data=True,
     python_requires=python_min_version,
     install_requires=required_packages,
+    extras_require={
+        "async": ["httpx"],
+        "columnar": ["numpy", "pandas", "pyarrow"],
+        "fast": ["orjson"],
+    },
+    entry_points={
+        "console_scripts": ["pax8=pax8.cli:main"],
+    },
     license=about['__license__'],
     zip_safe=True,
     package_dir={"": "src"},
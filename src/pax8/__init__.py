@@ -4,8 +4,14 @@ This is some module information
 .. include:: ../../README.md
 """
 from abc import abstractmethod, ABC
-from typing import List
+from typing import Callable, Iterable, List, Iterator, Union
 from .rest import RestClient
+from .transport import Transport
+from .workers import BulkResult, bulk_map
+from .columnar import ColumnarBatch
+from .crawl import CrawlJob
+from .query import Query
+from .aio import AsyncPax8Client
 from . import types as t
 from . import filters as fi
 
@@ -17,8 +23,11 @@ class Pax8Client:
         client_secret: str,
         cache_token: bool = True,
         cache_location: str = "~/pax8_token.json",
+        **kwargs,
     ):
-        self.conn = RestClient(client_id, client_secret, cache_token, cache_location)
+        self.conn = RestClient(
+            client_id, client_secret, cache_token, cache_location, **kwargs
+        )
 
         self.Company = self.CompanyClient(self.conn)
         self.Invoice = self.InvoiceClient(self.conn)
@@ -31,47 +40,135 @@ class Pax8Client:
     class ResourceClient(ABC):
         conn: RestClient
         resource: type = t.Pax8Resource
+        filter: type = fi.ListFilter
 
         def __init__(self, conn):
             self.conn = conn
 
         @abstractmethod
-        def list(self, filter: fi.ListFilter = fi.ListFilter) -> List[t.Pax8Resource]:
-            return [
-                self.resource.objectify(item)
-                for item in self.conn.list_resource(
-                    self.resource.RESOURCE, filter.get_qs()
+        def list(
+            self,
+            filter: fi.ListFilter = fi.ListFilter,
+            iterate: bool = False,
+            parallel: int = 1,
+            ordered: bool = True,
+            stream: bool = False,
+        ) -> Union[List[t.Pax8Resource], Iterator[t.Pax8Resource]]:
+            if not iterate and not stream and parallel <= 1:
+                return self.conn.list_resource(
+                    self.resource.RESOURCE, filter.get_qs(), resource=self.resource
                 )
-            ]
+
+            items = self.conn.iter_resource(
+                self.resource.RESOURCE,
+                filter.get_qs(),
+                parallel=parallel,
+                ordered=ordered,
+                stream=stream,
+                resource=self.resource,
+            )
+            return items if iterate or stream else list(items)
 
         @abstractmethod
         def get(self, id: str) -> t.Pax8Resource:
-            return self.resource.objectify(
-                self.conn.get_resource(self.resource.RESOURCE, id)
+            return self.conn.get_resource(
+                self.resource.RESOURCE, id, resource=self.resource
             )
 
         def _list_nested(
-            self, id: str, resource: type, filter: fi.ListFilter = fi.ListFilter
+            self,
+            id: str,
+            resource: type,
+            filter: fi.ListFilter = fi.ListFilter,
+            iterate: bool = False,
+            parallel: int = 1,
+            ordered: bool = True,
+            parent: str = None,
+            columnar: bool = False,
+            stream: bool = False,
         ):
-            return [
-                resource.objectify(item)
-                for item in self.conn.list_nested_resource(
-                    self.resource.RESOURCE, id, resource.RESOURCE, filter.get_qs()
+            args = (parent or self.resource.RESOURCE, id, resource.RESOURCE)
+            kwargs = {"parallel": parallel, "ordered": ordered, "stream": stream}
+            if columnar:
+                return ColumnarBatch.from_items(
+                    resource,
+                    self.conn.iter_nested_resource(*args, filter.get_qs(), **kwargs),
                 )
-            ]
 
-        def _get_nested(self, id: str, resource: type, resource_id: str):
-            return resource.objectify(
-                self.conn.get_nested_resource(
-                    self.resource.RESOURCE, id, resource.RESOURCE, resource_id
+            if not iterate and not stream and parallel <= 1:
+                return self.conn.list_nested_resource(
+                    *args, filter.get_qs(), resource=resource
                 )
+
+            items = self.conn.iter_nested_resource(
+                *args, filter.get_qs(), resource=resource, **kwargs
+            )
+            return items if iterate or stream else list(items)
+
+        def get_many(self, ids: Iterable[str], concurrency: int = 8) -> BulkResult:
+            return self._many(self.get, ids, concurrency)
+
+        def _many(
+            self, method: Callable, ids: Iterable[str], concurrency: int, **kwargs
+        ) -> BulkResult:
+            """
+            Call method for every distinct id on up to `concurrency` threads,
+            returning the results by id and the errors in .errors. Keep
+            concurrency within the transport pool size to reuse connections.
+            """
+            return bulk_map(lambda id: method(id, **kwargs), ids, concurrency)
+
+        def query(
+            self,
+            order_by: str = None,
+            limit: int = None,
+            page_size: int = 200,
+            **predicates,
+        ) -> Query:
+            """
+            Lazy query with field__op predicates (gt, gte, lt, lte, ne, in,
+            contains), sent to the server where the endpoint supports them
+            and checked on the records otherwise. See Query.
+            """
+            return Query(
+                self, order_by=order_by, limit=limit, page_size=page_size, **predicates
+            )
+
+        def crawl(
+            self,
+            checkpoint: str = None,
+            filter: fi.ListFilter = fi.ListFilter,
+            nested: type = None,
+            nested_filter: fi.ListFilter = fi.ListFilter,
+            **kwargs,
+        ) -> CrawlJob:
+            """
+            Resumable crawl of this resource, or of the nested resources of
+            every listed record, e.g. the items of every invoice. See CrawlJob.
+            """
+            return CrawlJob(
+                self.conn,
+                self.resource,
+                filter,
+                nested,
+                nested_filter,
+                checkpoint=checkpoint,
+                **kwargs,
+            )
+
+        def _get_nested(self, id: str, resource: type, resource_id: str):
+            return self.conn.get_nested_resource(
+                self.resource.RESOURCE, id, resource.RESOURCE, resource_id, resource
             )
 
     class CompanyClient(ResourceClient):
         resource: type = t.Company
+        filter: type = fi.CompanyFilter
 
-        def list(self, filter: fi.CompanyFilter = fi.CompanyFilter) -> List[t.Company]:
-            return super().list(filter)
+        def list(
+            self, filter: fi.CompanyFilter = fi.CompanyFilter, **kwargs
+        ) -> List[t.Company]:
+            return super().list(filter, **kwargs)
 
         def get(self, id: str) -> t.Company:
             return super().get(id)
@@ -80,81 +177,123 @@ class Pax8Client:
             return t.CompanyMSTenantID.objectify(self.conn.get_tenant_id(id))
 
         def list_contacts(
-            self, id: str, filter: fi.ContactFilter = fi.ContactFilter
+            self, id: str, filter: fi.ContactFilter = fi.ContactFilter, **kwargs
         ) -> List[t.Contact]:
-            return super()._list_nested(id, t.Contact, filter)
+            return super()._list_nested(id, t.Contact, filter, **kwargs)
 
         def get_contact(self, id: str, contact_id: str) -> t.Contact:
             return super()._get_nested(id, t.Contact, contact_id)
 
+        def list_contacts_many(
+            self, ids: Iterable[str], concurrency: int = 8, **kwargs
+        ) -> BulkResult:
+            return self._many(self.list_contacts, ids, concurrency, **kwargs)
+
+        def get_ms_tenant_id_many(
+            self, ids: Iterable[str], concurrency: int = 8
+        ) -> BulkResult:
+            return self._many(self.get_ms_tenant_id, ids, concurrency)
+
     class ProductClient(ResourceClient):
         resource: type = t.Product
+        filter: type = fi.ProductFilter
 
-        def list(self, filter: fi.ProductFilter = fi.ProductFilter) -> List[t.Product]:
-            return super().list(filter)
+        def list(
+            self, filter: fi.ProductFilter = fi.ProductFilter, **kwargs
+        ) -> List[t.Product]:
+            return super().list(filter, **kwargs)
 
         def get(self, id: str) -> t.Product:
             return super().get(id)
 
-        def list_provisioning_details(self, id: str) -> List[t.ProvisioningDetail]:
-            return super()._list_nested(id, t.ProvisioningDetail)
+        def list_provisioning_details(
+            self, id: str, **kwargs
+        ) -> List[t.ProvisioningDetail]:
+            return super()._list_nested(id, t.ProvisioningDetail, **kwargs)
 
         def list_dependencies(self, id: str) -> t.Dependencies:
-            return t.Dependencies.objectify(
-                self.conn.list_nested_resource(
-                    "products", id, "dependencies", content_only=False
-                )
+            return self.conn.list_nested_resource(
+                "products",
+                id,
+                "dependencies",
+                content_only=False,
+                resource=t.Dependencies,
             )
 
-        def list_pricing(self, id: str) -> List[t.ProductPricing]:
-            return super()._list_nested(id, t.ProductPricing)
+        def list_pricing(self, id: str, **kwargs) -> List[t.ProductPricing]:
+            return super()._list_nested(id, t.ProductPricing, **kwargs)
 
     class OrderClient(ResourceClient):
         resource: type = t.Order
+        filter: type = fi.OrderFilter
 
-        def list(self, filter: fi.OrderFilter = fi.OrderFilter) -> List[t.Order]:
-            return super().list(filter)
+        def list(
+            self, filter: fi.OrderFilter = fi.OrderFilter, **kwargs
+        ) -> List[t.Order]:
+            return super().list(filter, **kwargs)
 
         def get(self, id: str) -> t.Order:
             return super().get(id)
 
     class SubscriptionClient(ResourceClient):
         resource: type = t.Subscription
+        filter: type = fi.SubscriptionFilter
 
         def list(
-            self, filter: fi.SubscriptionFilter = fi.SubscriptionFilter
+            self, filter: fi.SubscriptionFilter = fi.SubscriptionFilter, **kwargs
         ) -> List[t.Subscription]:
-            return super().list(filter)
+            return super().list(filter, **kwargs)
 
         def get(self, id: str) -> t.Subscription:
             return super().get(id)
 
         def get_history(self, id: str) -> t.SubscriptionHistory:
-            return t.SubscriptionHistory.objectify(
-                self.conn.list_nested_resource(
-                    "subscriptions", id, "history", content_only=False
-                )
+            return self.conn.list_nested_resource(
+                "subscriptions",
+                id,
+                "history",
+                content_only=False,
+                resource=t.SubscriptionHistory,
             )
 
-        def list_usage_summaries(self, id: str) -> List[t.UsageSummary]:
-            return super()._list_nested(id, t.UsageSummary)
+        def get_history_many(
+            self, ids: Iterable[str], concurrency: int = 8
+        ) -> BulkResult:
+            return self._many(self.get_history, ids, concurrency)
+
+        def list_usage_summaries(
+            self,
+            id: str,
+            filter: fi.UsageSummaryFilter = fi.UsageSummaryFilter,
+            **kwargs,
+        ) -> List[t.UsageSummary]:
+            return super()._list_nested(id, t.UsageSummary, filter, **kwargs)
 
     class InvoiceClient(ResourceClient):
         resource: type = t.Invoice
+        filter: type = fi.InvoiceFilter
 
-        def list(self, filter: fi.InvoiceFilter = fi.InvoiceFilter) -> List[t.Invoice]:
-            return super().list(filter)
+        def list(
+            self, filter: fi.InvoiceFilter = fi.InvoiceFilter, **kwargs
+        ) -> List[t.Invoice]:
+            return super().list(filter, **kwargs)
 
         def get(self, id: str) -> t.Invoice:
             return super().get(id)
 
         def list_items(
-            self, id: str, filter: fi.InvoiceItemFilter = fi.InvoiceItemFilter
-        ):
-            return super()._list_nested(id, t.InvoiceItem, filter)
+            self, id: str, filter: fi.InvoiceItemFilter = fi.InvoiceItemFilter, **kwargs
+        ) -> Union[List[t.InvoiceItem], ColumnarBatch]:
+            return super()._list_nested(id, t.InvoiceItem, filter, **kwargs)
+
+        def list_items_many(
+            self, ids: Iterable[str], concurrency: int = 8, **kwargs
+        ) -> BulkResult:
+            return self._many(self.list_items, ids, concurrency, **kwargs)
 
     class UsageSummaryClient(ResourceClient):
         resource: type = t.UsageSummary
+        filter: type = None
 
         def list(self, *args, **kwargs) -> None:
             pass
@@ -163,18 +302,23 @@ class Pax8Client:
             self,
             subscription_id: str,
             filter: fi.UsageSummaryFilter = fi.UsageSummaryFilter,
+            **kwargs,
         ) -> List[t.UsageSummary]:
-            return [
-                self.resource.objectify(item)
-                for item in self.conn.list_nested_resource(
-                    "subscriptions", subscription_id, "usage-summaries", filter.get_qs()
-                )
-            ]
+            return super()._list_nested(
+                subscription_id,
+                self.resource,
+                filter,
+                parent=t.Subscription.RESOURCE,
+                **kwargs,
+            )
 
         def get(self, id: str) -> t.UsageSummary:
             return super().get(id)
 
         def list_usage_lines(
-            self, id: str, filter: fi.UsageSummaryLineFilter = fi.UsageSummaryLineFilter
-        ) -> List[t.UsageSummaryLine]:
-            return super()._get_nested(id, t.UsageSummaryLine, filter)
+            self,
+            id: str,
+            filter: fi.UsageSummaryLineFilter = fi.UsageSummaryLineFilter,
+            **kwargs,
+        ) -> Union[List[t.UsageSummaryLine], ColumnarBatch]:
+            return super()._list_nested(id, t.UsageSummaryLine, filter, **kwargs)
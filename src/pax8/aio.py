@@ -0,0 +1,509 @@
+"""
+Asyncio variant of the Pax8 client, backed by httpx (pip install httpx).
+"""
+import os
+import asyncio
+from typing import Awaitable, Iterable
+from .base import Attempts, BaseRestClient, REAUTHENTICATE
+from .ratelimit import RateLimiter
+from .retry import RetryPolicy, Deadline
+from .codec import Codec
+from .cache import ResponseCache
+from .singleflight import AsyncSingleFlight
+from .tokens import Token, TokenManager
+from .instrumentation import Instrumentation
+from . import types as t
+from . import filters as fi
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+
+async def gather(
+    aws: Iterable[Awaitable], limit: int = 10, return_exceptions: bool = False
+) -> list:
+    """
+    Like asyncio.gather, but with at most `limit` awaitables running at once.
+    Results are returned in the same order as the awaitables.
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def bounded(aw):
+        async with semaphore:
+            return await aw
+
+    return await asyncio.gather(
+        *(bounded(aw) for aw in aws), return_exceptions=return_exceptions
+    )
+
+
+# pylint: disable=too-many-arguments
+class AsyncTransport:
+    """
+    Pooled async HTTP transport used by the AsyncRestClient. Connections are
+    kept alive and shared between all concurrent requests.
+    """
+
+    def __init__(
+        self,
+        pool_maxsize: int = 10,
+        keep_alive: bool = True,
+        keepalive_expiry: float = 5.0,
+        timeout: float = 30,
+        client: "httpx.AsyncClient" = None,
+    ):
+        if client is None:
+            if httpx is None:
+                raise ImportError(
+                    "The async client requires httpx, install it with: pip install httpx"
+                )
+
+            client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=pool_maxsize,
+                    max_keepalive_connections=pool_maxsize if keep_alive else 0,
+                    keepalive_expiry=keepalive_expiry,
+                ),
+                timeout=timeout,
+            )
+
+        self.client = client
+        self.timeout = timeout
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    def register(self, url: str):
+        pass
+
+    async def request(self, method: str, url: str, **kwargs):
+        return await self.client.request(method, url, **kwargs)
+
+    async def get(self, url: str, **kwargs):
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs):
+        return await self.request("POST", url, **kwargs)
+
+    async def close(self):
+        await self.client.aclose()
+
+
+class AsyncRestClient(BaseRestClient):
+    def __init__(
+        self,
+        client_id: str,
+        client_secret: str,
+        cache_token: bool = False,
+        cache_location: str = "~/pax8_token.json",
+        cache_encoding: str = "utf-8",
+        transport: AsyncTransport = None,
+        base_url: str = "https://api.pax8.com/v1/",
+        app_url: str = "https://app.pax8.com/p8p/api/v3/",
+        login_url: str = "https://login.pax8.com/oauth/token",
+        rate_limiter: RateLimiter = None,
+        retry_policy: RetryPolicy = None,
+        response_cache: ResponseCache = None,
+        codec: Codec = None,
+        single_flight: bool = True,
+        token_refresh_margin: float = 300,
+        instrumentation: Instrumentation = None,
+    ):
+        super().__init__(
+            client_id,
+            client_secret,
+            base_url,
+            app_url,
+            login_url,
+            rate_limiter,
+            retry_policy,
+            codec,
+            instrumentation,
+            response_cache,
+        )
+        self.single_flight = AsyncSingleFlight() if single_flight else None
+        self.transport = self._register(
+            transport if transport is not None else AsyncTransport()
+        )
+
+        self.cache_token = cache_token
+        self.cache_location = os.path.expanduser(cache_location)
+        self.cache_encoding = cache_encoding
+        self.tokens = TokenManager(
+            login_async=self.login,
+            cache_location=self.cache_location if cache_token else None,
+            cache_encoding=cache_encoding,
+            refresh_margin=token_refresh_margin,
+        )
+
+    def __str__(self):
+        return (
+            "AsyncPax8Connection (Active)"
+            if self.is_connected()
+            else "AsyncPax8Connection (Inactive)"
+        )
+
+    async def close(self):
+        await self.transport.close()
+
+    async def login(self) -> Token:
+        url, body = self._login_request()
+        return self._token(await self.transport.post(url, json=body))
+
+    async def renew_token(self, force: bool = False) -> Token:
+        return await self.tokens.get_async(force=force)
+
+    async def get_request(
+        self,
+        uri: str,
+        qs: dict = None,
+        deadline: Deadline = None,
+        headers: dict = None,
+    ):
+        token = await self.tokens.get_async()
+        attempts = Attempts(self, uri, qs, deadline, headers)
+        while True:
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire_async(uri)
+
+            attempts.started()
+            try:
+                req = await self.transport.get(uri, **attempts.kwargs(token))
+            except Exception as e:  # pylint: disable=broad-except
+                await asyncio.sleep(attempts.failed(e))
+                continue
+
+            action = attempts.received(req)
+            if action is None:
+                return attempts.result(req)
+
+            if action is REAUTHENTICATE:
+                token = await self.tokens.invalidate_async(token)
+            else:
+                await asyncio.sleep(action)
+
+    async def get_body(
+        self, uri: str, qs: dict = None, deadline: Deadline = None
+    ) -> bytes:
+        """
+        GET the raw body of a resource, going through the response cache
+        and coalescing concurrent identical GETs like RestClient.get_body.
+        """
+
+        async def fetch():
+            return await self._fetch_body(uri, qs, deadline)
+
+        if self.single_flight is None:
+            return await fetch()
+        return await self.single_flight.do(
+            ResponseCache.key(uri, qs),
+            fetch,
+            deadline.remaining() if deadline is not None else None,
+        )
+
+    async def _fetch_body(self, uri: str, qs: dict = None, deadline: Deadline = None):
+        if self.response_cache is None:
+            return (await self.get_request(uri, qs=qs, deadline=deadline)).content
+
+        key, entry, fresh = self._cached(uri, qs)
+        if fresh:
+            return entry.body
+
+        req = await self.get_request(
+            uri,
+            qs=qs,
+            deadline=deadline,
+            headers=entry.validators() if entry is not None else None,
+        )
+        return self._cache_response(uri, key, entry, req)
+
+    async def get_json(self, uri: str, qs: dict = None, deadline: Deadline = None):
+        return self.loads(uri, await self.get_body(uri, qs=qs, deadline=deadline))
+
+    async def paginate(self, uri: str, qs: dict = None):
+        qs = dict(qs or {})
+        number = qs.get("page") or 0
+        deadline = self._deadline()
+
+        while number is not None:
+            res = await self.get_json(
+                uri, qs={**qs, "page": number}, deadline=self._page_deadline(deadline)
+            )
+            yield res
+            number = self._next_page(res.get("page"))
+
+    async def iter_records(self, uri: str, qs: dict = None, resource: type = None):
+        async for res in self.paginate(uri, qs=qs):
+            for item in self.objectify(uri, res.get("content", []), resource):
+                yield item
+
+    def iter_resource(self, type: str, qs: dict = None, resource: type = None):
+        return self.iter_records(self._url(type), qs, resource)
+
+    def iter_nested_resource(
+        self,
+        parent_type: str,
+        parent_id: str,
+        child_type: str,
+        qs: dict = None,
+        resource: type = None,
+    ):
+        return self.iter_records(
+            self._url(parent_type, parent_id, child_type), qs, resource
+        )
+
+    async def list_resource(
+        self,
+        type: str,
+        qs: dict = None,
+        content_only: bool = True,
+        resource: type = None,
+    ):
+        uri = self._url(type)
+        if resource is not None:
+            body = await self.get_body(uri, qs=qs)
+            return self.decode(uri, body, resource, content_only)
+        return self._content(await self.get_json(uri, qs=qs), content_only)
+
+    async def list_nested_resource(
+        self,
+        parent_type: str,
+        parent_id: str,
+        child_type: str,
+        qs: dict = None,
+        content_only: bool = True,
+        resource: type = None,
+    ):
+        uri = self._url(parent_type, parent_id, child_type)
+        if resource is not None:
+            body = await self.get_body(uri, qs=qs)
+            return self.decode(uri, body, resource, content_only)
+        return self._content(await self.get_json(uri, qs=qs), content_only)
+
+    async def get_resource(self, type: str, id: str):
+        return await self.get_json(self._url(type, id))
+
+    async def get_nested_resource(
+        self, parent_type: str, parent_id: str, child_type: str, child_id: str
+    ):
+        return await self.get_json(
+            self._url(parent_type, parent_id, child_type, child_id)
+        )
+
+    async def get_tenant_id(self, client_id: str) -> dict:
+        return {
+            "clientId": client_id,
+            **(await self.get_json(self._tenant_url(client_id))),
+        }
+
+
+# pylint: disable=too-few-public-methods
+class AsyncPax8Client:
+    """
+    Asyncio counterpart of Pax8Client with the same resource clients. List
+    methods return a coroutine, or an async iterator over all pages when
+    called with iterate=True:
+
+        companies = await client.Company.list()
+        async for item in client.Invoice.list_items(id, iterate=True): ...
+    """
+
+    def __init__(
+        self,
+        client_id: str,
+        client_secret: str,
+        cache_token: bool = True,
+        cache_location: str = "~/pax8_token.json",
+        **kwargs,
+    ):
+        self.conn = AsyncRestClient(
+            client_id, client_secret, cache_token, cache_location, **kwargs
+        )
+
+        self.Company = self.CompanyClient(self.conn)
+        self.Invoice = self.InvoiceClient(self.conn)
+        self.Product = self.ProductClient(self.conn)
+        self.Order = self.OrderClient(self.conn)
+        self.Subscription = self.SubscriptionClient(self.conn)
+        self.UsageSummary = self.UsageSummaryClient(self.conn)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def close(self):
+        await self.conn.close()
+
+    @staticmethod
+    async def gather(
+        aws: Iterable[Awaitable], limit: int = 10, return_exceptions: bool = False
+    ) -> list:
+        return await gather(aws, limit, return_exceptions)
+
+    class ResourceClient:
+        conn: AsyncRestClient
+        resource: type = t.Pax8Resource
+
+        def __init__(self, conn):
+            self.conn = conn
+
+        def list(self, filter: fi.ListFilter = fi.ListFilter, iterate: bool = False):
+            method = self.conn.iter_resource if iterate else self.conn.list_resource
+            return method(
+                self.resource.RESOURCE, filter.get_qs(), resource=self.resource
+            )
+
+        async def get(self, id: str) -> t.Pax8Resource:
+            return self.resource.objectify(
+                await self.conn.get_resource(self.resource.RESOURCE, id)
+            )
+
+        def _list_nested(
+            self,
+            id: str,
+            resource: type,
+            filter: fi.ListFilter = fi.ListFilter,
+            iterate: bool = False,
+            parent: str = None,
+        ):
+            args = (parent or self.resource.RESOURCE, id, resource.RESOURCE)
+            method = (
+                self.conn.iter_nested_resource
+                if iterate
+                else self.conn.list_nested_resource
+            )
+            return method(*args, filter.get_qs(), resource=resource)
+
+        async def _get_nested(self, id: str, resource: type, resource_id: str):
+            return resource.objectify(
+                await self.conn.get_nested_resource(
+                    self.resource.RESOURCE, id, resource.RESOURCE, resource_id
+                )
+            )
+
+    class CompanyClient(ResourceClient):
+        resource: type = t.Company
+
+        def list(self, filter: fi.CompanyFilter = fi.CompanyFilter, **kwargs):
+            return super().list(filter, **kwargs)
+
+        async def get(self, id: str) -> t.Company:
+            return await super().get(id)
+
+        async def get_ms_tenant_id(self, id: str) -> t.CompanyMSTenantID:
+            return t.CompanyMSTenantID.objectify(await self.conn.get_tenant_id(id))
+
+        def list_contacts(
+            self, id: str, filter: fi.ContactFilter = fi.ContactFilter, **kwargs
+        ):
+            return super()._list_nested(id, t.Contact, filter, **kwargs)
+
+        async def get_contact(self, id: str, contact_id: str) -> t.Contact:
+            return await super()._get_nested(id, t.Contact, contact_id)
+
+    class ProductClient(ResourceClient):
+        resource: type = t.Product
+
+        def list(self, filter: fi.ProductFilter = fi.ProductFilter, **kwargs):
+            return super().list(filter, **kwargs)
+
+        async def get(self, id: str) -> t.Product:
+            return await super().get(id)
+
+        def list_provisioning_details(self, id: str, **kwargs):
+            return super()._list_nested(id, t.ProvisioningDetail, **kwargs)
+
+        async def list_dependencies(self, id: str) -> t.Dependencies:
+            return t.Dependencies.objectify(
+                await self.conn.list_nested_resource(
+                    "products", id, "dependencies", content_only=False
+                )
+            )
+
+        def list_pricing(self, id: str, **kwargs):
+            return super()._list_nested(id, t.ProductPricing, **kwargs)
+
+    class OrderClient(ResourceClient):
+        resource: type = t.Order
+
+        def list(self, filter: fi.OrderFilter = fi.OrderFilter, **kwargs):
+            return super().list(filter, **kwargs)
+
+        async def get(self, id: str) -> t.Order:
+            return await super().get(id)
+
+    class SubscriptionClient(ResourceClient):
+        resource: type = t.Subscription
+
+        def list(self, filter: fi.SubscriptionFilter = fi.SubscriptionFilter, **kwargs):
+            return super().list(filter, **kwargs)
+
+        async def get(self, id: str) -> t.Subscription:
+            return await super().get(id)
+
+        async def get_history(self, id: str) -> t.SubscriptionHistory:
+            return t.SubscriptionHistory.objectify(
+                await self.conn.list_nested_resource(
+                    "subscriptions", id, "history", content_only=False
+                )
+            )
+
+        def list_usage_summaries(
+            self,
+            id: str,
+            filter: fi.UsageSummaryFilter = fi.UsageSummaryFilter,
+            **kwargs,
+        ):
+            return super()._list_nested(id, t.UsageSummary, filter, **kwargs)
+
+    class InvoiceClient(ResourceClient):
+        resource: type = t.Invoice
+
+        def list(self, filter: fi.InvoiceFilter = fi.InvoiceFilter, **kwargs):
+            return super().list(filter, **kwargs)
+
+        async def get(self, id: str) -> t.Invoice:
+            return await super().get(id)
+
+        def list_items(
+            self, id: str, filter: fi.InvoiceItemFilter = fi.InvoiceItemFilter, **kwargs
+        ):
+            return super()._list_nested(id, t.InvoiceItem, filter, **kwargs)
+
+    class UsageSummaryClient(ResourceClient):
+        resource: type = t.UsageSummary
+
+        async def list(self, *args, **kwargs) -> None:
+            pass
+
+        def list_for_subscription(
+            self,
+            subscription_id: str,
+            filter: fi.UsageSummaryFilter = fi.UsageSummaryFilter,
+            **kwargs,
+        ):
+            return super()._list_nested(
+                subscription_id,
+                self.resource,
+                filter,
+                parent=t.Subscription.RESOURCE,
+                **kwargs,
+            )
+
+        async def get(self, id: str) -> t.UsageSummary:
+            return await super().get(id)
+
+        def list_usage_lines(
+            self,
+            id: str,
+            filter: fi.UsageSummaryLineFilter = fi.UsageSummaryLineFilter,
+            **kwargs,
+        ):
+            return super()._list_nested(id, t.UsageSummaryLine, filter, **kwargs)
@@ -0,0 +1,378 @@
+"""
+The I/O-free parts of RestClient and AsyncRestClient: URL building, the
+retry, rate limit and re-authentication decisions of a request, and
+decoding. The clients only add the (awaited) calls to the transport.
+"""
+import time
+from .exceptions import UnexpectedResponseException, RateLimitedException
+from .ratelimit import RateLimiter
+from .retry import RetryPolicy, Deadline
+from .cache import ResponseCache, CacheEntry
+from .codec import Codec, get_codec
+from .tokens import Token
+from .instrumentation import Instrumentation
+from . import enums as en
+from . import types as t
+
+# Returned by Attempts.received when the token must be replaced first
+REAUTHENTICATE = object()
+
+
+# pylint: disable=too-many-instance-attributes,too-many-arguments
+class Attempts:
+    """
+    The attempts of one GET request. A client sends the request until
+    received() returns None:
+
+        attempts = Attempts(client, uri, qs)
+        while True:
+            attempts.started()
+            try:
+                req = transport.get(uri, **attempts.kwargs(token))
+            except Exception as e:
+                sleep(attempts.failed(e))  # raises e when not retryable
+                continue
+            action = attempts.received(req)
+            if action is None:
+                return attempts.result(req)
+            if action is REAUTHENTICATE:
+                token = renew(token)
+            else:
+                sleep(action)
+    """
+
+    def __init__(
+        self,
+        client: "BaseRestClient",
+        uri: str,
+        qs: dict = None,
+        deadline: Deadline = None,
+        headers: dict = None,
+        stream: bool = False,
+    ):
+        self.client = client
+        self.uri = uri
+        self.qs = qs
+        self.headers = headers
+        self.stream = stream
+        self.policy = client.retry_policy
+        if deadline is None and self.policy is not None:
+            deadline = self.policy.start()
+        self.deadline = deadline
+
+        self.inst = client.instrumentation
+        self.endpoint = client.endpoint(uri) if self.inst is not None else None
+        self.attempt = self.limited = self.tries = 0
+        self.reauthenticated = self.renewed = False
+        self.__event = None
+        self.__started = None
+
+    def kwargs(self, token: Token) -> dict:
+        """
+        Keyword arguments of the transport call for the next attempt, with
+        the transport timeout capped at the remaining deadline budget. Raises
+        TimeoutError instead once the budget is used up.
+        """
+        kwargs = {
+            "headers": (
+                {**token.headers, **self.headers} if self.headers else token.headers
+            ),
+            "params": self.qs,
+        }
+        remaining = self.deadline.remaining() if self.deadline is not None else None
+        if remaining is not None:
+            if remaining <= 0:
+                raise TimeoutError(f"Deadline exceeded before getting {self.uri}")
+            timeout = getattr(self.client.transport, "timeout", None)
+            kwargs["timeout"] = min(timeout or remaining, remaining)
+        return kwargs
+
+    def started(self):
+        if self.inst is not None:
+            if self.renewed:
+                self.inst.reauthenticated(self.endpoint)
+            elif self.tries:
+                self.inst.retried(self.endpoint)
+            self.__event = self.inst.started(
+                "GET", self.uri, self.endpoint, self.qs, self.tries
+            )
+            self.__started = time.perf_counter()
+        self.tries += 1
+        self.renewed = False
+
+    def failed(self, exc: Exception) -> float:
+        """
+        Returns the delay before retrying after the transport raised exc, or
+        raises exc again when it cannot be retried.
+        """
+        if self.inst is not None:
+            self.inst.finished(
+                self.__event, time.perf_counter() - self.__started, error=exc
+            )
+
+        delay = None
+        if self.policy is not None and self.policy.retryable_exception(exc):
+            delay = self.policy.next_delay(self.attempt, self.deadline)
+        if delay is None:
+            raise exc
+        self.attempt += 1
+        return delay
+
+    def received(self, req):
+        """
+        Returns None when req is the final response, REAUTHENTICATE when the
+        token was rejected, or else the delay before the next attempt.
+        """
+        if self.inst is not None:
+            if self.stream:
+                size = req.headers.get("Content-Length")
+            else:
+                size = len(req.content)
+            self.inst.finished(
+                self.__event,
+                time.perf_counter() - self.__started,
+                req.status_code,
+                int(size or 0),
+            )
+
+        if (
+            req.status_code == en.ResponseType.UNAUTHORIZED.value
+            and not self.reauthenticated
+        ):
+            self.reauthenticated = self.renewed = True
+            return REAUTHENTICATE
+
+        limiter = self.client.rate_limiter
+        if limiter is not None and limiter.feedback(
+            self.uri, req.status_code, req.headers.get("Retry-After"), self.limited
+        ):
+            self.limited += 1
+            return 0
+
+        if self.policy is not None and self.policy.retryable_status(req.status_code):
+            delay = self.policy.next_delay(self.attempt, self.deadline)
+            if delay is not None:
+                self.attempt += 1
+                return delay
+        return None
+
+    def result(self, req):
+        """
+        Returns the final response, or raises if it is an error.
+        """
+        if req.status_code == en.ResponseType.TOO_MANY_REQUESTS.value:
+            raise RateLimitedException(
+                f"Rate limited by Pax8 after {self.limited + 1} attempt(s): {req.text}"
+            )
+
+        if req.status_code != en.ResponseType.OK.value and not (
+            self.headers and req.status_code == en.ResponseType.NOT_MODIFIED.value
+        ):
+            raise UnexpectedResponseException(
+                f"Failed to get {self.uri} from Pax8: "
+                f"{en.ResponseType(req.status_code)} {req.text}"
+            )
+        return req
+
+
+# pylint: disable=too-many-arguments
+class BaseRestClient:
+    """
+    Configuration and request logic shared by the sync and async clients.
+    """
+
+    def __init__(
+        self,
+        client_id: str,
+        client_secret: str,
+        base_url: str = "https://api.pax8.com/v1/",
+        app_url: str = "https://app.pax8.com/p8p/api/v3/",
+        login_url: str = "https://login.pax8.com/oauth/token",
+        rate_limiter: RateLimiter = None,
+        retry_policy: RetryPolicy = None,
+        codec: Codec = None,
+        instrumentation: Instrumentation = None,
+        response_cache: ResponseCache = None,
+    ):
+        self.__id = client_id
+        self.__secret = client_secret
+        self.__baseurl = base_url
+        self.__appurl = app_url
+        self.__loginurl = login_url
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
+        self.codec = get_codec(codec)
+        self.instrumentation = instrumentation
+        self.response_cache = response_cache
+        self.cache_namespace = ResponseCache.namespace(client_id)
+        self.tokens = None
+
+    def _register(self, transport):
+        for url in (self.__baseurl, self.__appurl, self.__loginurl):
+            transport.register(url)
+        return transport
+
+    def is_connected(self):
+        return self.tokens.token is not None and self.tokens.token.valid()
+
+    def _login_request(self):
+        """
+        Returns the URL and JSON body of the login request.
+        """
+        return self.__loginurl, {
+            "client_id": self.__id,
+            "client_secret": self.__secret,
+            "audience": "api://p8p.client",
+            "grant_type": "client_credentials",
+        }
+
+    @staticmethod
+    def _token(req) -> Token:
+        if req.status_code == en.ResponseType.OK.value:
+            return Token.from_response(req.json())
+
+        raise Exception(
+            f"Failed to get tokens from Pax8: {req.status_code} {req.text}"
+        )
+
+    def _url(self, *parts: str) -> str:
+        return self.__baseurl + "/".join(parts)
+
+    def _tenant_url(self, client_id: str) -> str:
+        return f"{self.__appurl}companies/{client_id}/msTenantId"
+
+    def endpoint(self, uri: str) -> str:
+        """
+        Returns the endpoint template of a request URI, with the resource ids
+        replaced, e.g. "companies/{id}/contacts".
+        """
+        for base in (self.__baseurl, self.__appurl):
+            if uri.startswith(base):
+                uri = uri[len(base):]
+                break
+
+        return "/".join(
+            "{id}" if i % 2 else segment
+            for i, segment in enumerate(uri.split("?", 1)[0].strip("/").split("/"))
+        )
+
+    def loads(self, uri: str, body: bytes):
+        """
+        Decode a JSON body, timed as the decode phase of the endpoint.
+        """
+        inst = self.instrumentation
+        if inst is None:
+            return self.codec.loads(body)
+
+        started = time.perf_counter()
+        res = self.codec.loads(body)
+        inst.timing(self.endpoint(uri), "decode", time.perf_counter() - started)
+        return res
+
+    def decode(self, uri: str, body: bytes, resource: type, content_only: bool):
+        """
+        Decode a body with resource.decode, timed as the objectify phase of
+        the endpoint (the JSON parse included, as typed codecs do both in
+        one step).
+        """
+        inst = self.instrumentation
+        if inst is None:
+            return resource.decode(body, self.codec, content_only)
+
+        started = time.perf_counter()
+        res = resource.decode(body, self.codec, content_only)
+        inst.timing(self.endpoint(uri), "objectify", time.perf_counter() - started)
+        return res
+
+    def objectify(self, uri: str, items: list, resource: type = None) -> list:
+        """
+        Objectify the records of a page with resource, timed as the objectify
+        phase of the endpoint. Without a resource the records are returned
+        as they are.
+        """
+        inst = self.instrumentation
+        if resource is None:
+            return items
+        if inst is None:
+            return resource.objectify_many(items)
+
+        started = time.perf_counter()
+        res = resource.objectify_many(items)
+        inst.timing(self.endpoint(uri), "objectify", time.perf_counter() - started)
+        return res
+
+    def _cached(self, uri: str, qs: dict = None):
+        """
+        Look a GET up in the response cache. Returns the cache key and the
+        cached entry, and whether the entry is fresh enough to be used
+        without a request; otherwise the request is sent with the validators
+        of the entry, if any, and its response passed to _cache_response.
+        """
+        key = self.response_cache.key(uri, qs, self.cache_namespace)
+        entry = self.response_cache.get(key, stale=True)
+        if entry is not None and entry.fresh():
+            self._cache_event(uri, "hit")
+            return key, entry, True
+        return key, entry, False
+
+    def _cache_response(self, uri: str, key: str, entry: CacheEntry, req) -> bytes:
+        """
+        Store the response to a cache miss, or refresh the entry after a 304
+        response, and return the body.
+        """
+        cache = self.response_cache
+        ttl = cache.ttl_for(self.endpoint(uri))
+        if req.status_code == en.ResponseType.NOT_MODIFIED.value:
+            self._cache_event(uri, "revalidated")
+            cache.revalidated(key, entry, ttl)
+            return entry.body
+
+        self._cache_event(uri, "miss")
+        if entry is not None:
+            cache.missed()
+        if ttl:
+            cache.set(
+                key,
+                CacheEntry(
+                    body=req.content,
+                    expires=time.time() + ttl,
+                    etag=req.headers.get("ETag"),
+                    last_modified=req.headers.get("Last-Modified"),
+                ),
+            )
+        return req.content
+
+    def _cache_event(self, uri: str, event: str):
+        if self.instrumentation is not None:
+            self.instrumentation.cache(self.endpoint(uri), event)
+
+    def _deadline(self) -> Deadline:
+        """
+        Returns the deadline budget of a call, or None without a retry policy.
+        """
+        return self.retry_policy.start() if self.retry_policy is not None else None
+
+    def _page_deadline(self, deadline: Deadline) -> Deadline:
+        """
+        Returns the deadline of the next page of a listing: the deadline of
+        the whole call, or a new one if the retry policy budgets per page.
+        """
+        if self.retry_policy is not None and self.retry_policy.per_page:
+            return self.retry_policy.start()
+        return deadline
+
+    @staticmethod
+    def _content(res: dict, content_only: bool):
+        return res.get("content", []) if content_only else res
+
+    @staticmethod
+    def _next_page(res: dict) -> int:
+        """
+        Returns the number of the page after the one described by the page
+        block res, or None after the last page.
+        """
+        if not res:
+            return None
+        page = t.Pax8Page.objectify(res)
+        number = page.number + 1
+        return number if number < page.totalPages else None
@@ -0,0 +1,284 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from urllib.parse import urlencode
+from typing import Dict
+
+
+@dataclass
+class CacheEntry:
+    body: bytes
+    expires: float
+    etag: str = None
+    last_modified: str = None
+
+    def fresh(self) -> bool:
+        return time.time() < self.expires
+
+    def validators(self) -> dict:
+        """
+        Conditional request headers for revalidating the entry once stale.
+        """
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ResponseCache(ABC):
+    """
+    Base class for GET response caches used by the RestClient.
+
+    ttl is the default time to live in seconds, and ttls overrides it per
+    endpoint, either by endpoint template ("products/{id}/pricing") or by top
+    level resource ("products"). A ttl of 0 disables caching for the endpoint.
+
+    Entries stored with an ETag or Last-Modified validator are kept after they
+    expire, so they can be revalidated with a conditional request instead of
+    being downloaded again.
+
+    Keys include a namespace derived from the client id, so clients with
+    different credentials sharing a cache never read each other's responses.
+    """
+
+    def __init__(self, ttl: float = 300, ttls: Dict[str, float] = None):
+        self.ttl = ttl
+        self.ttls = ttls or {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.revalidations = 0
+        self._stats_lock = threading.Lock()
+
+    @staticmethod
+    def key(uri: str, qs: dict = None, namespace: str = None) -> str:
+        params = sorted(
+            (str(key), str(value)) for key, value in (qs or {}).items() if value is not None
+        )
+        key = f"{uri}?{urlencode(params)}" if params else uri
+        return f"{namespace}:{key}" if namespace else key
+
+    @staticmethod
+    def namespace(client_id: str) -> str:
+        """
+        Cache namespace of the responses fetched with client_id's credentials.
+        """
+        return hashlib.sha256(client_id.encode("utf-8")).hexdigest()[:16]
+
+    def ttl_for(self, endpoint: str) -> float:
+        if endpoint in self.ttls:
+            return self.ttls[endpoint]
+        return self.ttls.get(endpoint.split("/", 1)[0], self.ttl)
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "revalidations": self.revalidations,
+            "entries": len(self),
+        }
+
+    def _count(self, hit: bool):
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key: str, stale: bool = False) -> CacheEntry:
+        """
+        Returns the entry for key if it is fresh. With stale=True, an expired
+        entry is also returned when it can be revalidated; it is counted once
+        the revalidation returns, by revalidated() or missed().
+        """
+        entry = self._get(key)
+        fresh = entry is not None and entry.fresh()
+        if not fresh and stale and entry is not None and entry.validators():
+            return entry
+
+        self._count(fresh)
+        return entry if fresh else None
+
+    def set(self, key: str, entry: CacheEntry):
+        self._set(key, entry)
+
+    def missed(self):
+        """
+        Count a miss for a stale entry whose revalidation returned a new body.
+        """
+        self._count(False)
+
+    def revalidated(self, key: str, entry: CacheEntry, ttl: float):
+        with self._stats_lock:
+            self.revalidations += 1
+
+        entry.expires = time.time() + ttl
+        self._set(key, entry)
+
+    @abstractmethod
+    def _get(self, key: str) -> CacheEntry:
+        pass
+
+    @abstractmethod
+    def _set(self, key: str, entry: CacheEntry):
+        pass
+
+    @abstractmethod
+    def clear(self):
+        pass
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+
+class MemoryCache(ResponseCache):
+    """
+    In-process LRU cache, bounded by number of entries and total body size.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 300,
+        ttls: Dict[str, float] = None,
+        max_entries: int = 1024,
+        max_bytes: int = 64 * 1024 * 1024,
+    ):
+        super().__init__(ttl, ttls)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def _get(self, key: str) -> CacheEntry:
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None:
+                self.__entries.move_to_end(key)
+            return entry
+
+    def _set(self, key: str, entry: CacheEntry):
+        with self.__lock:
+            old = self.__entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old.body)
+
+            self.__entries[key] = entry
+            self.size += len(entry.body)
+
+            while self.__entries and (
+                len(self.__entries) > self.max_entries or self.size > self.max_bytes
+            ):
+                _, evicted = self.__entries.popitem(last=False)
+                self.size -= len(evicted.body)
+                self.evictions += 1
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+            self.size = 0
+
+
+class DiskCache(ResponseCache):
+    """
+    On-disk cache that can be shared by several processes. Each entry is a
+    file named after the hash of its key, written atomically, and the least
+    recently used files are removed once there are more than max_entries.
+    Hit and miss counters are per process.
+    """
+
+    def __init__(
+        self,
+        directory: str = "~/.cache/pax8",
+        ttl: float = 300,
+        ttls: Dict[str, float] = None,
+        max_entries: int = 4096,
+    ):
+        super().__init__(ttl, ttls)
+        self.directory = os.path.expanduser(directory)
+        self.max_entries = max_entries
+        os.makedirs(self.directory, exist_ok=True)
+
+    def __len__(self) -> int:
+        return len(self._files())
+
+    def _path(self, key: str) -> str:
+        return os.path.join(
+            self.directory, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".json"
+        )
+
+    def _files(self) -> list:
+        return [
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.endswith(".json")
+        ]
+
+    def _get(self, key: str) -> CacheEntry:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                meta = json.loads(f.readline())
+                body = f.read()
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+
+        if meta.pop("key", None) != key:
+            return None
+        return CacheEntry(body=body, **meta)
+
+    def _set(self, key: str, entry: CacheEntry):
+        meta = {name: value for name, value in entry.__dict__.items() if name != "body"}
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(json.dumps({"key": key, **meta}).encode("utf-8") + b"\n")
+                f.write(entry.body)
+            os.replace(tmp, self._path(key))
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+        self._evict()
+
+    def _evict(self):
+        files = self._files()
+        if len(files) <= self.max_entries:
+            return
+
+        def mtime(path):
+            try:
+                return os.stat(path).st_mtime
+            except OSError:
+                return 0
+
+        for path in sorted(files, key=mtime)[: len(files) - self.max_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            with self._stats_lock:
+                self.evictions += 1
+
+    def clear(self):
+        for path in self._files():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,502 @@
+"""
+The pax8 command line tool, exporting resources to NDJSON, CSV or Parquet:
+
+    export PAX8_CLIENT_ID=... PAX8_CLIENT_SECRET=...
+    pax8 export invoices -o invoices.ndjson --filter invoiceDateRangeStart=2023-01-01
+    pax8 export invoice-items -o items.csv --parent-filter status=Unpaid
+
+Records are written as the API returns them, page by page, so memory stays
+bounded by the page size (or one parent's records for nested resources).
+An interrupted export resumes from its checkpoint when run again.
+"""
+import csv
+import io
+import json
+import os
+import sys
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, fields
+from datetime import date
+from enum import Enum
+from typing import Iterable, List
+
+import click
+
+from . import Pax8Client
+from . import filters as fi
+from . import types as t
+from .__version__ import __version__
+from .codec import Codec, get_codec
+from .columnar import ColumnarBatch
+from .crawl import Batch, CrawlJob
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover
+    pq = None
+
+
+@dataclass(frozen=True)
+class Export:
+    resource: type
+    filter: type
+    parent: str = None
+
+
+EXPORTS = {
+    "companies": Export(t.Company, fi.CompanyFilter),
+    "subscriptions": Export(t.Subscription, fi.SubscriptionFilter),
+    "invoices": Export(t.Invoice, fi.InvoiceFilter),
+    "invoice-items": Export(t.InvoiceItem, fi.InvoiceItemFilter, "invoices"),
+    "usage-summaries": Export(
+        t.UsageSummary, fi.UsageSummaryFilter, "subscriptions"
+    ),
+    "usage-lines": Export(
+        t.UsageSummaryLine, fi.UsageSummaryLineFilter, "usage-summaries"
+    ),
+}
+FORMATS = {
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+    ".csv": "csv",
+    ".parquet": "parquet",
+}
+
+
+def crawl(
+    conn,
+    name: str,
+    filter: fi.ListFilter,
+    parent_filter: fi.ListFilter = fi.ListFilter,
+    parents: Iterable[str] = None,
+    **kwargs,
+) -> CrawlJob:
+    """
+    CrawlJob of an export. Resources nested twice (usage lines) crawl the
+    ids of their parents with a second job, without checkpoint.
+    """
+    spec = EXPORTS[name]
+    if spec.parent is None:
+        return CrawlJob(conn, spec.resource, filter, **kwargs)
+
+    parent = EXPORTS[spec.parent]
+    if parent.parent is None:
+        return CrawlJob(
+            conn,
+            parent.resource,
+            parent_filter,
+            nested=spec.resource,
+            nested_filter=filter,
+            parents=parents or None,
+            **kwargs,
+        )
+
+    if not parents:
+        job = crawl(
+            conn,
+            spec.parent,
+            parent_filter,
+            concurrency=kwargs.get("concurrency", 4),
+            page_size=kwargs.get("page_size", 200),
+        )
+        parents = (item["id"] for batch in job for item in batch.items)
+    return CrawlJob(
+        conn,
+        parent.resource,
+        nested=spec.resource,
+        nested_filter=filter,
+        parents=parents,
+        **kwargs,
+    )
+
+
+def parse_filter(export: Export, options: Iterable[str]) -> fi.ListFilter:
+    """
+    Build the filter of an export from KEY=VALUE options, converting the
+    values to the types of the filter fields.
+    """
+    types = {
+        field.name: field.type
+        for field in fields(export.filter)
+        if field.name not in ("page", "size")
+    }
+    kwargs = {}
+    for option in options:
+        key, sep, value = option.partition("=")
+        if not sep or key not in types:
+            raise click.BadParameter(
+                f"{option}, use KEY=VALUE with KEY one of {', '.join(types)}",
+                param_hint="--filter",
+            )
+
+        typ = types[key]
+        try:
+            if typ is bool:
+                value = value.lower() in ("1", "true", "yes")
+            elif typ is date:
+                value = date.fromisoformat(value)
+            elif isinstance(typ, type) and issubclass(typ, (int, float, Enum)):
+                value = typ(value)
+        except ValueError as e:
+            raise click.BadParameter(f"{option}: {e}", param_hint="--filter") from e
+        kwargs[key] = value
+    return export.filter(**kwargs)
+
+
+def columns(resource: type, prefix: str = "") -> List[str]:
+    """
+    CSV columns of a resource, with nested resources flattened into dotted
+    names such as address.city.
+    """
+    names = []
+    for field in fields(resource):
+        nested = resource.NESTED_TYPES.get(field.name, field.type)
+        if isinstance(nested, type) and issubclass(nested, t.Pax8Resource):
+            names += columns(nested, f"{prefix}{field.name}.")
+        else:
+            names.append(f"{prefix}{field.name}")
+    return names
+
+
+def _flatten(item: dict, prefix: str = "", row: dict = None) -> dict:
+    row = {} if row is None else row
+    for key, value in item.items():
+        if isinstance(value, dict):
+            _flatten(value, f"{prefix}{key}.", row)
+        elif isinstance(value, list):
+            row[f"{prefix}{key}"] = json.dumps(value, sort_keys=True)
+        else:
+            row[f"{prefix}{key}"] = value
+    return row
+
+
+def _open(path: str, position: int = None):
+    """
+    Open the output file of an export in binary mode, truncated to position
+    when resuming. The output must still hold everything up to position.
+    """
+    if not position:
+        return open(path, "wb")  # pylint: disable=consider-using-with
+
+    try:
+        file = open(path, "r+b")  # pylint: disable=consider-using-with
+    except FileNotFoundError:
+        raise click.UsageError(
+            f"Cannot resume, the output {path} is missing: run again with --restart"
+        ) from None
+    if os.fstat(file.fileno()).st_size < position:
+        file.close()
+        raise click.UsageError(
+            f"Cannot resume, the output {path} is shorter than its checkpoint: "
+            "run again with --restart"
+        )
+    file.truncate(position)
+    file.seek(0, io.SEEK_END)
+    return file
+
+
+class Sink(ABC):
+    """
+    Output of an export. position is saved in the checkpoint once write()
+    reports the output durable, and a resumed export starts from it.
+    """
+
+    def __init__(self, path: str, resource: type):
+        self.path = path
+        self.resource = resource
+
+    @property
+    @abstractmethod
+    def position(self) -> int:
+        pass
+
+    @abstractmethod
+    def write(self, items: List[dict]) -> bool:
+        pass
+
+    def close(self):
+        pass
+
+
+class NdjsonSink(Sink):
+    def __init__(
+        self, path: str, resource: type, position: int = None, codec: Codec = None
+    ):
+        super().__init__(path, resource)
+        self.dumps = get_codec(codec).dumps
+        self.file = _open(path, position)
+
+    @property
+    def position(self) -> int:
+        return self.file.tell()
+
+    def write(self, items: List[dict]) -> bool:
+        dumps = self.dumps
+        self.file.write(b"".join(dumps(item) + b"\n" for item in items))
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return True
+
+    def close(self):
+        self.file.close()
+
+
+class CsvSink(Sink):
+    """
+    CSV file with a header row. The text is written through to a binary
+    file, so position is a byte offset rather than a text mode cookie.
+    """
+
+    def __init__(self, path: str, resource: type, position: int = None):
+        super().__init__(path, resource)
+        self.raw = _open(path, position)
+        self.file = io.TextIOWrapper(
+            self.raw, encoding="utf-8", newline="", write_through=True
+        )
+        self.writer = csv.DictWriter(
+            self.file, columns(resource), extrasaction="ignore"
+        )
+        if not position:
+            self.writer.writeheader()
+
+    @property
+    def position(self) -> int:
+        return self.raw.tell()
+
+    def write(self, items: List[dict]) -> bool:
+        self.writer.writerows(_flatten(item) for item in items)
+        self.file.flush()
+        os.fsync(self.raw.fileno())
+        return True
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetSink(Sink):
+    """
+    Parquet dataset directory with one part-NNNNN.parquet file per
+    rows_per_part records. Records are only durable once their part has been
+    written, and a resumed export removes the parts written after its
+    checkpoint.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        resource: type,
+        position: int = None,
+        rows_per_part: int = 100000,
+    ):
+        super().__init__(path, resource)
+        if pq is None:
+            raise click.UsageError(
+                "Parquet export requires pyarrow, install it with: "
+                "pip install pax8[columnar]"
+            )
+        os.makedirs(path, exist_ok=True)
+        self.parts = position or 0
+        missing = [
+            part
+            for part in range(self.parts)
+            if not os.path.exists(os.path.join(path, f"part-{part:05d}.parquet"))
+        ]
+        if missing:
+            raise click.UsageError(
+                f"Cannot resume, part {missing[0]} of the output {path} is missing: "
+                "run again with --restart"
+            )
+        self.rows_per_part = rows_per_part
+        self.buffer: List[dict] = []
+        for name in os.listdir(path):
+            if name.startswith("part-") and int(name[5:10]) >= self.parts:
+                os.remove(os.path.join(path, name))
+
+    @property
+    def position(self) -> int:
+        return self.parts
+
+    def flush(self):
+        if not self.buffer:
+            return
+        table = ColumnarBatch.from_items(self.resource, self.buffer).to_arrow()
+        pq.write_table(
+            table, os.path.join(self.path, f"part-{self.parts:05d}.parquet")
+        )
+        self.parts += 1
+        self.buffer = []
+
+    def write(self, items: List[dict]) -> bool:
+        self.buffer += items
+        if len(self.buffer) < self.rows_per_part:
+            return False
+        self.flush()
+        return True
+
+    def close(self):
+        self.flush()
+
+
+class Progress:
+    def __init__(self, enabled: bool = True, interval: float = 0.5):
+        self.enabled = enabled
+        self.interval = interval
+        self.records = self.pages = self.parents = 0
+        self.started = self.shown = time.monotonic()
+
+    def line(self) -> str:
+        elapsed = time.monotonic() - self.started
+        rate = self.records / elapsed if elapsed else 0
+        parents = f", {self.parents} parents" if self.parents else ""
+        return (
+            f"{self.records} records, {self.pages} pages{parents} "
+            f"in {elapsed:.0f}s ({rate:.0f}/s)"
+        )
+
+    def update(self, batch: Batch):
+        self.records += len(batch.items)
+        self.pages += batch.page is not None
+        self.parents += batch.parent is not None
+        now = time.monotonic()
+        if self.enabled and now - self.shown >= self.interval:
+            self.shown = now
+            click.echo(f"\r{self.line()}", err=True, nl=False)
+
+    def finish(self):
+        if self.enabled:
+            click.echo(f"\r{self.line()}", err=True)
+
+
+@click.group()
+@click.version_option(__version__)
+def main():
+    """Pax8 API command line tool."""
+
+
+@main.command()
+@click.argument("resource", type=click.Choice(list(EXPORTS)))
+@click.option(
+    "-o", "--output", required=True, help="Output file, or directory for Parquet."
+)
+@click.option(
+    "-f",
+    "--format",
+    "fmt",
+    type=click.Choice(["ndjson", "csv", "parquet"]),
+    help="Output format, by default from the output extension (else ndjson).",
+)
+@click.option("--filter", "filters", multiple=True, metavar="KEY=VALUE")
+@click.option(
+    "--parent-filter",
+    "parent_filters",
+    multiple=True,
+    metavar="KEY=VALUE",
+    help="Filter of the parents of nested resources, e.g. invoiceDate=2023-01-31.",
+)
+@click.option(
+    "--parent",
+    "parents",
+    multiple=True,
+    metavar="ID",
+    help="Only export the nested resources of these parents.",
+)
+@click.option("--page-size", default=200, show_default=True)
+@click.option(
+    "--concurrency",
+    default=4,
+    show_default=True,
+    help="Parents fetched at once for nested resources.",
+)
+@click.option(
+    "--restart",
+    is_flag=True,
+    help="Ignore the checkpoint of an interrupted export and start over.",
+)
+@click.option("--quiet", is_flag=True, help="Do not report progress.")
+@click.option("--client-id", envvar="PAX8_CLIENT_ID", required=True)
+@click.option("--client-secret", envvar="PAX8_CLIENT_SECRET", required=True)
+@click.option("--token-cache", default="~/pax8_token.json", show_default=True)
+@click.option("--base-url", default="https://api.pax8.com/v1/", hidden=True)
+@click.option(
+    "--login-url", default="https://login.pax8.com/oauth/token", hidden=True
+)
+# pylint: disable=too-many-arguments,too-many-locals
+def export(
+    resource,
+    output,
+    fmt,
+    filters,
+    parent_filters,
+    parents,
+    page_size,
+    concurrency,
+    restart,
+    quiet,
+    client_id,
+    client_secret,
+    token_cache,
+    base_url,
+    login_url,
+):
+    """
+    Export RESOURCE to NDJSON, CSV or Parquet.
+
+    Nested resources are fetched for every parent (e.g. the items of every
+    invoice) on --concurrency threads. An interrupted export resumes from
+    OUTPUT.checkpoint when run again with the same arguments.
+    """
+    spec = EXPORTS[resource]
+    if spec.parent is None and (parents or parent_filters):
+        raise click.BadParameter(
+            f"{resource} are not nested", param_hint="--parent/--parent-filter"
+        )
+
+    fmt = fmt or FORMATS.get(os.path.splitext(output)[1].lower(), "ndjson")
+    filter = parse_filter(spec, filters)
+    parent_filter = (
+        parse_filter(EXPORTS[spec.parent], parent_filters)
+        if spec.parent
+        else fi.ListFilter
+    )
+
+    client = Pax8Client(
+        client_id,
+        client_secret,
+        cache_location=token_cache,
+        base_url=base_url,
+        login_url=login_url,
+    )
+    sinks = {
+        "ndjson": lambda position: NdjsonSink(
+            output, spec.resource, position, client.conn.codec
+        ),
+        "csv": lambda position: CsvSink(output, spec.resource, position),
+        "parquet": lambda position: ParquetSink(output, spec.resource, position),
+    }
+    try:
+        try:
+            job = crawl(
+                client.conn,
+                resource,
+                filter,
+                parent_filter,
+                parents=parents,
+                checkpoint=f"{output.rstrip(os.sep)}.checkpoint",
+                concurrency=concurrency,
+                page_size=page_size,
+                identity={"format": fmt, "parents": list(parents)},
+                restart=restart,
+            )
+        except ValueError as e:
+            raise click.UsageError(f"{e} with --restart") from e
+
+        progress = Progress(not quiet and sys.stderr.isatty())
+        job.run(sinks[fmt](job.position), progress.update)
+        progress.finish()
+    finally:
+        client.conn.close()
+
+
+if __name__ == "__main__":
+    main()  # pylint: disable=no-value-for-parameter
@@ -0,0 +1,179 @@
+"""
+Pluggable JSON codecs for decoding responses and encoding payloads.
+
+The fastest installed backend is selected automatically, in the order
+orjson, msgspec, ujson and the standard library json module. A backend can
+also be chosen by name, e.g. RestClient(..., codec="ujson").
+"""
+import json
+from abc import ABC, abstractmethod
+from dataclasses import field, make_dataclass
+from typing import Dict, List, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover
+    msgspec = None
+
+try:
+    import ujson
+except ImportError:  # pragma: no cover
+    ujson = None
+
+
+class Codec(ABC):
+    """
+    JSON backend. loads accepts str or bytes, dumps returns bytes with sorted
+    keys.
+    """
+
+    name: str = None
+    typed = False
+
+    @abstractmethod
+    def loads(self, data: Union[bytes, str]):
+        pass
+
+    @abstractmethod
+    def dumps(self, obj) -> bytes:
+        pass
+
+
+class JsonCodec(Codec):
+    name = "json"
+
+    def loads(self, data: Union[bytes, str]):
+        return json.loads(data)
+
+    def dumps(self, obj) -> bytes:
+        return json.dumps(obj, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+class TypedCodec(Codec):
+    """
+    Codec that can also decode a response straight into resource classes with
+    decode() and decode_content(), without building the intermediate dicts.
+    Typed decoding is used while typed is set.
+    """
+
+    typed = True
+
+    @abstractmethod
+    def decode(self, data: bytes, typ: type):
+        pass
+
+    @abstractmethod
+    def decode_content(self, data: bytes, typ: type) -> list:
+        pass
+
+
+class OrjsonCodec(Codec):
+    name = "orjson"
+
+    def loads(self, data: Union[bytes, str]):
+        return orjson.loads(data)
+
+    def dumps(self, obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)
+
+
+class UjsonCodec(Codec):
+    name = "ujson"
+
+    def loads(self, data: Union[bytes, str]):
+        return ujson.loads(data)
+
+    def dumps(self, obj) -> bytes:
+        return ujson.dumps(obj, sort_keys=True).encode("utf-8")
+
+
+class MsgspecCodec(TypedCodec):
+    """
+    msgspec backend. With typed=True, resources are decoded directly from the
+    response bytes into the resource dataclasses, including nested resources,
+    enums and dates; payloads that do not validate against the declared
+    types fall back to the regular decoder, parsing the body a second time.
+    Some real payloads do not match the annotations (e.g. a numeric
+    Subscription.quantity), so typed decoding is opt-in.
+
+    Unlike objectify, which raises TypeError on fields the class does not
+    declare, typed decoding ignores them, and it does not intern the INTERN
+    fields of the classes.
+    """
+
+    name = "msgspec"
+
+    def __init__(self, typed: bool = False):
+        self.typed = typed
+        self.__loads = msgspec.json.Decoder().decode
+        self.__decoders: Dict[type, "msgspec.json.Decoder"] = {}
+        self.__pages: Dict[type, type] = {}
+
+    def loads(self, data: Union[bytes, str]):
+        return self.__loads(data)
+
+    def dumps(self, obj) -> bytes:
+        return msgspec.json.encode(obj, order="sorted")
+
+    def _decoder(self, typ) -> "msgspec.json.Decoder":
+        decoder = self.__decoders.get(typ)
+        if decoder is None:
+            decoder = self.__decoders[typ] = msgspec.json.Decoder(typ)
+        return decoder
+
+    def decode(self, data: bytes, typ: type):
+        return self._decoder(typ).decode(data)
+
+    def decode_content(self, data: bytes, typ: type) -> list:
+        """
+        Decode the content list of a page, ignoring the page block.
+        """
+        page = self.__pages.get(typ)
+        if page is None:
+            page = self.__pages[typ] = make_dataclass(
+                f"{typ.__name__}Content",
+                [("content", List[typ], field(default_factory=list))],
+            )
+        return self.decode(data, page).content
+
+
+BACKENDS = {
+    "orjson": (orjson, OrjsonCodec),
+    "msgspec": (msgspec, MsgspecCodec),
+    "ujson": (ujson, UjsonCodec),
+    "json": (json, JsonCodec),
+}
+
+_default = None
+
+
+def get_codec(codec: Union[str, Codec] = None) -> Codec:
+    """
+    Returns a codec instance: the given one, the backend with the given name,
+    or for None the fastest installed backend.
+    """
+    global _default  # pylint: disable=global-statement
+    if isinstance(codec, Codec):
+        return codec
+
+    if codec is None:
+        if _default is None:
+            _default = next(
+                backend() for module, backend in BACKENDS.values() if module is not None
+            )
+        return _default
+
+    if codec not in BACKENDS:
+        raise ValueError(f"Unknown JSON codec {codec}, use one of {list(BACKENDS)}")
+
+    module, backend = BACKENDS[codec]
+    if module is None:
+        raise ImportError(
+            f"The {codec} codec is not installed, install it with: pip install {codec}"
+        )
+    return backend()
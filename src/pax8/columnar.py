@@ -0,0 +1,293 @@
+"""
+Columnar results for large listings such as invoice items and usage lines.
+
+Records are appended straight from the JSON content of each page into typed
+column arrays, without creating a resource object per row. The columns can be
+exported to NumPy, pandas or Arrow when those packages are installed.
+"""
+from abc import ABC, abstractmethod
+from array import array
+from dataclasses import fields
+from datetime import datetime, date, timezone
+from enum import Enum
+from functools import lru_cache
+from typing import Dict, Iterable, List
+
+NULL_INT64 = -(2**63)
+EPOCH = date(1970, 1, 1).toordinal()
+EPOCH_DATETIME = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+@lru_cache(maxsize=4096)
+def _days(value: str) -> int:
+    return date.fromisoformat(value[:10]).toordinal() - EPOCH
+
+
+def _epoch_microseconds(value: datetime) -> int:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    delta = value - EPOCH_DATETIME
+    return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+
+
+@lru_cache(maxsize=4096)
+def _microseconds(value: str) -> int:
+    if value.endswith("Z"):
+        value = value[:-1] + "+00:00"
+    return _epoch_microseconds(datetime.fromisoformat(value))
+
+
+def _import(name: str):
+    try:
+        return __import__(name)
+    except ImportError as e:
+        raise ImportError(
+            f"Exporting columns requires {name}, install it with: pip install {name}"
+        ) from e
+
+
+class Column(ABC):
+    def __init__(self, name: str):
+        self.name = name
+
+    @abstractmethod
+    def append(self, value):
+        pass
+
+    def to_numpy(self):
+        values = _import("numpy").empty(len(self.values), dtype=object)
+        values[:] = self.values
+        return values
+
+    def to_arrow(self):
+        return _import("pyarrow").array(self.to_numpy(), from_pandas=True)
+
+    def to_pandas(self):
+        return self.to_numpy()
+
+
+class NumericColumn(Column):
+    """
+    float64 values, with NaN for missing values.
+    """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.values = array("d")
+
+    def append(self, value):
+        try:
+            self.values.append(float(value))
+        except (TypeError, ValueError):
+            self.values.append(float("nan"))
+
+    def to_numpy(self):
+        return _import("numpy").frombuffer(self.values, dtype="float64")
+
+
+class BoolColumn(Column):
+    """
+    int8 values, 1 for true, 0 for false and -1 for missing values.
+    """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.values = array("b")
+
+    def append(self, value):
+        self.values.append(-1 if value is None else int(bool(value)))
+
+    def to_numpy(self):
+        np = _import("numpy")
+        values = np.frombuffer(self.values, dtype="int8")
+        if (values < 0).any():
+            return np.where(values < 0, None, values.astype(bool)).astype(object)
+        return values.view(bool)
+
+    def to_pandas(self):
+        pd = _import("pandas")
+        values = _import("numpy").frombuffer(self.values, dtype="int8")
+        return pd.arrays.BooleanArray(values > 0, values < 0)
+
+
+class DateColumn(Column):
+    """
+    int64 days since 1970-01-01, with the NaT sentinel for missing values,
+    matching the layout of numpy datetime64[D].
+    """
+
+    UNIT = "D"
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.values = array("q")
+
+    def _parse(self, value) -> int:
+        if isinstance(value, datetime):
+            return value.toordinal() - EPOCH
+        if isinstance(value, date):
+            return value.toordinal() - EPOCH
+        return _days(value)
+
+    def append(self, value):
+        try:
+            self.values.append(NULL_INT64 if value is None else self._parse(value))
+        except (TypeError, ValueError):
+            self.values.append(NULL_INT64)
+
+    def to_numpy(self):
+        np = _import("numpy")
+        return np.frombuffer(self.values, dtype=f"datetime64[{self.UNIT}]")
+
+    def to_arrow(self):
+        return _import("pyarrow").array(self.to_numpy(), from_pandas=True)
+
+
+class DatetimeColumn(DateColumn):
+    """
+    int64 microseconds since the epoch (UTC), matching numpy datetime64[us].
+    """
+
+    UNIT = "us"
+
+    def _parse(self, value) -> int:
+        if isinstance(value, datetime):
+            return _epoch_microseconds(value)
+        if isinstance(value, date):
+            return (value.toordinal() - EPOCH) * 86400000000
+        return _microseconds(value)
+
+
+class StringColumn(Column):
+    """
+    Dictionary encoded strings: int32 codes into a list of distinct values,
+    with -1 for missing values. Enum members are stored by value.
+    """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.codes = array("i")
+        self.dictionary: List[str] = []
+        self.index: Dict[str, int] = {}
+
+    def append(self, value):
+        if value is None:
+            self.codes.append(-1)
+            return
+
+        if isinstance(value, Enum):
+            value = value.value
+
+        code = self.index.get(value)
+        if code is None:
+            code = self.index[value] = len(self.dictionary)
+            self.dictionary.append(value)
+        self.codes.append(code)
+
+    @property
+    def values(self) -> list:
+        dictionary = self.dictionary
+        return [dictionary[code] if code >= 0 else None for code in self.codes]
+
+    def codes_numpy(self):
+        return _import("numpy").frombuffer(self.codes, dtype="int32")
+
+    def to_pandas(self):
+        return _import("pandas").Categorical.from_codes(
+            self.codes_numpy(), categories=self.dictionary
+        )
+
+    def to_arrow(self):
+        pa = _import("pyarrow")
+        codes = self.codes_numpy()
+        return pa.DictionaryArray.from_arrays(
+            pa.array(codes, mask=codes < 0), pa.array(self.dictionary, pa.string())
+        )
+
+
+class ObjectColumn(Column):
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.values = []
+
+    def append(self, value):
+        self.values.append(value)
+
+
+def _column_type(typ) -> type:
+    if isinstance(typ, type):
+        if issubclass(typ, bool):
+            return BoolColumn
+        if issubclass(typ, (int, float)):
+            return NumericColumn
+        if issubclass(typ, datetime):
+            return DatetimeColumn
+        if issubclass(typ, date):
+            return DateColumn
+        if issubclass(typ, (str, Enum)):
+            return StringColumn
+    return ObjectColumn
+
+
+class ColumnarBatch:
+    """
+    Typed columns for the fields of a resource class, filled from raw JSON
+    dicts. Numeric fields become float64 arrays, booleans int8, dates and
+    datetimes int64 datetime64 layouts, and strings and enums are dictionary
+    encoded. The NumPy export shares the column buffers, so no more rows can
+    be appended once it has been used.
+
+        batch = client.Invoice.list_items(invoice_id, columnar=True)
+        frame = batch.to_pandas()
+    """
+
+    def __init__(self, resource: type, columns: Iterable[str] = None):
+        self.resource = resource
+        self.length = 0
+        self.columns: Dict[str, Column] = {
+            field.name: _column_type(field.type)(field.name)
+            for field in fields(resource)
+            if columns is None or field.name in columns
+        }
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, name: str) -> Column:
+        return self.columns[name]
+
+    @classmethod
+    def from_items(
+        cls, resource: type, items: Iterable[dict], columns: Iterable[str] = None
+    ) -> "ColumnarBatch":
+        batch = cls(resource, columns)
+        batch.extend(items)
+        return batch
+
+    def extend(self, items: Iterable[dict]):
+        appenders = [(name, column.append) for name, column in self.columns.items()]
+        for item in items:
+            get = item.get
+            for name, append in appenders:
+                append(get(name))
+            self.length += 1
+
+    def to_numpy(self) -> dict:
+        """
+        Returns a NumPy array per column. Numeric, boolean and date columns
+        share the column buffers; string columns are materialized as object
+        arrays (use column.codes_numpy() and column.dictionary to keep them
+        encoded).
+        """
+        return {name: column.to_numpy() for name, column in self.columns.items()}
+
+    def to_pandas(self):
+        return _import("pandas").DataFrame(
+            {name: column.to_pandas() for name, column in self.columns.items()}
+        )
+
+    def to_arrow(self):
+        pa = _import("pyarrow")
+        return pa.table(
+            {name: column.to_arrow() for name, column in self.columns.items()}
+        )
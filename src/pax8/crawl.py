@@ -0,0 +1,239 @@
+"""
+Resumable crawls of a list endpoint, or of the nested resources of every
+listed record, with progress saved to a durable checkpoint file.
+"""
+import os
+from dataclasses import dataclass
+from datetime import date
+from typing import Iterable, Iterator, List, Tuple
+
+from . import filters as fi
+from .files import read_json, write_json
+from .workers import bounded_map
+
+
+@dataclass
+class Batch:
+    """
+    Records of one page, or all records of one parent for nested crawls.
+    """
+
+    items: List[dict]
+    page: int = None
+    parent: str = None
+
+
+class Checkpoint:
+    """
+    Crawl state in a JSON file, atomically replaced and fsynced on every
+    save, so it always describes a consistent position.
+    """
+
+    def __init__(self, path: str):
+        self.path = os.path.expanduser(path)
+
+    def load(self) -> dict:
+        return read_json(self.path, None)
+
+    def save(self, state: dict):
+        write_json(self.path, state)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def _qs(filter: fi.ListFilter, page_size: int) -> dict:
+    qs = {
+        key: value.isoformat() if isinstance(value, date) else value
+        for key, value in filter.get_qs().items()
+    }
+    qs["size"] = page_size
+    return qs
+
+
+# pylint: disable=too-many-instance-attributes
+class CrawlJob:
+    """
+    Crawl every record of resource, or with nested the nested records of
+    every listed resource (e.g. the items of every invoice), as raw JSON
+    dicts in batches.
+
+    With a checkpoint, the position is saved after each batch: the last
+    completed page and the parents completed on the page being crawled. A
+    job created again with the same arguments resumes from there, and the
+    checkpoint is removed once the crawl completes.
+
+        job = client.Invoice.crawl(
+            "invoices.checkpoint",
+            filter=InvoiceFilter(invoiceDateRangeStart=date(2023, 1, 1)),
+            nested=InvoiceItem,
+        )
+        for batch in job:
+            store(batch.parent, batch.items)
+
+    Iterating, a batch counts as done once the next one is requested, so a
+    consumer that stores each batch before asking for more loses nothing,
+    and sees a batch again only if it crashed while storing it. run() writes
+    to a sink instead and also saves the sink position, so that resuming
+    truncates the output to it and no record is written twice. A sink has a
+    write(items) method returning whether the output is durable, a position
+    property and a close() method; it is opened at job.position.
+
+    parents replaces the listing of the parent ids, e.g. to crawl the usage
+    lines of known usage summaries. Parents are then tracked individually.
+    """
+
+    def __init__(
+        self,
+        conn,
+        resource: type,
+        filter: fi.ListFilter = fi.ListFilter,
+        nested: type = None,
+        nested_filter: fi.ListFilter = fi.ListFilter,
+        checkpoint: str = None,
+        parents: Iterable[str] = None,
+        concurrency: int = 4,
+        page_size: int = 200,
+        identity: dict = None,
+        restart: bool = False,
+    ):
+        self.conn = conn
+        self.resource = resource
+        self.nested = nested
+        self.qs = _qs(filter, page_size)
+        self.nested_qs = _qs(nested_filter, page_size)
+        self.parents = parents
+        self.concurrency = concurrency
+        self.checkpoint = Checkpoint(checkpoint) if checkpoint else None
+        self.identity = {
+            "resource": resource.RESOURCE,
+            "nested": nested.RESOURCE if nested is not None else None,
+            "qs": self.qs,
+            "nested_qs": self.nested_qs if nested is not None else None,
+            **(identity or {}),
+        }
+        self.__durable = True
+        self.__sink = None
+
+        state = None
+        if self.checkpoint is not None:
+            if restart:
+                self.checkpoint.clear()
+            state = self.checkpoint.load()
+        if state and state.get("identity") != self.identity:
+            raise ValueError(
+                f"The checkpoint {self.checkpoint.path} belongs to another crawl, "
+                "remove it or restart the crawl"
+            )
+        self.state = state or {
+            "identity": self.identity,
+            "page": 0,
+            "parents": [],
+            "position": None,
+        }
+
+    @property
+    def position(self):
+        """
+        Sink position saved by the interrupted run, None for a new crawl.
+        """
+        return self.state["position"]
+
+    def pages(self, parent: str = None, start: int = 0) -> Iterator[Tuple[int, list]]:
+        """
+        Yield the number and records of every page from start on, of the
+        resource list or of the nested list of parent.
+        """
+        number = start
+        while True:
+            if parent is None:
+                res = self.conn.list_resource(
+                    self.resource.RESOURCE,
+                    {**self.qs, "page": number},
+                    content_only=False,
+                )
+            else:
+                res = self.conn.list_nested_resource(
+                    self.resource.RESOURCE,
+                    parent,
+                    self.nested.RESOURCE,
+                    {**self.nested_qs, "page": number},
+                    content_only=False,
+                )
+            yield number, res.get("content", [])
+
+            page = res.get("page")
+            number += 1
+            if not page or number >= page["totalPages"]:
+                return
+
+    def records(self, parent: str) -> List[dict]:
+        return [item for _, items in self.pages(parent) for item in items]
+
+    def _commit(self):
+        if self.checkpoint is None or not self.__durable:
+            return
+        if self.__sink is not None:
+            self.state["position"] = self.__sink.position
+        self.checkpoint.save(self.state)
+
+    def _todo(self, ids: Iterable[str]) -> Iterator[str]:
+        seen = set(self.state["parents"])
+        for id in ids:
+            if id not in seen:
+                seen.add(id)
+                yield id
+
+    def _fan_out(self, ids: Iterable[str]) -> Iterator[Batch]:
+        for id, items in bounded_map(
+            lambda id: (id, self.records(id)),
+            self._todo(ids),
+            self.concurrency,
+            ordered=False,
+        ):
+            yield Batch(items, parent=id)
+            self.state["parents"].append(id)
+            self._commit()
+
+    def batches(self) -> Iterator[Batch]:
+        state = self.state
+        if self.nested is not None and self.parents is not None:
+            yield from self._fan_out(self.parents)
+            return
+
+        for number, items in self.pages(start=state["page"]):
+            if self.nested is None:
+                yield Batch(items, page=number)
+            else:
+                yield from self._fan_out(item["id"] for item in items)
+            state["page"] = number + 1
+            state["parents"] = []
+            self._commit()
+
+    def __iter__(self) -> Iterator[Batch]:
+        yield from self.batches()
+        if self.checkpoint is not None:
+            self.checkpoint.clear()
+
+    def run(self, sink, progress=None) -> int:
+        """
+        Write every record to sink, returning the number of records written.
+        progress, if given, is called with each batch.
+        """
+        self.__sink = sink
+        count = 0
+        try:
+            for batch in self.batches():
+                self.__durable = sink.write(batch.items)
+                count += len(batch.items)
+                if progress is not None:
+                    progress(batch)
+            sink.close()
+        finally:
+            self.__sink = None
+            self.__durable = True
+
+        if self.checkpoint is not None:
+            self.checkpoint.clear()
+        return count
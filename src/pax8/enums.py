@@ -3,6 +3,7 @@ from enum import Enum
 
 class ResponseType(Enum):
     OK = 200
+    NOT_MODIFIED = 304
     BAD_REQUEST = 400
     UNAUTHORIZED = 401
     FORBIDDEN = 403
@@ -30,6 +31,7 @@ class SubscriptionSortBy(SortBy):
     CREATED_DATE = "createdDate"
     BILLING_START = "billingStart"
     PRICE = "price"
+    UPDATED_DATE = "updatedDate"
 
 
 class InvoiceSortBy(SortBy):
@@ -65,6 +67,7 @@ class CompanySortBy(SortBy):
     COUNTRY = "country"
     STATE_OR_PROVINCE = "stateOrProvince"
     POSTAL_CODE = "postalCode"
+    UPDATED_DATE = "updatedDate"
 
 
 class ProductSortBy(Enum):
@@ -166,3 +169,9 @@ class InvoiceStatus(Enum):
     VOID = "Void"
     CARRIED = "Carried"
     NOTHING_DUE = "Nothing Due"
+
+
+class SyncEventType(Enum):
+    CREATED = "created"
+    UPDATED = "updated"
+    DELETED = "deleted"
@@ -8,3 +8,7 @@ class UnexpectedResponseException(Pax8Exception):
 
 class UnableToCacheException(Pax8Exception):
     pass
+
+
+class RateLimitedException(UnexpectedResponseException):
+    pass
@@ -0,0 +1,35 @@
+import os
+import json
+import tempfile
+
+
+def read_json(path: str, default=None, encoding: str = "utf-8"):
+    try:
+        with open(os.path.expanduser(path), "r", encoding=encoding) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+    except json.JSONDecodeError:
+        return default
+
+
+def write_json(path: str, data, encoding: str = "utf-8"):
+    """
+    Atomically replace the file at path with data encoded as JSON, so readers
+    in other threads or processes never see a partially written file.
+    """
+    path = os.path.expanduser(path)
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding=encoding) as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
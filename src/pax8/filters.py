@@ -1,6 +1,6 @@
 from json import dumps as jsdump_str
 from datetime import date
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
 from . import enums as pe
 
 
@@ -25,7 +25,8 @@ class ListFilter:
 
     def __iter__(self) -> dict:
         self_dict = {}
-        for key, value in self.__dict__.items():
+        for field in fields(self):
+            key, value = field.name, getattr(self, field.name)
             if value is not None:
                 if isinstance(value, pe.Enum):
                     value = value.value
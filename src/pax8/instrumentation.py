@@ -0,0 +1,292 @@
+"""
+Request metrics and tracing hooks for the REST clients.
+"""
+import threading
+from bisect import bisect_left
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Tuple
+
+try:
+    from opentelemetry import trace
+except ImportError:  # pragma: no cover
+    trace = None
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PHASES = ("network", "decode", "objectify")
+
+
+class Histogram:
+    """
+    Cumulative-friendly histogram: counts[i] is the number of observations
+    <= buckets[i], with a last slot for larger values.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """
+        Upper bound of the bucket holding the q-th quantile.
+        """
+        rank, seen = q * self.count, 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank and seen:
+                return bound
+        return float("inf")
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "buckets": dict(zip(self.buckets + (float("inf"),), self.counts)),
+        }
+
+
+class EndpointMetrics:
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.reauthentications = 0
+        self.bytes = 0
+        self.statuses = Counter()
+        self.cache = Counter()
+        self.timings = {phase: Histogram(buckets) for phase in PHASES}
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "reauthentications": self.reauthentications,
+            "bytes": self.bytes,
+            "statuses": dict(self.statuses),
+            "cache": dict(self.cache),
+            "timings": {
+                phase: histogram.as_dict() for phase, histogram in self.timings.items()
+            },
+        }
+
+
+@dataclass
+class RequestEvent:
+    """
+    One HTTP attempt, passed to the before hooks when it starts and to the
+    after hooks once it has a response or an error.
+    """
+
+    method: str
+    url: str
+    endpoint: str
+    params: dict = None
+    attempt: int = 0
+    status: int = None
+    bytes: int = 0
+    elapsed: float = None
+    error: BaseException = None
+    context: dict = field(default_factory=dict)
+
+
+class Instrumentation:
+    """
+    Collects per endpoint template metrics ("companies/{id}/contacts"): the
+    request count, status codes, errors, retries, reauthentications after a
+    401 (not counted as retries), bytes received, response cache hits and
+    misses, and latency histograms split into network, JSON
+    decode and objectify time. Hooks registered with before() and after()
+    are called around every HTTP attempt.
+
+        metrics = Instrumentation()
+        client = Pax8Client(id, secret, instrumentation=metrics)
+        ...
+        print(metrics.snapshot()["companies"]["timings"]["network"])
+
+    Clients without instrumentation skip all of this.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self.endpoints: Dict[str, EndpointMetrics] = {}
+        self.before_hooks: List[Callable[[RequestEvent], None]] = []
+        self.after_hooks: List[Callable[[RequestEvent], None]] = []
+        self.__lock = threading.Lock()
+
+    def before(self, hook: Callable[[RequestEvent], None]) -> Callable:
+        self.before_hooks.append(hook)
+        return hook
+
+    def after(self, hook: Callable[[RequestEvent], None]) -> Callable:
+        self.after_hooks.append(hook)
+        return hook
+
+    def _metrics(self, endpoint: str) -> EndpointMetrics:
+        metrics = self.endpoints.get(endpoint)
+        if metrics is None:
+            metrics = self.endpoints[endpoint] = EndpointMetrics(self.buckets)
+        return metrics
+
+    def started(
+        self,
+        method: str,
+        url: str,
+        endpoint: str,
+        params: dict = None,
+        attempt: int = 0,
+    ) -> RequestEvent:
+        event = RequestEvent(method, url, endpoint, params, attempt)
+        for hook in self.before_hooks:
+            hook(event)
+        return event
+
+    def finished(
+        self,
+        event: RequestEvent,
+        elapsed: float,
+        status: int = None,
+        size: int = 0,
+        error: BaseException = None,
+    ):
+        event.elapsed = elapsed
+        event.status = status
+        event.bytes = size
+        event.error = error
+
+        with self.__lock:
+            metrics = self._metrics(event.endpoint)
+            metrics.requests += 1
+            metrics.bytes += event.bytes
+            metrics.timings["network"].observe(elapsed)
+            if error is not None:
+                metrics.errors += 1
+            else:
+                metrics.statuses[event.status] += 1
+
+        for hook in self.after_hooks:
+            hook(event)
+
+    def retried(self, endpoint: str):
+        with self.__lock:
+            self._metrics(endpoint).retries += 1
+
+    def reauthenticated(self, endpoint: str):
+        with self.__lock:
+            self._metrics(endpoint).reauthentications += 1
+
+    def cache(self, endpoint: str, outcome: str):
+        """
+        Count a response cache lookup: "hit", "miss" or "revalidated".
+        """
+        with self.__lock:
+            self._metrics(endpoint).cache[outcome] += 1
+
+    def timing(self, endpoint: str, phase: str, seconds: float):
+        with self.__lock:
+            self._metrics(endpoint).timings[phase].observe(seconds)
+
+    def snapshot(self) -> dict:
+        with self.__lock:
+            return {
+                endpoint: metrics.as_dict()
+                for endpoint, metrics in sorted(self.endpoints.items())
+            }
+
+    def reset(self):
+        with self.__lock:
+            self.endpoints.clear()
+
+    def prometheus(self, prefix: str = "pax8") -> str:
+        """
+        Returns the metrics in the Prometheus text exposition format, e.g.
+        to serve from a /metrics endpoint.
+        """
+        snapshot = self.snapshot()
+        lines = []
+        for name, key in (
+            ("requests_total", "requests"),
+            ("errors_total", "errors"),
+            ("retries_total", "retries"),
+            ("reauthentications_total", "reauthentications"),
+            ("response_bytes_total", "bytes"),
+        ):
+            lines.append(f"# TYPE {prefix}_{name} counter")
+            lines += [
+                f'{prefix}_{name}{{endpoint="{endpoint}"}} {metrics[key]}'
+                for endpoint, metrics in snapshot.items()
+            ]
+
+        for name, key, label in (
+            ("responses_total", "statuses", "status"),
+            ("cache_total", "cache", "outcome"),
+        ):
+            lines.append(f"# TYPE {prefix}_{name} counter")
+            lines += [
+                f'{prefix}_{name}{{endpoint="{endpoint}",{label}="{value}"}} {count}'
+                for endpoint, metrics in snapshot.items()
+                for value, count in sorted(metrics[key].items())
+            ]
+
+        name = f"{prefix}_duration_seconds"
+        lines.append(f"# TYPE {name} histogram")
+        for endpoint, metrics in snapshot.items():
+            for phase, histogram in metrics["timings"].items():
+                labels = f'endpoint="{endpoint}",phase="{phase}"'
+                cumulative = 0
+                for bound, count in histogram["buckets"].items():
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'{name}_bucket{{{labels},le="{le}"}} {cumulative}')
+                lines += [
+                    f"{name}_sum{{{labels}}} {histogram['sum']}",
+                    f"{name}_count{{{labels}}} {histogram['count']}",
+                ]
+        return "\n".join(lines) + "\n"
+
+    def trace(self, tracer=None) -> "Instrumentation":
+        """
+        Record every HTTP attempt as an OpenTelemetry client span (requires
+        opentelemetry-api). Spans are started and ended on the requesting
+        thread.
+        """
+        if trace is None:
+            raise ImportError(
+                "Tracing requires OpenTelemetry, install it with: "
+                "pip install opentelemetry-api"
+            )
+        tracer = tracer or trace.get_tracer("pax8")
+
+        def start(event: RequestEvent):
+            event.context["span"] = tracer.start_span(
+                f"{event.method} {event.endpoint}",
+                kind=trace.SpanKind.CLIENT,
+                attributes={
+                    "http.method": event.method,
+                    "http.url": event.url,
+                    "pax8.endpoint": event.endpoint,
+                    "pax8.attempt": event.attempt,
+                },
+            )
+
+        def end(event: RequestEvent):
+            span = event.context.pop("span", None)
+            if span is None:
+                return
+            if event.status is not None:
+                span.set_attribute("http.status_code", event.status)
+            if event.error is not None:
+                span.record_exception(event.error)
+                span.set_status(trace.Status(trace.StatusCode.ERROR))
+            span.end()
+
+        self.before(start)
+        self.after(end)
+        return self
@@ -0,0 +1,238 @@
+"""
+Local SQLite mirror of Pax8 resources, for answering read-heavy queries
+without calling the API.
+"""
+import os
+import json
+import sqlite3
+import threading
+from enum import Enum
+from typing import Iterable, List
+from . import types as t
+from . import filters as fi
+from . import enums as en
+from .sync import SOURCES
+
+INDEXED = ("companyId", "productId", "status")
+
+RESOURCES = {
+    cls.RESOURCE: cls for cls in (t.Company, t.Subscription, t.Invoice, t.Product)
+}
+
+LISTERS = {
+    t.Company.RESOURCE: ("Company", fi.CompanyFilter),
+    t.Subscription.RESOURCE: ("Subscription", fi.SubscriptionFilter),
+    t.Invoice.RESOURCE: ("Invoice", fi.InvoiceFilter),
+    t.Product.RESOURCE: ("Product", fi.ProductFilter),
+}
+
+
+def _column(value):
+    return value.value if isinstance(value, Enum) else value
+
+
+class MirrorStore:
+    """
+    Stores companies, subscriptions, invoices and products in SQLite, with
+    indexes on id, companyId, productId and status. Queries return the same
+    resource objects as the API clients.
+
+        mirror = MirrorStore("~/pax8_mirror.db")
+        mirror.refresh(client)
+        mirror.subscriptions(companyId=company.id, status=SubscriptionStatus.ACTIVE)
+
+    Keep the mirror current by applying the events of a DeltaSync run:
+
+        mirror.apply(DeltaSync(client).run())
+    """
+
+    def __init__(self, location: str = "~/pax8_mirror.db"):
+        self.location = location
+        if location != ":memory:":
+            location = os.path.expanduser(location)
+            os.makedirs(os.path.dirname(location) or ".", exist_ok=True)
+
+        self.__lock = threading.Lock()
+        self.db = sqlite3.connect(location, check_same_thread=False)
+        if location != ":memory:":
+            self.db.execute("PRAGMA journal_mode=WAL")
+
+        with self.db:
+            for table in RESOURCES:
+                self._create(table)
+                for column in INDEXED:
+                    self.db.execute(
+                        f'CREATE INDEX IF NOT EXISTS "{table}_{column}" '
+                        f'ON "{table}" ({column})'
+                    )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.db.close()
+
+    def _create(self, table: str, temp: bool = False):
+        self.db.execute(
+            f'CREATE {"TEMP " if temp else ""}TABLE IF NOT EXISTS "{table}" ('
+            "id TEXT PRIMARY KEY, companyId TEXT, productId TEXT, "
+            "status TEXT, data TEXT NOT NULL)"
+        )
+
+    def _insert(self, table: str, values: list):
+        self.db.executemany(
+            f'INSERT OR REPLACE INTO "{table}" '
+            "(id, companyId, productId, status, data) VALUES (?, ?, ?, ?, ?)",
+            values,
+        )
+
+    def upsert(self, items: Iterable[t.Pax8Resource], table: str = None) -> int:
+        """
+        Store items, in their resource tables or all in table if given.
+        """
+        rows = {}
+        for item in items:
+            rows.setdefault(table or item.RESOURCE, []).append(
+                (
+                    item.id,
+                    getattr(item, "companyId", None),
+                    getattr(item, "productId", None),
+                    _column(getattr(item, "status", None)),
+                    item.serialize(),
+                )
+            )
+
+        with self.__lock, self.db:
+            for name, values in rows.items():
+                self._insert(name, values)
+
+        return sum(len(values) for values in rows.values())
+
+    def delete(self, resource: type, ids: Iterable[str]):
+        with self.__lock, self.db:
+            self.db.executemany(
+                f'DELETE FROM "{resource.RESOURCE}" WHERE id = ?',
+                [(id,) for id in ids],
+            )
+
+    def refresh(
+        self,
+        client: "Pax8Client",
+        resources: Iterable[str] = tuple(RESOURCES),
+        page_size: int = 200,
+        parallel: int = 1,
+        batch_size: int = 1000,
+    ):
+        """
+        Reload every record of the given resource types from the API,
+        replacing what was stored before. The records are loaded into a
+        temporary staging table and swapped in by a single transaction, so
+        readers see the old records until then, and a failed refresh leaves
+        them in place.
+
+        Records with a deletion status (a deleted company) are left out, as
+        apply() removes them, so a refresh and the sync events of the same
+        data give the same tables.
+        """
+        for resource in resources:
+            lister, filter = LISTERS[resource]
+            staging = f"{resource}_staging"
+            deleted = SOURCES[resource].deleted if resource in SOURCES else ()
+            with self.__lock, self.db:
+                self.db.execute(f'DROP TABLE IF EXISTS temp."{staging}"')
+                self._create(staging, temp=True)
+
+            batch = []
+            for item in getattr(client, lister).list(
+                filter(size=page_size), iterate=True, parallel=parallel
+            ):
+                if deleted and item.status in deleted:
+                    continue
+                batch.append(item)
+                if len(batch) >= batch_size:
+                    self.upsert(batch, staging)
+                    batch = []
+            self.upsert(batch, staging)
+
+            with self.__lock, self.db:
+                self.db.execute(f'DELETE FROM "{resource}"')
+                self.db.execute(
+                    f'INSERT INTO "{resource}" SELECT * FROM temp."{staging}"'
+                )
+                self.db.execute(f'DROP TABLE temp."{staging}"')
+
+    def apply(self, events: Iterable["SyncEvent"]) -> int:
+        count = 0
+        for event in events:
+            if event.type == en.SyncEventType.DELETED:
+                self.delete(RESOURCES[event.resource], [event.id])
+            else:
+                self.upsert([event.item])
+            count += 1
+        return count
+
+    def query(self, resource: type, **where) -> List[t.Pax8Resource]:
+        """
+        Returns the stored resources matching all of the given column values.
+        Only id and the indexed columns can be queried.
+        """
+        clauses, params = [], []
+        for column, value in where.items():
+            if column != "id" and column not in INDEXED:
+                raise ValueError(f"Cannot query on {column}, use id or one of {INDEXED}")
+            if value is None:
+                continue
+            clauses.append(f"{column} = ?")
+            params.append(_column(value))
+
+        sql = f'SELECT data FROM "{resource.RESOURCE}"'
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+
+        with self.__lock:
+            rows = self.db.execute(sql, params).fetchall()
+
+        return [resource.objectify(json.loads(data)) for (data,) in rows]
+
+    def get(self, resource: type, id: str) -> t.Pax8Resource:
+        found = self.query(resource, id=id)
+        return found[0] if found else None
+
+    def count(self, resource: type) -> int:
+        with self.__lock:
+            return self.db.execute(
+                f'SELECT COUNT(*) FROM "{resource.RESOURCE}"'
+            ).fetchone()[0]
+
+    def get_company(self, id: str) -> t.Company:
+        return self.get(t.Company, id)
+
+    def companies(self, status: en.CompanyStatus = None) -> List[t.Company]:
+        return self.query(t.Company, status=status)
+
+    def get_subscription(self, id: str) -> t.Subscription:
+        return self.get(t.Subscription, id)
+
+    def subscriptions(
+        self,
+        companyId: str = None,
+        productId: str = None,
+        status: en.SubscriptionStatus = None,
+    ) -> List[t.Subscription]:
+        return self.query(
+            t.Subscription, companyId=companyId, productId=productId, status=status
+        )
+
+    def get_invoice(self, id: str) -> t.Invoice:
+        return self.get(t.Invoice, id)
+
+    def invoices(
+        self, companyId: str = None, status: en.InvoiceStatus = None
+    ) -> List[t.Invoice]:
+        return self.query(t.Invoice, companyId=companyId, status=status)
+
+    def get_product(self, id: str) -> t.Product:
+        return self.get(t.Product, id)
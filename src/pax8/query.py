@@ -0,0 +1,404 @@
+"""
+Queries over list endpoints. Predicates the endpoint can filter on are sent
+in the query string, the others are checked on the records as they arrive:
+
+    query = client.Subscription.query(status="Active", quantity__gt=10)
+    print(query.explain())
+    for subscription in query:
+        ...
+"""
+import heapq
+from dataclasses import dataclass, field, fields
+from datetime import date, datetime
+from enum import Enum
+from itertools import chain, islice, product
+from typing import Any, Callable, Iterator, List, Tuple
+
+from . import filters as fi
+
+OPS = {
+    "eq": "=",
+    "ne": "!=",
+    "gt": ">",
+    "gte": ">=",
+    "lt": "<",
+    "lte": "<=",
+    "in": "in",
+    "contains": "contains",
+}
+# Filter fields that are not predicates
+RESERVED = ("page", "size", "sort", "sort_direction", "sortDirection")
+
+
+def _plain(value):
+    return value.value if isinstance(value, Enum) else value
+
+
+def _number(value):
+    """
+    Returns a numeric string as a float, and anything else as it is.
+    """
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            pass
+    return value
+
+
+def _comparable(left, right, order: bool = False) -> Tuple[Any, Any]:
+    """
+    Bring a record value and a predicate value to comparable types: enums
+    by value, datetimes against dates by day, and numeric strings as numbers
+    on either side. Two strings are only compared as numbers for ordering,
+    so that equality on text fields stays exact.
+    """
+    left, right = _plain(left), _plain(right)
+    if isinstance(left, datetime) and not isinstance(right, datetime):
+        left = left.date()
+    elif isinstance(right, datetime) and not isinstance(left, datetime):
+        right = right.date()
+    if isinstance(left, str) and isinstance(right, str):
+        if order:
+            number_left, number_right = _number(left), _number(right)
+            if not isinstance(number_left, str) and not isinstance(number_right, str):
+                return number_left, number_right
+    elif isinstance(left, str) and isinstance(right, (int, float)):
+        left = _number(left)
+    elif isinstance(right, str) and isinstance(left, (int, float)):
+        right = _number(right)
+    return left, right
+
+
+def _convert(value, typ):
+    """
+    Convert a predicate value to the type of the field it is compared with.
+    """
+    if not isinstance(value, str) or not isinstance(typ, type):
+        return value
+    if issubclass(typ, Enum):
+        return typ(value)
+    if issubclass(typ, datetime):
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if issubclass(typ, date):
+        return date.fromisoformat(value)
+    return value
+
+
+@dataclass
+class Predicate:
+    path: Tuple[str, ...]
+    op: str
+    value: Any
+
+    @property
+    def name(self) -> str:
+        return ".".join(self.path)
+
+    def get(self, item):
+        for name in self.path:
+            if item is None:
+                return None
+            item = item.get(name) if isinstance(item, dict) else getattr(item, name)
+        return item
+
+    def _pairs(self, value) -> Iterator[Tuple[Any, Any]]:
+        for option in self.value:
+            yield _comparable(value, option)
+
+    def matches(self, item) -> bool:
+        value = self.get(item)
+        op = self.op
+        if self.value is None and op in ("eq", "ne"):
+            return (value is None) == (op == "eq")
+        if op == "in":
+            return any(left == right for left, right in self._pairs(value))
+        if op == "contains":
+            return value is not None and _plain(self.value) in value
+        if value is None:
+            return op == "ne" and self.value is not None
+
+        left, right = _comparable(value, self.value, op not in ("eq", "ne"))
+        try:
+            if op == "eq":
+                return left == right
+            if op == "ne":
+                return left != right
+            if op == "gt":
+                return left > right
+            if op == "gte":
+                return left >= right
+            if op == "lt":
+                return left < right
+            return left <= right
+        except TypeError:
+            return False
+
+    def __str__(self) -> str:
+        if self.op == "in":
+            value = [_plain(v) for v in self.value]
+        else:
+            value = _plain(self.value)
+        return f"{self.name} {OPS[self.op]} {value!r}"
+
+
+def parse(resource: type, predicates: dict) -> List[Predicate]:
+    """
+    Parse field__op=value keyword arguments, with nested fields separated by
+    double underscores too (address__city="Stockholm").
+    """
+    parsed = []
+    for key, value in predicates.items():
+        parts = key.split("__")
+        op = parts.pop() if len(parts) > 1 and parts[-1] in OPS else "eq"
+
+        typ = resource
+        for name in parts:
+            types = {}
+            if hasattr(typ, "__dataclass_fields__"):
+                types = {f.name: f.type for f in fields(typ)}
+            if name not in types:
+                raise ValueError(
+                    f"{resource.__name__} has no field {'.'.join(parts)}"
+                )
+            typ = getattr(typ, "NESTED_TYPES", {}).get(name, types[name])
+
+        if op == "in":
+            value = [_convert(v, typ) for v in value]
+        elif op != "contains":
+            value = _convert(value, typ)
+        parsed.append(Predicate(tuple(parts), op, value))
+    return parsed
+
+
+@dataclass
+class Plan:
+    """
+    How a query runs: one request stream per server filter, the predicates
+    checked on the records, and the sort order. With stop set, a stream ends
+    at its first record that fails stop, as the server sort order puts every
+    matching record before it.
+    """
+
+    resource: type
+    filters: List[dict] = field(default_factory=lambda: [{}])
+    pushed: List[Predicate] = field(default_factory=list)
+    split: List[Predicate] = field(default_factory=list)
+    predicates: List[Predicate] = field(default_factory=list)
+    sort: str = None
+    descending: bool = False
+    server_sort: bool = False
+    stop: Predicate = None
+    limit: int = None
+
+    def explain(self, requests: List[dict] = None) -> str:
+        """
+        Describe the plan, with the query string of every request stream
+        (the server filters themselves unless given).
+        """
+        requests = self.filters if requests is None else requests
+        lines = [f"{self.resource.__name__} query"]
+        lines.append(f"  server: {len(requests)} request stream(s)")
+        for kwargs in requests:
+            qs = "&".join(f"{k}={_plain(v)}" for k, v in kwargs.items())
+            lines.append(f"    {self.resource.RESOURCE}{'?' if qs else ''}{qs}")
+        for predicate in self.split:
+            lines.append(f"  split: {predicate} into one stream per value")
+
+        if self.sort:
+            where = "server" if self.server_sort else "client, after fetching all"
+            direction = "descending" if self.descending else "ascending"
+            lines.append(f"  sort: {self.sort} {direction} ({where})")
+        if self.stop is not None:
+            lines.append(f"  stop: at the first record without {self.stop}")
+
+        pushed = {id(p) for p in self.pushed + self.split}
+        for predicate in self.predicates:
+            check = "recheck" if id(predicate) in pushed else "client"
+            lines.append(f"  {check}: {predicate}")
+        if self.limit is not None:
+            lines.append(f"  limit: {self.limit}")
+        return "\n".join(lines)
+
+
+class Query:
+    """
+    Lazy query over the records of a resource client.
+
+    Equality predicates on fields of the endpoint filter are sent to the
+    server, as are date bounds on fields with a <field>RangeStart/End filter
+    (invoiceDate__gte). An __in predicate on such a field is split into one
+    request stream per value, as long as there are at most max_split. All
+    predicates are checked again on the records, the rest only there.
+
+    When the endpoint can sort on a field with a range predicate that was
+    not sent (quantity__gt=10), the records are sorted so that the matching
+    ones come first and the stream stops at the first one past the bound.
+    order_by ("-updatedDate" for descending) is sent to the server when
+    possible, otherwise every match is fetched and sorted locally. limit
+    ends the query after that many records.
+    """
+
+    def __init__(
+        self,
+        client,
+        order_by: str = None,
+        limit: int = None,
+        max_split: int = 10,
+        page_size: int = 200,
+        **predicates,
+    ):
+        self.client = client
+        self.filter = client.filter
+        self.page_size = page_size
+        if self.filter is None:
+            raise ValueError(f"{client.resource.__name__} cannot be listed")
+        self.plan = self._plan(
+            parse(client.resource, predicates), order_by, limit, max_split
+        )
+
+    def _filter_fields(self) -> dict:
+        return {f.name: f.type for f in fields(self.filter)}
+
+    def _sortable(self) -> set:
+        typ = self._filter_fields().get("sort")
+        return {member.value for member in typ} if isinstance(typ, type) else set()
+
+    # pylint: disable=too-many-branches
+    def _plan(self, predicates, order_by, limit, max_split) -> Plan:
+        plan = Plan(self.client.resource, predicates=predicates, limit=limit)
+        available = {
+            name: typ
+            for name, typ in self._filter_fields().items()
+            if name not in RESERVED
+        }
+
+        top_level = {f.name for f in fields(self.client.resource)}
+        server, splits = {}, []
+        for predicate in predicates:
+            name = predicate.path[-1]
+            if len(predicate.path) > 1 and name in top_level:
+                continue
+            if predicate.op == "eq" and name in available and name not in server:
+                server[name] = predicate.value
+                plan.pushed.append(predicate)
+            elif predicate.op == "in" and name in available and predicate.value:
+                splits.append(predicate)
+            elif predicate.op in ("gt", "gte") and f"{name}RangeStart" in available:
+                server[f"{name}RangeStart"] = predicate.value
+                plan.pushed.append(predicate)
+            elif predicate.op in ("lt", "lte") and f"{name}RangeEnd" in available:
+                server[f"{name}RangeEnd"] = predicate.value
+                plan.pushed.append(predicate)
+
+        # Split on every __in predicate if the streams stay within max_split,
+        # else on the one with the fewest values
+        splits = [p for p in splits if p.path[-1] not in server]
+        splits.sort(key=lambda p: len(p.value))
+        count = 1
+        for predicate in splits:
+            if count * len(predicate.value) > max_split:
+                break
+            count *= len(predicate.value)
+            plan.split.append(predicate)
+        plan.filters = [
+            {**server, **{p.path[-1]: v for p, v in zip(plan.split, values)}}
+            for values in product(*(p.value for p in plan.split))
+        ]
+
+        sortable = self._sortable()
+        if order_by:
+            plan.descending = order_by.startswith("-")
+            plan.sort = order_by.lstrip("-+")
+            plan.server_sort = plan.sort in sortable
+        else:
+            # Sort on a range predicate left to the client, so that the
+            # stream can stop at its bound
+            for predicate in predicates:
+                if (
+                    predicate.op in ("gt", "gte", "lt", "lte")
+                    and predicate not in plan.pushed
+                    and len(predicate.path) == 1
+                    and predicate.name in sortable
+                    and isinstance(_plain(predicate.value), (int, float, date))
+                ):
+                    plan.sort = predicate.name
+                    plan.descending = predicate.op in ("gt", "gte")
+                    plan.server_sort = True
+                    break
+
+        if plan.server_sort:
+            bounds = ("gt", "gte") if plan.descending else ("lt", "lte")
+            for predicate in predicates:
+                if (
+                    predicate.name == plan.sort
+                    and predicate.op in bounds
+                    and isinstance(_plain(predicate.value), (int, float, date))
+                ):
+                    plan.stop = predicate
+                    break
+        return plan
+
+    def _make_filter(self, kwargs: dict) -> fi.ListFilter:
+        plan = self.plan
+        kwargs = {**kwargs, "size": self.page_size}
+        if plan.sort and plan.server_sort:
+            names = self._filter_fields()
+            kwargs["sort"] = names["sort"](plan.sort)
+            direction = (
+                "sortDirection" if "sortDirection" in names else "sort_direction"
+            )
+            kwargs[direction] = names[direction]("desc" if plan.descending else "asc")
+        return self.filter(**kwargs)
+
+    def _stream(self, kwargs: dict) -> Iterator:
+        plan = self.plan
+        stop = plan.stop
+        for item in self.client.list(self._make_filter(kwargs), iterate=True):
+            if (
+                stop is not None
+                and stop.get(item) is not None
+                and not stop.matches(item)
+            ):
+                return
+            if all(predicate.matches(item) for predicate in plan.predicates):
+                yield item
+
+    def _key(self) -> Callable:
+        path = Predicate(tuple(self.plan.sort.split(".")), "eq", None)
+
+        def key(item):
+            # Missing values last, numbers (or numeric strings) before text
+            value = _plain(path.get(item))
+            if value is None:
+                return (2, 0)
+            if isinstance(value, str):
+                try:
+                    return (0, float(value))
+                except ValueError:
+                    return (1, value)
+            return (0, value)
+
+        return key
+
+    def __iter__(self) -> Iterator:
+        plan = self.plan
+        streams = [self._stream(kwargs) for kwargs in plan.filters]
+        if not plan.sort:
+            items = chain.from_iterable(streams)
+        elif plan.server_sort:
+            items = heapq.merge(*streams, key=self._key(), reverse=plan.descending)
+        else:
+            items = iter(
+                sorted(
+                    chain.from_iterable(streams),
+                    key=self._key(),
+                    reverse=plan.descending,
+                )
+            )
+        return items if plan.limit is None else islice(items, plan.limit)
+
+    def explain(self) -> str:
+        return self.plan.explain(
+            [self._make_filter(kwargs).get_qs() for kwargs in self.plan.filters]
+        )
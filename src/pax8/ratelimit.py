@@ -0,0 +1,167 @@
+import time
+import asyncio
+import threading
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Dict, Tuple
+from .transport import Transport
+from . import enums as en
+
+
+def parse_retry_after(value: str) -> float:
+    """
+    Parse a Retry-After header, given either as seconds or as an HTTP date.
+    Returns None when the header is missing or unparseable.
+    """
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+# pylint: disable=too-many-instance-attributes
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled at `rate` tokens per second, holding at
+    most `capacity` tokens for bursts. Callers reserve a token and wait for
+    the returned delay, so concurrent callers queue up fairly. The rate is
+    lowered on every 429 and slowly restored on successful responses.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float = None,
+        min_rate: float = None,
+        decrease: float = 0.5,
+        increase: float = None,
+    ):
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1)
+        self.min_rate = min_rate if min_rate is not None else rate / 20
+        self.decrease = decrease
+        self.increase = increase if increase is not None else rate / 100
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.rate
+        )
+        self.updated = now
+
+    def reserve(self) -> float:
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= 1
+            return max(0.0, -self.tokens / self.rate, self.blocked_until - now)
+
+    def acquire(self):
+        delay = self.reserve()
+        if delay:
+            time.sleep(delay)
+
+    async def acquire_async(self):
+        delay = self.reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
+    def penalize(self, delay: float):
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self.tokens = min(self.tokens, 0)
+            self.blocked_until = max(self.blocked_until, now + delay)
+
+    def reward(self):
+        if self.rate < self.max_rate:
+            with self.lock:
+                self.rate = min(self.max_rate, self.rate + self.increase)
+
+
+class RateLimiter:
+    """
+    Client-side rate limiter with one token bucket per host. A single instance
+    can be shared between RestClient and AsyncRestClient instances, threads
+    and tasks.
+
+    rate/burst set the default requests per second and burst size, and hosts
+    overrides them per host, e.g. {"https://api.pax8.com/": (10, 20)}.
+    On a 429 response the host's bucket is blocked for the Retry-After delay
+    (or an exponential backoff when the header is missing) and its rate is
+    lowered, and the request is retried up to max_retries times.
+    """
+
+    def __init__(
+        self,
+        rate: float = 10,
+        burst: float = None,
+        hosts: Dict[str, Tuple[float, float]] = None,
+        max_retries: int = 5,
+        backoff: float = 1.0,
+        max_backoff: float = 60.0,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.hosts = hosts or {}
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, url: str) -> TokenBucket:
+        host = Transport.host_of(url)
+        try:
+            return self.buckets[host]
+        except KeyError:
+            with self.lock:
+                if host not in self.buckets:
+                    rate, burst = self.hosts.get(host, (self.rate, self.burst))
+                    self.buckets[host] = TokenBucket(rate, burst)
+                return self.buckets[host]
+
+    def acquire(self, url: str):
+        self.bucket(url).acquire()
+
+    async def acquire_async(self, url: str):
+        await self.bucket(url).acquire_async()
+
+    def feedback(
+        self, url: str, status_code: int, retry_after: str = None, attempt: int = 0
+    ) -> bool:
+        """
+        Record the outcome of a request. Returns True if the request was rate
+        limited and should be retried.
+        """
+        bucket = self.bucket(url)
+        if status_code != en.ResponseType.TOO_MANY_REQUESTS.value:
+            # Only successful responses restore the rate, a failing upstream
+            # must not speed the client up
+            if 200 <= status_code < 400:
+                bucket.reward()
+            return False
+
+        delay = parse_retry_after(retry_after)
+        if delay is None:
+            delay = min(self.max_backoff, self.backoff * 2**attempt)
+        bucket.penalize(delay)
+
+        return attempt < self.max_retries
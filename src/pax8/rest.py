@@ -1,31 +1,63 @@
-import os
-import json
-from datetime import datetime, timedelta
-import requests
-from .exceptions import UnexpectedResponseException, UnableToCacheException
-from . import enums as en
+import time
+from .transport import Transport
+from .workers import bounded_map
+from .base import Attempts, BaseRestClient, REAUTHENTICATE
+from .ratelimit import RateLimiter
+from .retry import RetryPolicy, Deadline
+from .cache import ResponseCache
+from .streaming import iter_content
+from .singleflight import SingleFlight
+from .codec import Codec
+from .tokens import Token, TokenManager
+from .instrumentation import Instrumentation
 
 # pylint: disable=too-many-arguments
-class RestClient:
+class RestClient(BaseRestClient):
     def __init__(
         self,
         client_id: str,
         client_secret: str,
         cache_token: bool = False,
         cache_location: str = "~/pax8_token.json",
-        cache_encoding: str = 'utf-8'
+        cache_encoding: str = 'utf-8',
+        transport: Transport = None,
+        base_url: str = "https://api.pax8.com/v1/",
+        app_url: str = "https://app.pax8.com/p8p/api/v3/",
+        login_url: str = "https://login.pax8.com/oauth/token",
+        rate_limiter: RateLimiter = None,
+        retry_policy: RetryPolicy = None,
+        response_cache: ResponseCache = None,
+        codec: Codec = None,
+        single_flight: bool = True,
+        token_refresh_margin: float = 300,
+        instrumentation: Instrumentation = None,
     ):
-        self.__id = client_id
-        self.__secret = client_secret
-        self.__token = None
-        self.__expiry = None
-        self.__baseurl = "https://api.pax8.com/v1/"
-        self.__appurl = "https://app.pax8.com/p8p/api/v3/"
-        self.__default_headers = {}
+        super().__init__(
+            client_id,
+            client_secret,
+            base_url,
+            app_url,
+            login_url,
+            rate_limiter,
+            retry_policy,
+            codec,
+            instrumentation,
+            response_cache,
+        )
+        self.single_flight = SingleFlight() if single_flight else None
+        self.transport = self._register(
+            transport if transport is not None else Transport()
+        )
 
         self.cache_token = cache_token
         self.cache_location = cache_location
         self.cache_encoding = cache_encoding
+        self.tokens = TokenManager(
+            self.login,
+            cache_location=cache_location if cache_token else None,
+            cache_encoding=cache_encoding,
+            refresh_margin=token_refresh_margin,
+        )
 
         self.renew_token(force=False)
 
@@ -36,84 +68,255 @@ class RestClient:
             else "Pax8Connection (Inactive)"
         )
 
-    def renew_token(self, force: bool = False):
-        if self.is_connected() and not force:
-            return
+    def close(self):
+        self.transport.close()
 
-        if self.cache_token and os.path.isfile(self.cache_location):
-            with open(self.cache_location, "r", encoding=self.cache_encoding) as f:
-                try:
-                    cached = json.load(f)
-                except json.JSONDecodeError:
-                    cached = {}
+    def login(self) -> Token:
+        url, body = self._login_request()
+        return self._token(self.transport.post(url, json=body))
 
-            self.__token = cached.get("token", None)
-            self.__expiry = cached.get("expiry", None)
-            self.__default_headers = cached.get("default_headers", None)
+    def renew_token(self, force: bool = False) -> Token:
+        return self.tokens.get(force=force)
 
-            if self.is_connected():
-                return
+    def get_request(
+        self,
+        uri: str,
+        qs: dict = None,
+        deadline: Deadline = None,
+        headers: dict = None,
+        stream: bool = False,
+    ) -> None:
+        token = self.tokens.get()
+        attempts = Attempts(self, uri, qs, deadline, headers, stream)
+        while True:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(uri)
 
-        body = {
-            "client_id": self.__id,
-            "client_secret": self.__secret,
-            "audience": "api://p8p.client",
-            "grant_type": "client_credentials",
-        }
+            attempts.started()
+            try:
+                req = self.transport.get(uri, stream=stream, **attempts.kwargs(token))
+            except Exception as e:  # pylint: disable=broad-except
+                time.sleep(attempts.failed(e))
+                continue
+
+            action = attempts.received(req)
+            if action is None:
+                return attempts.result(req)
 
-        req = requests.post("https://login.pax8.com/oauth/token", json=body, timeout=30)
-        if req.status_code == 200:
-            req = req.json()
-            self.__token = f"{req['token_type']} {req['access_token']}"
-            self.__expiry = (
-                datetime.now() + timedelta(seconds=req["expires_in"])
-            ).timestamp()
-            self.__default_headers = {
-                "Authorization": self.__token,
-            }
-            self.connected = True
-
-            if self.cache_token:
-                if not os.path.isfile(self.cache_location):
-                    if cache_location[:1] == "~":
-                        cache_location = os.path.expanduser(self.cache_location)
-                    os.makedirs(os.path.dirname(self.cache_location), exist_ok=True)
-
-                try:
-                    with open(self.cache_location, "w+", encoding=self.cache_encoding) as f:
-                        json.dump(
-                            {
-                                "token": self.__token,
-                                "expiry": self.__expiry,
-                                "default_headers": self.__default_headers,
-                            },
-                            f,
-                        )
-                except FileNotFoundError as e:
-                    raise UnableToCacheException(f"Unable to cache token: {e}") from e
-            return
-
-        raise Exception(
-            f"Failed to get tokens from Pax8: {req.status_code} {req.reason} {req.text}"
+            req.close()
+            if action is REAUTHENTICATE:
+                token = self.tokens.invalidate(token)
+            else:
+                time.sleep(action)
+
+    def get_body(self, uri: str, qs: dict = None, deadline: Deadline = None) -> bytes:
+        """
+        GET the raw body of a resource, going through the response cache if
+        one is set. Expired entries with an ETag or Last-Modified validator
+        are revalidated with a conditional request, and a 304 response reuses
+        the cached body.
+
+        With single_flight, concurrent GETs of the same URL and query string
+        share one request and its body; each caller decodes its own copy, and
+        waits no longer than its own deadline.
+        """
+        if self.single_flight is None:
+            return self._fetch_body(uri, qs, deadline)
+        return self.single_flight.do(
+            ResponseCache.key(uri, qs),
+            lambda: self._fetch_body(uri, qs, deadline),
+            deadline.remaining() if deadline is not None else None,
         )
 
-    def is_connected(self):
-        return (
-            None not in [self.__token, self.__expiry, self.__default_headers]
-            and self.__expiry > datetime.now().timestamp()
+    def _fetch_body(self, uri: str, qs: dict = None, deadline: Deadline = None):
+        if self.response_cache is None:
+            return self.get_request(uri, qs=qs, deadline=deadline).content
+
+        key, entry, fresh = self._cached(uri, qs)
+        if fresh:
+            return entry.body
+
+        req = self.get_request(
+            uri,
+            qs=qs,
+            deadline=deadline,
+            headers=entry.validators() if entry is not None else None,
         )
+        return self._cache_response(uri, key, entry, req)
+
+    def get_json(self, uri: str, qs: dict = None, deadline: Deadline = None):
+        return self.loads(uri, self.get_body(uri, qs=qs, deadline=deadline))
+
+    def get_object(
+        self, uri: str, resource: type, qs: dict = None, content_only: bool = False
+    ):
+        """
+        GET a resource as an instance of the resource class, or with
+        content_only the content of a page as a list of instances.
+        """
+        return self.decode(uri, self.get_body(uri, qs=qs), resource, content_only)
 
-    def get_request(self, uri: str, qs: dict = None) -> None:
-        req = requests.get(f"{uri}", headers=self.__default_headers, params=qs, timeout=30)
-        if req.status_code != en.ResponseType.OK.value:
-            raise UnexpectedResponseException(
-                f"Failed to get companies from Pax8: {en.ResponseType(req.status_code)} {req.text}"
+    def stream(
+        self,
+        uri: str,
+        qs: dict = None,
+        resource: type = None,
+        paginate: bool = True,
+        meta: dict = None,
+        chunk_size: int = 64 * 1024,
+    ):
+        """
+        Yield the records of a list endpoint while the response is being
+        downloaded, parsing the content array incrementally instead of
+        loading whole pages, objectified when a resource class is given (the
+        objectify time of a page is recorded once the page is done).
+        Pages are fetched one after another unless paginate is False, and the
+        other members of the last page (e.g. "page") are stored in meta.
+
+        Streamed responses bypass the response cache, and a page can only be
+        retried before its first record has been yielded. All pages share
+        one deadline budget unless the retry policy budgets per page.
+        """
+        qs = dict(qs or {})
+        number = qs.get("page") or 0
+        meta = {} if meta is None else meta
+        deadline = self._deadline()
+        objectify = resource.objectify if resource is not None else None
+        inst = self.instrumentation if objectify is not None else None
+
+        while True:
+            meta.clear()
+            elapsed = 0.0
+            req = self.get_request(
+                uri,
+                qs={**qs, "page": number},
+                deadline=self._page_deadline(deadline),
+                stream=True,
             )
-        return req
+            try:
+                for item in iter_content(req.iter_content(chunk_size), meta=meta):
+                    if objectify is None:
+                        yield item
+                    elif inst is None:
+                        yield objectify(item)
+                    else:
+                        started = time.perf_counter()
+                        item = objectify(item)
+                        elapsed += time.perf_counter() - started
+                        yield item
+            finally:
+                req.close()
+            if inst is not None:
+                inst.timing(self.endpoint(uri), "objectify", elapsed)
+
+            number = self._next_page(meta.get("page")) if paginate else None
+            if number is None:
+                return
 
-    def list_resource(self, type: str, qs: dict = None, content_only: bool = True):
-        res = self.get_request(f"{self.__baseurl}{type}", qs=qs).json()
-        return res if not content_only else res.get("content", [])
+    def list_resource(
+        self,
+        type: str,
+        qs: dict = None,
+        content_only: bool = True,
+        resource: type = None,
+        stream: bool = False,
+    ):
+        uri = self._url(type)
+        if stream:
+            return self.stream(uri, qs, resource=resource, paginate=False)
+
+        if resource is not None:
+            return self.get_object(uri, resource, qs, content_only=content_only)
+
+        return self._content(self.get_json(uri, qs=qs), content_only)
+
+    def paginate(
+        self, uri: str, qs: dict = None, parallel: int = 1, ordered: bool = True
+    ):
+        """
+        Yield every page of a list endpoint, starting at the page given in qs
+        (or the first page) and following the page block of each response
+        until the last page has been fetched.
+
+        With parallel > 1, the remaining pages are fetched concurrently on up
+        to `parallel` threads once the first page has returned the page count.
+        Pages are yielded in order unless ordered is False. The transport pool
+        size should be at least `parallel` to reuse every connection.
+
+        With a retry policy, a failed page is retried on its own, and every
+        page shares the deadline budget of the whole listing, the time a
+        consumer spends between pages included (unless the policy budgets
+        per page).
+        """
+        qs = dict(qs or {})
+        number = qs.get("page") or 0
+        deadline = self._deadline()
+
+        while True:
+            res = self.get_json(
+                uri, qs={**qs, "page": number}, deadline=self._page_deadline(deadline)
+            )
+            yield res
+
+            number = self._next_page(res.get("page"))
+            if number is None:
+                return
+
+            if parallel > 1:
+                yield from bounded_map(
+                    lambda n: self.get_json(
+                        uri,
+                        qs={**qs, "page": n},
+                        deadline=self._page_deadline(deadline),
+                    ),
+                    range(number, res["page"]["totalPages"]),
+                    parallel,
+                    ordered,
+                )
+                return
+
+    def iter_records(
+        self,
+        uri: str,
+        qs: dict = None,
+        stream: bool = False,
+        parallel: int = 1,
+        ordered: bool = True,
+        resource: type = None,
+    ):
+        """
+        Returns an iterator over the records of every page of a list
+        endpoint, fetched by paginate() or with stream by stream(), and
+        objectified when a resource class is given. Streamed pages are
+        fetched one after another, so stream cannot be combined with
+        parallel.
+        """
+        if stream:
+            if parallel > 1:
+                raise ValueError("stream=True cannot be combined with parallel")
+            return self.stream(uri, qs, resource=resource)
+
+        return (
+            item
+            for res in self.paginate(uri, qs, parallel, ordered)
+            for item in self.objectify(uri, res.get("content", []), resource)
+        )
+
+    def iter_resource(self, type: str, qs: dict = None, stream: bool = False, **kwargs):
+        return self.iter_records(self._url(type), qs, stream, **kwargs)
+
+    def iter_nested_resource(
+        self,
+        parent_type: str,
+        parent_id: str,
+        child_type: str,
+        qs: dict = None,
+        stream: bool = False,
+        **kwargs,
+    ):
+        return self.iter_records(
+            self._url(parent_type, parent_id, child_type), qs, stream, **kwargs
+        )
 
     # pylint: disable=dangerous-default-value
     def list_nested_resource(
@@ -123,26 +326,39 @@ class RestClient:
         child_type: str,
         qs: dict = None,
         content_only: bool = True,
+        resource: type = None,
+        stream: bool = False,
     ):
-        res = self.get_request(
-            f"{self.__baseurl}{parent_type}/{parent_id}/{child_type}", qs=qs
-        ).json()
-        return res if not content_only else res.get("content", [])
+        uri = self._url(parent_type, parent_id, child_type)
+        if stream:
+            return self.stream(uri, qs, resource=resource, paginate=False)
+
+        if resource is not None:
+            return self.get_object(uri, resource, qs, content_only=content_only)
 
-    def get_resource(self, type: str, id: str):
-        return self.get_request(f"{self.__baseurl}{type}/{id}").json()
+        return self._content(self.get_json(uri, qs=qs), content_only)
+
+    def get_resource(self, type: str, id: str, resource: type = None):
+        uri = self._url(type, id)
+        if resource is not None:
+            return self.get_object(uri, resource)
+        return self.get_json(uri)
 
     def get_nested_resource(
-        self, parent_type: str, parent_id: str, child_type: str, child_id: str
+        self,
+        parent_type: str,
+        parent_id: str,
+        child_type: str,
+        child_id: str,
+        resource: type = None,
     ):
-        return self.get_request(
-            f"{self.__baseurl}{parent_type}/{parent_id}/{child_type}/{child_id}"
-        ).json()
+        uri = self._url(parent_type, parent_id, child_type, child_id)
+        if resource is not None:
+            return self.get_object(uri, resource)
+        return self.get_json(uri)
 
     def get_tenant_id(self, client_id: str) -> dict:
         return {
             "clientId": client_id,
-            **self.get_request(
-                f"{self.__appurl}companies/{client_id}/msTenantId"
-            ).json(),
+            **self.get_json(self._tenant_url(client_id)),
         }
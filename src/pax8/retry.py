@@ -0,0 +1,107 @@
+import time
+import random
+from typing import Iterable, Tuple
+import requests
+from . import enums as en
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+
+RETRYABLE_STATUSES = (
+    en.ResponseType.BAD_GATEWAY.value,
+    en.ResponseType.SERVICE_UNAVAILABLE.value,
+    en.ResponseType.GATEWAY_TIMEOUT.value,
+)
+
+RETRYABLE_EXCEPTIONS = (
+    requests.exceptions.Timeout,
+    requests.exceptions.ConnectionError,
+) + ((httpx.TimeoutException, httpx.NetworkError) if httpx is not None else ())
+
+
+class Deadline:
+    """
+    Time budget of a request and its retries. A budget of None never
+    expires.
+    """
+
+    def __init__(self, budget: float = None):
+        self.expires = time.monotonic() + budget if budget is not None else None
+
+    def remaining(self) -> float:
+        if self.expires is None:
+            return None
+        return max(0.0, self.expires - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.expires is not None and time.monotonic() >= self.expires
+
+
+# pylint: disable=too-many-arguments
+class RetryPolicy:
+    """
+    Retry policy for transient failures, with exponential backoff and jitter.
+
+    max_attempts is the total number of attempts per request. The delay before
+    retry n is backoff * multiplier**n (capped at max_backoff), of which a
+    random fraction up to `jitter` is removed. statuses and exceptions set
+    what is retryable. deadline is the budget in seconds of a call and its
+    retries, a whole listing included: no retry starts once it is used up,
+    no attempt waits longer than what is left, and no request is sent after
+    it expired. With per_page, every page of a listing gets a budget of its
+    own instead.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        backoff: float = 0.5,
+        multiplier: float = 2.0,
+        max_backoff: float = 30.0,
+        jitter: float = 1.0,
+        statuses: Iterable[int] = RETRYABLE_STATUSES,
+        exceptions: Tuple[type, ...] = RETRYABLE_EXCEPTIONS,
+        deadline: float = None,
+        per_page: bool = False,
+    ):
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.multiplier = multiplier
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.statuses = frozenset(statuses)
+        self.exceptions = tuple(exceptions)
+        self.deadline = deadline
+        self.per_page = per_page
+
+    def start(self) -> Deadline:
+        return Deadline(self.deadline)
+
+    def retryable_status(self, status_code: int) -> bool:
+        return status_code in self.statuses
+
+    def retryable_exception(self, exc: BaseException) -> bool:
+        return isinstance(exc, self.exceptions)
+
+    def delay(self, attempt: int) -> float:
+        delay = min(self.max_backoff, self.backoff * self.multiplier**attempt)
+        return delay - random.uniform(0, delay * self.jitter)
+
+    def next_delay(self, attempt: int, deadline: Deadline = None) -> float:
+        """
+        Returns the delay before the next attempt after `attempt` (0-based)
+        failed, or None if the attempts or the deadline budget are used up.
+        """
+        if attempt + 1 >= self.max_attempts:
+            return None
+
+        delay = self.delay(attempt)
+        if deadline is not None:
+            remaining = deadline.remaining()
+            if remaining is not None and remaining <= delay:
+                return None
+
+        return delay
@@ -0,0 +1,120 @@
+"""
+Coalescing of identical concurrent calls, so a burst of callers asking for
+the same resource at the same moment share one request.
+"""
+import copy
+import asyncio
+import threading
+from typing import Awaitable, Callable, Dict, Hashable
+
+
+def _copy_error(error: BaseException, traceback) -> BaseException:
+    """
+    A copy of the shared call's exception for one waiter, so raising it in
+    every waiter does not keep growing the traceback of a single instance.
+    Exceptions that cannot be copied are reused with their traceback reset.
+    """
+    try:
+        copied = copy.copy(error)
+    except Exception:  # pylint: disable=broad-except
+        copied = error
+    else:
+        copied.__cause__ = error.__cause__
+        copied.__context__ = error.__context__
+        copied.__suppress_context__ = error.__suppress_context__
+    return copied.with_traceback(traceback)
+
+
+def _timed_out(key: Hashable) -> TimeoutError:
+    return TimeoutError(f"Deadline exceeded waiting for the shared call of {key}")
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "traceback")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.traceback = None
+
+
+class SingleFlight:
+    """
+    Runs fn once per key among concurrent threads: callers arriving while a
+    call for the same key is in flight wait for it and get its result, or
+    a copy of its exception. Once the call returns, the next caller starts a
+    new one. A waiter gives up with a TimeoutError after timeout seconds,
+    while the call goes on for the others.
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__calls: Dict[Hashable, _Call] = {}
+        self.shared = 0
+
+    def do(self, key: Hashable, fn: Callable, timeout: float = None):
+        with self.__lock:
+            call = self.__calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.__calls[key] = _Call()
+            else:
+                self.shared += 1
+
+        if not leader:
+            if not call.done.wait(timeout):
+                raise _timed_out(key)
+            if call.error is not None:
+                raise _copy_error(call.error, call.traceback)
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error, call.traceback = e, e.__traceback__
+            raise
+        finally:
+            with self.__lock:
+                del self.__calls[key]
+            call.done.set()
+        return call.result
+
+
+class AsyncSingleFlight:
+    """
+    SingleFlight for coroutines of one event loop. The call runs as a task
+    that no caller awaits directly, so a cancelled or timed out caller does
+    not cancel it for the others, and its exception is retrieved even when
+    every caller has gone.
+    """
+
+    def __init__(self):
+        self.__tasks: Dict[Hashable, asyncio.Task] = {}
+        self.shared = 0
+
+    def _done(self, key: Hashable, task: asyncio.Task):
+        if self.__tasks.get(key) is task:
+            del self.__tasks[key]
+        if not task.cancelled():
+            task.exception()
+
+    async def do(
+        self, key: Hashable, fn: Callable[[], Awaitable], timeout: float = None
+    ):
+        task = self.__tasks.get(key)
+        if task is None:
+            task = self.__tasks[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda task: self._done(key, task))
+        else:
+            self.shared += 1
+
+        # Unlike awaiting the task, wait() neither cancels it when the caller
+        # is cancelled nor times out on it
+        done, _ = await asyncio.wait({task}, timeout=timeout)
+        if not done:
+            raise _timed_out(key)
+        if not task.cancelled() and task.exception() is not None:
+            error = task.exception()
+            raise _copy_error(error, error.__traceback__)
+        return task.result()
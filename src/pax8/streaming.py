@@ -0,0 +1,114 @@
+"""
+Incremental parsing of list responses, yielding the records of the content
+array while the body is still being downloaded.
+"""
+import codecs
+import json
+from typing import Iterable, Iterator
+
+WHITESPACE = " \t\n\r"
+
+
+class _Buffer:
+    """
+    Text buffer fed from byte chunks, parsed with JSONDecoder.raw_decode.
+    """
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self.chunks = iter(chunks)
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.raw_decode = json.JSONDecoder().raw_decode
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        if self.eof:
+            return False
+
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            self.eof = True
+            self.text += self.decoder.decode(b"", final=True)
+        else:
+            self.text = self.text[self.pos :] + self.decoder.decode(chunk)
+            self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """
+        Returns the next non-whitespace character without consuming it.
+        """
+        while True:
+            text, pos = self.text, self.pos
+            while pos < len(text) and text[pos] in WHITESPACE:
+                pos += 1
+            self.pos = pos
+            if pos < len(text):
+                return text[pos]
+            if not self.fill():
+                raise ValueError("Unexpected end of JSON response")
+
+    def expect(self, chars: str) -> str:
+        char = self.peek()
+        if char not in chars:
+            raise ValueError(f"Expected one of {chars!r} at {char!r} in JSON response")
+        self.pos += 1
+        return char
+
+    def value(self):
+        """
+        Decode the next complete value. A value is only complete once the
+        character after it has arrived, so numbers are never cut short at the
+        end of a chunk.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self.raw_decode(self.text, self.pos)
+                if end < len(self.text) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.fill()
+
+
+def _parse(chunks: Iterable[bytes], key: str, meta: dict) -> Iterator:
+    buffer = _Buffer(chunks)
+    buffer.expect("{")
+    if buffer.peek() == "}":
+        return
+
+    while True:
+        name = buffer.value()
+        buffer.expect(":")
+        if name == key and buffer.peek() == "[":
+            buffer.expect("[")
+            if buffer.peek() == "]":
+                buffer.expect("]")
+            else:
+                while True:
+                    yield buffer.value()
+                    if buffer.expect(",]") == "]":
+                        break
+        else:
+            meta[name] = buffer.value()
+
+        if buffer.expect(",}") == "}":
+            return
+
+
+def iter_content(
+    chunks: Iterable[bytes], key: str = "content", meta: dict = None
+) -> Iterator:
+    """
+    Yield the items of the `key` array of a JSON object read from byte
+    chunks, as soon as each item is complete. The other members of the
+    object, such as the page block, are stored in meta once parsed.
+
+    Each item is decoded on its own with the C scanner of the standard
+    library, so only the current chunk and item are held in memory.
+    """
+    return _parse(chunks, key, {} if meta is None else meta)
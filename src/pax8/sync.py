@@ -0,0 +1,171 @@
+"""
+Incremental delta sync of companies and subscriptions, based on updatedDate.
+"""
+from dataclasses import dataclass
+from datetime import datetime, date, timezone
+from typing import Iterator, Iterable
+from .files import read_json, write_json
+from . import types as t
+from . import filters as fi
+from . import enums as en
+
+
+@dataclass
+class SyncEvent:
+    type: en.SyncEventType
+    resource: str
+    id: str
+    item: t.Pax8Resource
+
+
+@dataclass
+class SyncSource:
+    client: str
+    filter: type
+    sort: en.SortBy
+    # Statuses meaning the record was deleted upstream. Other statuses,
+    # e.g. a cancelled subscription, are updates of a record that remains.
+    deleted: tuple = ()
+
+
+SOURCES = {
+    t.Company.RESOURCE: SyncSource(
+        "Company",
+        fi.CompanyFilter,
+        en.CompanySortBy.UPDATED_DATE,
+        (en.CompanyStatus.DELETED,),
+    ),
+    t.Subscription.RESOURCE: SyncSource(
+        "Subscription",
+        fi.SubscriptionFilter,
+        en.SubscriptionSortBy.UPDATED_DATE,
+    ),
+}
+
+
+def as_datetime(value) -> datetime:
+    """
+    Normalize an updatedDate (ISO string, date or datetime) to an aware UTC
+    datetime, so values of different precision can be compared.
+    """
+    if value is None or isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, date):
+        parsed = datetime(value.year, value.month, value.day)
+    else:
+        value = value.strip()
+        if value.endswith("Z"):
+            value = value[:-1] + "+00:00"
+        parsed = datetime.fromisoformat(value)
+
+    if parsed is not None and parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+class DeltaSync:
+    """
+    Fetches only the companies or subscriptions changed since the last run.
+
+    Each resource type keeps a checkpoint with its watermark (the newest
+    updatedDate seen), the ids updated exactly at the watermark and the ids
+    known so far. A run lists the resource sorted on updatedDate, newest
+    first, and stops paginating at the first record older than the
+    watermark. The checkpoint is only saved once a run has been fully
+    consumed, so an interrupted run is repeated rather than lost.
+
+    Records are reported as deleted only when they have a deletion status
+    (a deleted company) and were delivered by an earlier event; a cancelled
+    subscription is an update.
+
+        sync = DeltaSync(client, "~/pax8_sync.json")
+        for event in sync.sync("subscriptions"):
+            print(event.type, event.id)
+    """
+
+    def __init__(
+        self,
+        client: "Pax8Client",
+        checkpoint_location: str = "~/pax8_sync.json",
+        page_size: int = 200,
+    ):
+        self.client = client
+        self.checkpoint_location = checkpoint_location
+        self.page_size = page_size
+
+    def checkpoint(self, resource: str) -> dict:
+        return read_json(self.checkpoint_location, {}).get(resource, {})
+
+    def reset(self, resource: str = None):
+        checkpoints = read_json(self.checkpoint_location, {})
+        if resource is None:
+            checkpoints = {}
+        else:
+            checkpoints.pop(resource, None)
+        write_json(self.checkpoint_location, checkpoints)
+
+    def _save(self, resource: str, checkpoint: dict):
+        checkpoints = read_json(self.checkpoint_location, {})
+        checkpoints[resource] = checkpoint
+        write_json(self.checkpoint_location, checkpoints)
+
+    def sync(self, resource: str) -> Iterator[SyncEvent]:
+        source = SOURCES[resource]
+        checkpoint = self.checkpoint(resource)
+        watermark = as_datetime(checkpoint.get("watermark"))
+        at_watermark = set(checkpoint.get("at_watermark", []))
+        known = set(checkpoint.get("ids", []))
+
+        newest, at_newest = watermark, set(at_watermark)
+        items = getattr(self.client, source.client).list(
+            source.filter(
+                size=self.page_size,
+                sort=source.sort,
+                sort_direction=en.SortDirection.DESCENDING,
+            ),
+            iterate=True,
+        )
+
+        try:
+            for item in items:
+                updated = as_datetime(item.updatedDate)
+                if watermark is not None and updated is not None:
+                    if updated < watermark:
+                        break
+                    if updated == watermark and item.id in at_watermark:
+                        continue
+
+                if updated is not None:
+                    if newest is None or updated > newest:
+                        newest, at_newest = updated, {item.id}
+                    elif updated == newest:
+                        at_newest.add(item.id)
+
+                if item.status in source.deleted:
+                    # Records never delivered have nothing to delete
+                    if item.id not in known:
+                        continue
+                    kind = en.SyncEventType.DELETED
+                    known.discard(item.id)
+                elif item.id in known:
+                    kind = en.SyncEventType.UPDATED
+                else:
+                    kind = en.SyncEventType.CREATED
+                    known.add(item.id)
+
+                yield SyncEvent(kind, resource, item.id, item)
+        finally:
+            items.close()
+
+        self._save(
+            resource,
+            {
+                "watermark": newest.isoformat() if newest is not None else None,
+                "at_watermark": sorted(at_newest),
+                "ids": sorted(known),
+            },
+        )
+
+    def run(self, resources: Iterable[str] = tuple(SOURCES)) -> Iterator[SyncEvent]:
+        for resource in resources:
+            yield from self.sync(resource)
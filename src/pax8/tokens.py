@@ -0,0 +1,277 @@
+"""
+API token management shared by threads, asyncio tasks and processes.
+"""
+import os
+import time
+import asyncio
+import threading
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+from .files import read_json, write_json
+from .exceptions import UnableToCacheException
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """
+    Exclusive lock between processes, held on a `.lock` file next to path
+    (flock on POSIX, msvcrt.locking on Windows).
+    """
+
+    def __init__(self, path: str):
+        self.path = os.path.expanduser(path) + ".lock"
+        self.__fd = None
+
+    def acquire(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+        except BaseException:
+            os.close(fd)
+            raise
+        self.__fd = fd
+
+    def release(self):
+        fd, self.__fd = self.__fd, None
+        if fd is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(fd)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *args):
+        self.release()
+
+
+@dataclass(frozen=True)
+class Token:
+    token: str
+    expiry: float
+
+    @classmethod
+    def from_response(cls, res: dict) -> "Token":
+        return cls(
+            f"{res['token_type']} {res['access_token']}",
+            time.time() + res["expires_in"],
+        )
+
+    @property
+    def headers(self) -> dict:
+        return {"Authorization": self.token}
+
+    def valid(self, margin: float = 0) -> bool:
+        return time.time() + margin < self.expiry
+
+
+# pylint: disable=too-many-instance-attributes
+class TokenManager:
+    """
+    Keeps a valid API token, fetching a new one with `login` (or
+    `login_async`) when needed.
+
+    With a cache_location, the token is shared through that file by every
+    process: the file is read and written under a file lock and replaced
+    atomically, so when the token expires one process logs in and the others
+    pick up its token instead of all calling the login server.
+
+    A token that expires within refresh_margin seconds is still returned,
+    but a new one is fetched in the background, so callers do not block on
+    login; only callers whose token has expired wait for it. invalidate()
+    replaces a token the API rejected, unless another caller already did.
+    """
+
+    def __init__(
+        self,
+        login: Callable[[], Token] = None,
+        login_async: Callable[[], Awaitable[Token]] = None,
+        cache_location: str = None,
+        cache_encoding: str = "utf-8",
+        refresh_margin: float = 300,
+    ):
+        self.login = login
+        self.login_async = login_async
+        self.cache_location = (
+            os.path.expanduser(cache_location) if cache_location else None
+        )
+        self.cache_encoding = cache_encoding
+        self.refresh_margin = refresh_margin
+        self.token: Token = None
+        self.__lock = threading.Lock()
+        self.__async_lock = None
+        self.__refresh_lock = threading.Lock()
+        self.__refreshing = False
+
+    def _load(self, stale: Token = None) -> Token:
+        if self.cache_location is None:
+            return None
+
+        cached = read_json(self.cache_location, {}, self.cache_encoding)
+        if not isinstance(cached, dict) or not cached.get("token"):
+            return None
+
+        token = Token(cached["token"], cached.get("expiry") or 0)
+        if token == stale or not token.valid():
+            return None
+        return token
+
+    def _store(self, token: Token):
+        self.token = token
+        if self.cache_location is None:
+            return
+
+        try:
+            write_json(
+                self.cache_location,
+                {
+                    "token": token.token,
+                    "expiry": token.expiry,
+                    "default_headers": token.headers,
+                },
+                self.cache_encoding,
+            )
+        except OSError as e:
+            raise UnableToCacheException(f"Unable to cache token: {e}") from e
+
+    def _usable(self, stale: Token = None) -> Token:
+        token = self.token
+        if token is None or token == stale or not token.valid():
+            return None
+        return token
+
+    def _renew(self, stale: Token = None) -> Token:
+        """
+        Adopt the cached token or log in, under the thread and file locks.
+        """
+        with self.__lock:
+            token = self._usable(stale)
+            if token is not None and (
+                stale is not None or token.valid(self.refresh_margin)
+            ):
+                return token
+
+            if self.cache_location is None:
+                self._store(self.login())
+                return self.token
+
+            with FileLock(self.cache_location):
+                token = self._load(stale)
+                if token is not None and token.valid(self.refresh_margin):
+                    self.token = token
+                else:
+                    self._store(self.login())
+                return self.token
+
+    def _start_refresh(self) -> bool:
+        """
+        Flag a background refresh as in flight, False if one already is. The
+        flag has its own lock, as __lock is held for the whole login.
+        """
+        with self.__refresh_lock:
+            if self.__refreshing:
+                return False
+            self.__refreshing = True
+            return True
+
+    def _end_refresh(self):
+        with self.__refresh_lock:
+            self.__refreshing = False
+
+    def _refresh_in_background(self):
+        if not self._start_refresh():
+            return
+
+        def refresh():
+            try:
+                self._renew()
+            except Exception:  # pylint: disable=broad-except
+                pass  # retried by the next caller once the token has expired
+            finally:
+                self._end_refresh()
+
+        threading.Thread(
+            target=refresh, name="pax8-token-refresh", daemon=True
+        ).start()
+
+    def get(self, force: bool = False) -> Token:
+        token = None if force else self._usable()
+        if token is None:
+            return self._renew(self.token if force else None)
+
+        if not token.valid(self.refresh_margin):
+            self._refresh_in_background()
+        return token
+
+    def invalidate(self, token: Token) -> Token:
+        """
+        Returns a token other than the rejected one, fetching a new token
+        unless another thread or process already replaced it.
+        """
+        return self._renew(token)
+
+    async def _renew_async(self, stale: Token = None) -> Token:
+        if self.__async_lock is None:
+            self.__async_lock = asyncio.Lock()
+
+        async with self.__async_lock:
+            token = self._usable(stale)
+            if token is not None and (
+                stale is not None or token.valid(self.refresh_margin)
+            ):
+                return token
+
+            if self.cache_location is None:
+                self._store(await self.login_async())
+                return self.token
+
+            # The file lock and the cache file are used off the event loop
+            loop = asyncio.get_running_loop()
+            lock = FileLock(self.cache_location)
+            await loop.run_in_executor(None, lock.acquire)
+            try:
+                token = await loop.run_in_executor(None, self._load, stale)
+                if token is not None and token.valid(self.refresh_margin):
+                    self.token = token
+                else:
+                    token = await self.login_async()
+                    await loop.run_in_executor(None, self._store, token)
+                return self.token
+            finally:
+                lock.release()
+
+    async def _refresh_async(self):
+        try:
+            await self._renew_async()
+        except Exception:  # pylint: disable=broad-except
+            pass  # retried by the next caller once the token has expired
+        finally:
+            self._end_refresh()
+
+    async def get_async(self, force: bool = False) -> Token:
+        token = None if force else self._usable()
+        if token is None:
+            return await self._renew_async(self.token if force else None)
+
+        if not token.valid(self.refresh_margin) and self._start_refresh():
+            asyncio.ensure_future(self._refresh_async())
+        return token
+
+    async def invalidate_async(self, token: Token) -> Token:
+        return await self._renew_async(token)
@@ -0,0 +1,71 @@
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+
+
+# pylint: disable=too-many-arguments
+class Transport:
+    """
+    Pooled HTTP transport used by the RestClient. Every registered host gets
+    its own connection pool, and connections are kept alive between calls.
+    Pass a custom instance (or a subclass) to the RestClient to tune the pools
+    or to point the client at a different server.
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = 4,
+        pool_maxsize: int = 10,
+        pool_block: bool = False,
+        keep_alive: bool = True,
+        timeout: float = 30,
+        session: requests.Session = None,
+    ):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        self.session = session if session is not None else requests.Session()
+        self.hosts = {}
+
+        if not keep_alive:
+            self.session.headers["Connection"] = "close"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @staticmethod
+    def host_of(url: str) -> str:
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}/"
+
+    def register(self, url: str) -> HTTPAdapter:
+        host = self.host_of(url)
+        if host not in self.hosts:
+            adapter = HTTPAdapter(
+                pool_connections=self.pool_connections,
+                pool_maxsize=self.pool_maxsize,
+                pool_block=self.pool_block,
+                max_retries=0,
+            )
+            self.session.mount(host, adapter)
+            self.hosts[host] = adapter
+
+        return self.hosts[host]
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        self.session.close()
@@ -1,63 +1,381 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
+import io
+import sys
 from enum import Enum, EnumMeta
+from functools import lru_cache
 import json
-from typing import List
+from typing import List, Callable, Iterable
 from datetime import datetime
 from datetime import date
 from . import enums as en
+from .codec import Codec, get_codec
+
+
+def _enum_converter(typ: EnumMeta) -> Callable:
+    members = typ._value2member_map_
+
+    def convert(value):
+        try:
+            return members[value]
+        except (KeyError, TypeError):
+            return typ(value)
+
+    return convert
+
+
+@lru_cache(maxsize=8192)
+def parse_datetime(value: str):
+    """
+    Parse an ISO 8601 timestamp, including a trailing Z. Values that are not
+    valid timestamps are returned unchanged. Results are memoized, since bulk
+    payloads repeat the same dates many times.
+    """
+    try:
+        if value.endswith("Z"):
+            return datetime.fromisoformat(value[:-1] + "+00:00")
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return value
+
+
+@lru_cache(maxsize=8192)
+def parse_date(value: str):
+    """
+    Parse an ISO 8601 date. Timestamps are parsed as datetimes (a date
+    subclass), so no time of day is lost.
+    """
+    if len(value) != 10:
+        return parse_datetime(value)
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        return value
+
+
+def _date_converter(parse: Callable) -> Callable:
+    def convert(value):
+        return parse(value) if value.__class__ is str else value
+
+    return convert
+
+
+def _converter(typ) -> Callable:
+    """
+    Returns the function converting a raw JSON value to the given nested type,
+    or None if the value is used as is.
+    """
+    if isinstance(typ, type) and issubclass(typ, Pax8Resource):
+        return typ.objectify
+    if isinstance(typ, EnumMeta):
+        return _enum_converter(typ)
+    if typ is datetime:
+        return _date_converter(parse_datetime)
+    if typ is date:
+        return _date_converter(parse_date)
+    if getattr(typ, "__origin__", None) in (list, List):
+        item = typ.__args__[0]
+        if isinstance(item, type) and issubclass(item, Pax8Resource):
+            return item.objectify_many
+    return None
+
+
+def _compile_decoder(cls: type) -> Callable:
+    """
+    Build the decoder for a resource class from its NESTED_TYPES and its
+    date and datetime fields, so the type dispatch happens once per class
+    instead of once per record. Strings in the INTERN fields are interned, so
+    repeated values share one object.
+    """
+    types = {
+        field.name: field.type
+        for field in fields(cls)
+        if field.type in (date, datetime)
+    }
+    types.update(cls.NESTED_TYPES)
+    converters = tuple(
+        (key, convert)
+        for key, convert in ((key, _converter(typ)) for key, typ in types.items())
+        if convert is not None
+    )
+    interned = tuple(cls.INTERN)
+    intern = sys.intern
+
+    def decode(jdict):
+        jdict = dict(jdict)
+        get = jdict.get
+        for key, convert in converters:
+            value = get(key)
+            if value is not None:
+                jdict[key] = convert(value)
+        for key in interned:
+            value = get(key)
+            if value.__class__ is str:
+                jdict[key] = intern(value)
+        return cls(**jdict)
+
+    return decode
+
+
+_encode_string = json.encoder.encode_basestring_ascii
+
+
+def _encode_float(value: float) -> str:
+    if value != value:  # pylint: disable=comparison-with-itself
+        return "NaN"
+    if value in (float("inf"), float("-inf")):
+        return "Infinity" if value > 0 else "-Infinity"
+    return float.__repr__(value)
+
+
+def _encode(value, out: list):
+    """
+    Append the JSON encoding of value to out, in the format of json.dumps
+    with sort_keys=True. Resources are walked in place, without building an
+    intermediate dict.
+    """
+    if value is None:
+        out.append("null")
+    elif value is True:
+        out.append("true")
+    elif value is False:
+        out.append("false")
+    elif isinstance(value, str):
+        out.append(_encode_string(value))
+    elif isinstance(value, Pax8Resource):
+        value._encode(out)  # pylint: disable=protected-access
+    elif isinstance(value, Enum):
+        _encode(value.value, out)
+    elif isinstance(value, int):
+        out.append(int.__repr__(value))
+    elif isinstance(value, float):
+        out.append(_encode_float(value))
+    elif isinstance(value, (list, tuple)):
+        out.append("[")
+        for i, item in enumerate(value):
+            if i:
+                out.append(", ")
+            _encode(item, out)
+        out.append("]")
+    elif isinstance(value, date):
+        out.append(_encode_string(value.isoformat()))
+    else:
+        out.append(json.dumps(value, cls=Pax8Resource.JsonEncoder, sort_keys=True))
+
+
+def _plain(value):
+    if isinstance(value, Pax8Resource):
+        return dict(value)
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (list, tuple)):
+        return [_plain(item) for item in value]
+    return value
+
+
+def _write(stream, data: str):
+    if isinstance(stream, io.TextIOBase):
+        stream.write(data)
+    else:
+        stream.write(data.encode("ascii"))
+
+
+def resource(cls: type) -> type:
+    """
+    Class decorator turning a resource into a dataclass with __slots__, so
+    instances carry no __dict__. Works like dataclass(slots=True), but also on
+    older Python versions and with zero-argument super() in methods.
+    """
+    cls = dataclass(cls)
+    inherited = {
+        name for base in cls.__mro__[1:] for name in getattr(base, "__slots__", ())
+    }
+    names = tuple(f.name for f in fields(cls) if f.name not in inherited)
+
+    namespace = dict(cls.__dict__)
+    for name in names + ("__dict__", "__weakref__"):
+        namespace.pop(name, None)
+    namespace["__slots__"] = names
+
+    slotted = type(cls)(cls.__name__, cls.__bases__, namespace)
+    slotted.__qualname__ = cls.__qualname__
+
+    # Point the __class__ cell used by zero-argument super() at the new class
+    for member in namespace.values():
+        func = getattr(member, "__func__", member)
+        for cell in getattr(func, "__closure__", None) or ():
+            if cell.cell_contents is cls:
+                cell.cell_contents = slotted
+
+    return slotted
 
 
 @dataclass
 class Pax8Resource:
+    __slots__ = ()
     IGNORE_EMPTY = []
     NESTED_TYPES = {}
+    INTERN = []
     RESOURCE = None
 
     class JsonDecoder(json.JSONDecoder):
         pass
 
     class JsonEncoder(json.JSONEncoder):
-        pass
+        def default(self, o):
+            if isinstance(o, Pax8Resource):
+                return dict(o)
+            if isinstance(o, Enum):
+                return o.value
+            if isinstance(o, date):
+                return o.isoformat()
+            return super().default(o)
 
     @classmethod
-    def objectify(cls, jdict: dict) -> "Pax8Resource":
-        for key, typ in cls.NESTED_TYPES.items():
-            if key in jdict and jdict[key] is not None:
-                if isinstance(typ, type) and issubclass(typ, Pax8Resource):
-                    jdict[key] = typ(**jdict[key])
-                elif isinstance(typ, EnumMeta):
-                    jdict[key] = typ(jdict[key])
-                elif typ.__name__ == "List" and issubclass(
-                    typ.__args__[0], Pax8Resource
-                ):
-                    jdict[key] = [typ.__args__[0](**item) for item in jdict[key]]
+    def decoder(cls) -> Callable:
+        """
+        Returns the decoder turning a JSON dict into an instance of this class,
+        built on first use and cached on the class. The input dict is not
+        modified.
+        """
+        decode = cls.__dict__.get("_decoder")
+        if decode is None:
+            decode = _compile_decoder(cls)
+            cls._decoder = decode
+        return decode
 
-        return cls(**jdict)
+    @classmethod
+    def objectify(cls, jdict: dict) -> "Pax8Resource":
+        return cls.decoder()(jdict)
 
     @classmethod
-    def deserialize(cls, jstr: str) -> "Pax8Resource":
-        jsdata = json.loads(jstr, cls=cls.JsonDecoder)
-        return cls.objectify(jsdata)
+    def objectify_many(cls, items: list) -> list:
+        """
+        Objectify a whole list of JSON dicts, e.g. the content of a page.
+        """
+        if not cls.typed_decoding():
+            objectify = cls.objectify
+            return [objectify(item) for item in items]
 
-    def __iter__(self) -> str:
-        self_dict = self.__dict__
-        for key in getattr(self, "IGNORE_EMPTY", []):
-            if self_dict.get(key, False) is None:
-                del self_dict[key]
+        decode = cls.decoder()
+        return [decode(item) for item in items]
 
-        for key, value in self_dict.items():
-            if isinstance(value, Pax8Resource):
-                self_dict[key] = value.serialize()
-            if isinstance(value, Enum):
-                self_dict[key] = value.value
+    @classmethod
+    def typed_decoding(cls) -> bool:
+        """
+        Whether instances can be decoded directly from their fields, i.e. the
+        class does not override objectify.
+        """
+        return cls.objectify.__func__ is Pax8Resource.objectify.__func__
 
-        yield from self_dict.items()
+    @classmethod
+    def decode(cls, body: bytes, codec: Codec = None, content_only: bool = False):
+        """
+        Decode a response body into an instance, or with content_only the
+        content of a page into a list of instances. Typed codecs decode the
+        body straight into the class, falling back to objectify when the body
+        does not validate against the declared field types.
+        """
+        codec = get_codec(codec)
+        if codec.typed and cls.typed_decoding():
+            try:
+                if content_only:
+                    return codec.decode_content(body, cls)
+                return codec.decode(body, cls)
+            except (TypeError, ValueError):
+                pass
+
+        data = codec.loads(body)
+        if content_only:
+            return cls.objectify_many(data.get("content", []))
+        return cls.objectify(data)
 
-    def serialize(self) -> str:
-        return json.dumps(dict(self), cls=self.JsonEncoder, sort_keys=True)
+    @classmethod
+    def deserialize(cls, jstr: str) -> "Pax8Resource":
+        if cls.JsonDecoder is not Pax8Resource.JsonDecoder:
+            return cls.objectify(json.loads(jstr, cls=cls.JsonDecoder))
+        return cls.objectify(get_codec().loads(jstr))
 
+    @classmethod
+    def encoder(cls) -> tuple:
+        """
+        Returns the serialization plan of this class: (name, key, skip if
+        None) for every field, sorted by name. Built on first use and cached
+        on the class.
+        """
+        plan = cls.__dict__.get("_encoder")
+        if plan is None:
+            plan = tuple(
+                (
+                    field.name,
+                    f"{_encode_string(field.name)}: ",
+                    field.name in cls.IGNORE_EMPTY,
+                )
+                for field in sorted(fields(cls), key=lambda field: field.name)
+            )
+            cls._encoder = plan
+        return plan
+
+    def _encode(self, out: list):
+        append = out.append
+        separator = "{"
+        for name, key, skip_empty in self.encoder():
+            value = getattr(self, name)
+            if value is None and skip_empty:
+                continue
+
+            append(separator)
+            append(key)
+            separator = ", "
+            _encode(value, out)
+
+        append("}" if separator == ", " else "{}")
+
+    def __iter__(self):
+        for name, _, skip_empty in self.encoder():
+            value = getattr(self, name)
+            if value is None and skip_empty:
+                continue
+            yield name, _plain(value)
 
-@dataclass
+    def serialize(self) -> str:
+        out = []
+        self._encode(out)
+        return "".join(out)
+
+    def write(self, stream):
+        """
+        Write the serialized resource to a text or binary stream.
+        """
+        out = []
+        self._encode(out)
+        _write(stream, "".join(out))
+
+    @staticmethod
+    def serialize_many(
+        resources: Iterable["Pax8Resource"], stream=None, flush_every: int = 1000
+    ) -> str:
+        """
+        Serialize resources as newline delimited JSON. With a stream, the lines
+        are written in chunks of flush_every resources and nothing is
+        returned, otherwise the NDJSON string is returned.
+        """
+        out = []
+        for i, item in enumerate(resources, 1):
+            item._encode(out)  # pylint: disable=protected-access
+            out.append("\n")
+            if stream is not None and i % flush_every == 0:
+                _write(stream, "".join(out))
+                out.clear()
+
+        if stream is None:
+            return "".join(out)
+
+        if out:
+            _write(stream, "".join(out))
+        return None
+
+
+@resource
 class Pax8Page(Pax8Resource):
     size: int
     totalElements: int
@@ -65,8 +383,9 @@ class Pax8Page(Pax8Resource):
     number: int
 
 
-@dataclass
+@resource
 class CompanyAddress(Pax8Resource):
+    INTERN = ["city", "country", "stateOrProvince"]
     IGNORE_EMPTY = ["street2", "stateOrProvince"]
     street: str
     city: str
@@ -76,7 +395,7 @@ class CompanyAddress(Pax8Resource):
     stateOrProvince: str = None
 
 
-@dataclass
+@resource
 class Company(Pax8Resource):
     IGNORE_EMPTY = ["id", "externalId", "status"]
     NESTED_TYPES = {"address": CompanyAddress, "status": en.CompanyStatus}
@@ -94,20 +413,20 @@ class Company(Pax8Resource):
     updatedDate: datetime = None # I don't know for sure if this ever returns as none
 
 
-@dataclass
+@resource
 class CompanyMSTenantID(Pax8Resource):
     clientId: str
     tenantId: str
 
 
-@dataclass
+@resource
 class ContactType(Pax8Resource):
     NESTED_TYPES = {"type": en.ContactTypes}
     type: en.ContactTypes
     primary: bool
 
 
-@dataclass
+@resource
 class Contact(Pax8Resource):
     RESOURCE = "contacts"
     NESTED_TYPES = {"types": List[ContactType]}
@@ -123,8 +442,9 @@ class Contact(Pax8Resource):
     createdDate: date = None
 
 
-@dataclass
+@resource
 class Product(Pax8Resource):
+    INTERN = ["vendorName"]
     RESOURCE = "products"
     id: str
     name: str
@@ -134,7 +454,7 @@ class Product(Pax8Resource):
     vendorSku: str
 
 
-@dataclass
+@resource
 class ProvisioningDetail(Pax8Resource):
     IGNORE_EMPTY = ["description", "possibleValues", "partnerShellTemplateId"]
     NESTED_TYPES = {"type": en.ProvisioningDetailTypes}
@@ -147,7 +467,7 @@ class ProvisioningDetail(Pax8Resource):
     partnerShellTemplateId: int = None
 
 
-@dataclass
+@resource
 class CommitmentDependency(Pax8Resource):
     id: str
     term: str
@@ -161,14 +481,14 @@ class CommitmentDependency(Pax8Resource):
     isTransferable: bool
 
 
-@dataclass
+@resource
 class ProductDependency(Pax8Resource):
-    NESTED_TYPES = {"products": Product}
+    NESTED_TYPES = {"products": List[Product]}
     name: str
     products: List[Product]
 
 
-@dataclass
+@resource
 class Dependencies(Pax8Resource):
     RESOURCE = "dependencies"
     NESTED_TYPES = {
@@ -179,9 +499,9 @@ class Dependencies(Pax8Resource):
     commitmentDependencies: List[CommitmentDependency]
 
 
-@dataclass
+@resource
 class ProductRate(Pax8Resource):
-    NESTED_TYPES = {"chargeType", en.ChargeType}
+    NESTED_TYPES = {"chargeType": en.ChargeType}
     partnerBuyRate: float
     suggestedRetailPrice: float
     startQuantityRange: int = None
@@ -189,7 +509,7 @@ class ProductRate(Pax8Resource):
     chargeType: en.ChargeType = None
 
 
-@dataclass
+@resource
 class ProductPricing(Pax8Resource):
     RESOURCE = "pricing"
     NESTED_TYPES = {
@@ -205,13 +525,13 @@ class ProductPricing(Pax8Resource):
     rates: List[ProductRate] = None
 
 
-@dataclass
+@resource
 class ProvisioningSetting(Pax8Resource):
     key: str
     value: List[str]
 
 
-@dataclass
+@resource
 class OrderLineItem(Pax8Resource):
     NESTED_TYPES = {"provisioningDetails": List[ProvisioningDetail]}
     id: str
@@ -227,7 +547,7 @@ class OrderLineItem(Pax8Resource):
     provisioningDetails: List[ProvisioningDetail] = None
 
 
-@dataclass
+@resource
 class Order(Pax8Resource):
     NESTED_TYPES = {"lineItems": List[OrderLineItem], "orderedBy": en.OrderedBy}
     RESOURCE = "orders"
@@ -247,20 +567,21 @@ class Order(Pax8Resource):
     @classmethod
     def objectify(cls, jdict: dict):
         if "orderedBy" in jdict and jdict["orderedBy"] == "Pax8Partner":
-            jdict["orderedBy"] = "Pax8 Partner"
+            jdict = {**jdict, "orderedBy": "Pax8 Partner"}
 
         return super().objectify(jdict)
 
 
-@dataclass
+@resource
 class CommitmentTerm(Pax8Resource):
     id: str
     term: str
     endDate: date
 
 
-@dataclass
+@resource
 class Subscription(Pax8Resource):
+    INTERN = ["companyId", "productId", "currencyCode"]
     RESOURCE = "subscriptions"
     NESTED_TYPES = {
         "status": en.SubscriptionStatus,
@@ -284,15 +605,29 @@ class Subscription(Pax8Resource):
     currencyCode: str = None
     
 
-@dataclass
+@resource
 class SubscriptionHistory(Pax8Resource):
     RESOURCE = "history"
     NESTED_TYPES = {"content": List[Subscription]}
     content: List[Subscription]
 
 
-@dataclass
+@resource
 class InvoiceItem(Pax8Resource):
+    INTERN = [
+        "type",
+        "companyId",
+        "externalId",
+        "companyName",
+        "unitOfMeasure",
+        "term",
+        "sku",
+        "description",
+        "offeredBy",
+        "productId",
+        "productName",
+        "currencyCode",
+    ]
     RESOURCE = "items"
     NESTED_TYPES = {
         "rateType": en.InvoiceItemRateTypes,
@@ -329,8 +664,9 @@ class InvoiceItem(Pax8Resource):
     details: str = None
 
 
-@dataclass
+@resource
 class Invoice(Pax8Resource):
+    INTERN = ["partnerName", "companyId", "externalId"]
     RESOURCE = "invoices"
     NESTED_TYPES = {"status": en.InvoiceStatus}
     id: str
@@ -345,8 +681,16 @@ class Invoice(Pax8Resource):
     externalId: str
 
 
-@dataclass
+@resource
 class UsageSummary(Pax8Resource):
+    INTERN = [
+        "productId",
+        "resourceGroup",
+        "vendorName",
+        "subscriptionId",
+        "companyId",
+        "currencyCode",
+    ]
     RESOURCE = "usage-summaries"
     id: str
     productId: str
@@ -360,8 +704,15 @@ class UsageSummary(Pax8Resource):
     currencyCode: str = None
 
 
-@dataclass
+@resource
 class UsageSummaryLine(Pax8Resource):
+    INTERN = [
+        "usageSummaryId",
+        "usageDate",
+        "productName",
+        "productId",
+        "unitOfMeasure",
+    ]
     RESOURCE = "usage-lines"
     usageSummaryId: str
     usageDate: date
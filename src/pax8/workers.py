@@ -0,0 +1,71 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
+from typing import Callable, Dict, Hashable, Iterable, Iterator
+
+
+def bounded_map(
+    fn: Callable, items: Iterable, workers: int, ordered: bool = True
+) -> Iterator:
+    """
+    Lazily apply fn to every item on a thread pool, with at most `workers`
+    calls in flight at any time. Results are yielded in input order, or as
+    soon as they complete when ordered is False. Exceptions raised by fn are
+    re-raised in the consuming thread.
+    """
+    items = iter(items)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque(pool.submit(fn, item) for item in islice(items, workers))
+        try:
+            while pending:
+                if ordered:
+                    done = [pending.popleft()]
+                else:
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    done = [future for future in pending if future in finished]
+                    for future in done:
+                        pending.remove(future)
+
+                for future in done:
+                    for item in islice(items, 1):
+                        pending.append(pool.submit(fn, item))
+                    yield future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+class BulkResult(dict):
+    """
+    Results of a bulk call by id. Ids whose call raised are left out and
+    their exception is kept in errors instead.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.errors: Dict[Hashable, Exception] = {}
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+
+def bulk_map(fn: Callable, ids: Iterable[Hashable], workers: int = 8) -> BulkResult:
+    """
+    Call fn once for every distinct id, with at most `workers` calls in
+    flight, and collect the results and errors per id.
+    """
+
+    def call(id):
+        try:
+            return id, fn(id), None
+        except Exception as e:  # pylint: disable=broad-except
+            return id, None, e
+
+    result = BulkResult()
+    for id, value, error in bounded_map(call, dict.fromkeys(ids), workers, False):
+        if error is None:
+            result[id] = value
+        else:
+            result.errors[id] = error
+    return result
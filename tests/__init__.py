@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Import pax8 from the source tree, like benchmarks/run.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "src"))
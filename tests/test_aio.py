@@ -0,0 +1,103 @@
+import asyncio
+import unittest
+
+from benchmarks.server import Dataset, MockPax8Server
+from pax8 import AsyncPax8Client
+from pax8 import filters as fi
+from pax8 import types as t
+from pax8.aio import gather
+from pax8.cache import MemoryCache
+
+
+class TestAsyncPax8Client(unittest.IsolatedAsyncioTestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = MockPax8Server(
+            Dataset(companies=45, subscriptions=30, invoices=3, invoice_items=25)
+        ).start()
+        cls.dataset = cls.server.dataset
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    async def asyncSetUp(self):
+        self.client = AsyncPax8Client(
+            "id", "secret", cache_token=False, **self.server.urls
+        )
+
+    async def asyncTearDown(self):
+        await self.client.close()
+
+    def ids(self, records) -> list:
+        return [record["id"] for record in records]
+
+    async def test_list(self):
+        companies = await self.client.Company.list()
+        self.assertTrue(all(isinstance(c, t.Company) for c in companies))
+        self.assertEqual(
+            [c.id for c in companies], self.ids(self.dataset.companies[:10])
+        )
+
+    async def test_iterate(self):
+        companies = [
+            c
+            async for c in self.client.Company.list(
+                fi.CompanyFilter(size=20), iterate=True
+            )
+        ]
+        self.assertEqual([c.id for c in companies], self.ids(self.dataset.companies))
+
+        items = [
+            i async for i in self.client.Invoice.list_items("inv-0000", iterate=True)
+        ]
+        self.assertEqual([i.id for i in items], self.ids(self.dataset.invoice_items))
+
+    async def test_get(self):
+        record = self.dataset.subscriptions[3]
+        subscription = await self.client.Subscription.get(record["id"])
+        self.assertEqual(
+            subscription.serialize(), t.Subscription.objectify(record).serialize()
+        )
+
+    async def test_gather(self):
+        ids = self.ids(self.dataset.companies[:12])
+        companies = await self.client.gather(
+            (self.client.Company.get(id) for id in ids), limit=3
+        )
+        self.assertEqual([c.id for c in companies], ids)
+
+    async def test_gather_limit(self):
+        running = peak = 0
+
+        async def task(i):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return i
+
+        results = await gather((task(i) for i in range(10)), limit=3)
+        self.assertEqual(results, list(range(10)))
+        self.assertEqual(peak, 3)
+
+    async def test_reauthenticate(self):
+        await self.client.Company.list()
+        logins = self.server.logins
+        self.server.fail(401)
+        companies = await self.client.Company.list(fi.CompanyFilter(size=5))
+        self.assertEqual(len(companies), 5)
+        self.assertEqual(self.server.logins, logins + 1)
+
+    async def test_response_cache(self):
+        cache = MemoryCache()
+        async with AsyncPax8Client(
+            "id", "secret", cache_token=False, response_cache=cache, **self.server.urls
+        ) as client:
+            first = await client.Company.list()
+            requests = self.server.requests
+            second = await client.Company.list()
+        self.assertEqual(self.server.requests, requests)
+        self.assertEqual([c.id for c in first], [c.id for c in second])
+        self.assertEqual(cache.hits, 1)
@@ -0,0 +1,202 @@
+import os
+import tempfile
+import time
+import unittest
+
+from benchmarks.server import Dataset, MockPax8Server
+from pax8 import Pax8Client
+from pax8.cache import CacheEntry, DiskCache, MemoryCache, ResponseCache
+from pax8.instrumentation import Instrumentation
+
+
+def entry(body: bytes = b"{}", ttl: float = 60, etag: str = None) -> CacheEntry:
+    return CacheEntry(body=body, expires=time.time() + ttl, etag=etag)
+
+
+class TestResponseCache(unittest.TestCase):
+    def test_key(self):
+        self.assertEqual(
+            ResponseCache.key("u", {"b": 2, "a": 1, "c": None}),
+            ResponseCache.key("u", {"a": 1, "b": 2}),
+        )
+        self.assertEqual(ResponseCache.key("u", {"page": 0}), "u?page=0")
+        self.assertEqual(ResponseCache.key("u", None, "ns"), "ns:u")
+        self.assertNotEqual(
+            ResponseCache.namespace("client-a"), ResponseCache.namespace("client-b")
+        )
+
+    def test_ttl(self):
+        cache = MemoryCache(ttl=0.05, ttls={"products": 0, "companies/{id}": 10})
+        self.assertEqual(cache.ttl_for("companies"), 0.05)
+        self.assertEqual(cache.ttl_for("companies/{id}"), 10)
+        self.assertEqual(cache.ttl_for("products/{id}/pricing"), 0)
+
+        cache.set("k", entry(ttl=0.05))
+        self.assertIsNotNone(cache.get("k"))
+        time.sleep(0.06)
+        self.assertIsNone(cache.get("k"))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_revalidation_counted_once(self):
+        cache = MemoryCache()
+        cache.set("k", entry(ttl=-1, etag='"v1"'))
+        stale = cache.get("k", stale=True)
+        self.assertIsNotNone(stale)
+        self.assertEqual((cache.hits, cache.misses), (0, 0))
+
+        # 304: one revalidation, then a hit
+        cache.revalidated("k", stale, 60)
+        self.assertEqual((cache.hits, cache.misses, cache.revalidations), (0, 0, 1))
+        self.assertIsNotNone(cache.get("k"))
+        self.assertEqual(cache.hits, 1)
+
+        # 200 with a new body: one miss
+        cache.set("k", entry(ttl=-1, etag='"v1"'))
+        cache.get("k", stale=True)
+        cache.missed()
+        self.assertEqual((cache.hits, cache.misses, cache.revalidations), (1, 1, 1))
+
+        # Without stale, or without validators, an expired entry is a miss
+        self.assertIsNone(cache.get("k"))
+        cache.set("j", entry(ttl=-1))
+        self.assertIsNone(cache.get("j", stale=True))
+        self.assertEqual(cache.misses, 3)
+
+    def test_lru_entries(self):
+        cache = MemoryCache(max_entries=2)
+        cache.set("a", entry())
+        cache.set("b", entry())
+        cache.get("a")
+        cache.set("c", entry())
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNotNone(cache.get("c"))
+        self.assertEqual((len(cache), cache.evictions), (2, 1))
+
+    def test_lru_bytes(self):
+        cache = MemoryCache(max_bytes=10)
+        cache.set("a", entry(b"1234"))
+        cache.set("b", entry(b"5678"))
+        cache.set("a", entry(b"12345"))
+        self.assertEqual(cache.size, 9)
+        cache.set("c", entry(b"90"))
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.size, 7)
+        cache.set("d", entry(b"x" * 20))
+        self.assertEqual((len(cache), cache.size), (0, 0))
+
+
+class TestDiskCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_shared(self):
+        first = DiskCache(self.tmp.name)
+        second = DiskCache(self.tmp.name)
+        first.set("k", CacheEntry(b'{"a": 1}', time.time() + 60, '"v1"', "yesterday"))
+        self.assertEqual(
+            second.get("k"),
+            CacheEntry(b'{"a": 1}', first.get("k").expires, '"v1"', "yesterday"),
+        )
+        self.assertEqual((second.hits, first.hits), (1, 1))
+        second.clear()
+        self.assertIsNone(first.get("k"))
+
+    def test_eviction(self):
+        cache = DiskCache(self.tmp.name, max_entries=2)
+        for key in ("a", "b"):
+            cache.set(key, entry())
+            time.sleep(0.01)
+        cache.get("a")
+        time.sleep(0.01)
+        cache.set("c", entry())
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.evictions, 1)
+
+    def test_corrupt(self):
+        cache = DiskCache(self.tmp.name)
+        cache.set("k", entry())
+        with open(cache._path("k"), "wb") as f:  # pylint: disable=protected-access
+            f.write(b"not json")
+        self.assertIsNone(cache.get("k"))
+        self.assertEqual(len(os.listdir(self.tmp.name)), 1)
+
+
+class TestCachedClient(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = MockPax8Server(Dataset(companies=20)).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def client(self, client_id: str, cache: ResponseCache) -> Pax8Client:
+        return Pax8Client(
+            client_id,
+            "secret",
+            cache_token=False,
+            response_cache=cache,
+            **self.server.urls,
+        )
+
+    def test_namespaced(self):
+        cache = MemoryCache()
+        first = self.client("client-a", cache)
+        sent = self.server.requests
+        first.Company.list()
+        self.client("client-b", cache).Company.list()
+        self.assertEqual(self.server.requests - sent, 2)
+
+        self.client("client-a", cache).Company.list()
+        self.assertEqual(self.server.requests - sent, 2)
+        self.assertEqual(cache.stats["entries"], 2)
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+
+class TestConditionalRequests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = MockPax8Server(Dataset(companies=20), etags=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def test_not_modified(self):
+        cache = MemoryCache(ttl=0.05)
+        inst = Instrumentation()
+        client = Pax8Client(
+            "id",
+            "secret",
+            cache_token=False,
+            response_cache=cache,
+            instrumentation=inst,
+            **self.server.urls,
+        )
+        first = client.Company.list()
+        self.assertNotIn("If-None-Match", self.server.headers)
+        key = cache.key(
+            client.conn._url("companies"),  # pylint: disable=protected-access
+            {},
+            client.conn.cache_namespace,
+        )
+        etag = cache.get(key).etag
+        self.assertTrue(etag)
+
+        time.sleep(0.06)
+        sent = self.server.requests
+        second = client.Company.list()
+        self.assertEqual(self.server.requests - sent, 1)
+        self.assertEqual(self.server.headers.get("If-None-Match"), etag)
+        self.assertEqual(inst.snapshot()["companies"]["statuses"], {200: 1, 304: 1})
+        self.assertEqual([c.id for c in second], [c.id for c in first])
+
+        # The 304 refreshed the TTL: the next call is served from the cache
+        self.assertTrue(cache.get(key).fresh())
+        client.Company.list()
+        self.assertEqual(self.server.requests - sent, 1)
+        # Two of the hits are the lookups of this test
+        self.assertEqual((cache.misses, cache.revalidations, cache.hits), (1, 1, 3))
@@ -0,0 +1,202 @@
+import csv
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from click.testing import CliRunner
+
+from benchmarks.server import Dataset, MockPax8Server
+from pax8 import cli
+
+
+def crash_after(sink: type, batches: int):
+    """
+    Patch sink so the export crashes in the write after `batches` batches,
+    once half of its records are already in the output.
+    """
+    write = sink.write
+    calls = []
+
+    def crashing(self, items):
+        calls.append(len(items))
+        if len(calls) > batches:
+            write(self, items[: len(items) // 2])
+            raise RuntimeError("crashed")
+        return write(self, items)
+
+    return mock.patch.object(sink, "write", crashing)
+
+
+class TestExport(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = MockPax8Server(
+            Dataset(
+                companies=45,
+                subscriptions=0,
+                invoices=3,
+                invoice_items=25,
+                usage_summaries=0,
+                usage_lines=0,
+            )
+        ).start()
+        cls.dataset = cls.server.dataset
+        cls.server.update("companies", "co-000002", name="Företag Ö")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+        self.runner = CliRunner()
+        # Parquet parts of one page, so that parts become durable mid-export
+        parts = mock.patch.object(cli.ParquetSink.__init__, "__defaults__", (None, 10))
+        parts.start()
+        self.addCleanup(parts.stop)
+
+    def export(self, *args: str, expected: int = 0):
+        result = self.runner.invoke(
+            cli.main,
+            [
+                "export",
+                *args,
+                "--quiet",
+                "--client-id",
+                "id",
+                "--client-secret",
+                "secret",
+                "--token-cache",
+                os.path.join(self.tmp, "token.json"),
+                "--base-url",
+                self.server.urls["base_url"],
+                "--login-url",
+                self.server.urls["login_url"],
+            ],
+        )
+        if expected == 0 and result.exception is not None:
+            raise result.exception
+        self.assertEqual(result.exit_code, expected, result.output)
+        return result
+
+    def read(self, path: str) -> list:
+        """
+        The exported records of an output, as (id, name) for companies and
+        ids otherwise.
+        """
+        if path.endswith(".csv"):
+            with open(path, newline="", encoding="utf-8") as f:
+                rows = list(csv.DictReader(f))
+        elif path.endswith(".parquet"):
+            rows = cli.pq.read_table(path).to_pylist()
+        else:
+            with open(path, encoding="utf-8") as f:
+                rows = [json.loads(line) for line in f]
+        return [(row["id"], row.get("name")) for row in rows]
+
+    def companies(self, **where) -> list:
+        return [
+            (c["id"], c["name"])
+            for c in self.dataset.companies
+            if all(c[key] == value for key, value in where.items())
+        ]
+
+    def formats(self) -> list:
+        formats = ["ndjson", "csv"]
+        return formats + ["parquet"] if cli.pq is not None else formats
+
+    def test_formats(self):
+        for fmt in self.formats():
+            with self.subTest(fmt):
+                path = os.path.join(self.tmp, f"companies.{fmt}")
+                self.export("companies", "-o", path, "--page-size", "10")
+                self.assertEqual(self.read(path), self.companies())
+                self.assertFalse(os.path.exists(f"{path}.checkpoint"))
+
+        # The format option wins over the extension
+        path = os.path.join(self.tmp, "companies.out")
+        self.export("companies", "-o", path, "-f", "csv")
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual([(row["id"], row["name"]) for row in rows], self.companies())
+
+    def test_filters(self):
+        path = os.path.join(self.tmp, "active.ndjson")
+        self.export("companies", "-o", path, "--filter", "status=Active")
+        self.assertEqual(self.read(path), self.companies(status="Active"))
+
+        path = os.path.join(self.tmp, "items.ndjson")
+        self.export("invoice-items", "-o", path, "--parent", "inv-0000")
+        ids = [id for id, _ in self.read(path)]
+        self.assertEqual(ids, [item["id"] for item in self.dataset.invoice_items])
+
+        result = self.export(
+            "companies", "-o", path, "--filter", "colour=red", expected=2
+        )
+        self.assertIn("--filter", result.output)
+        result = self.export("companies", "-o", path, "--parent", "x", expected=2)
+        self.assertIn("not nested", result.output)
+
+    def test_resume(self):
+        sinks = {"ndjson": cli.NdjsonSink, "csv": cli.CsvSink}
+        if cli.pq is not None:
+            sinks["parquet"] = cli.ParquetSink
+        for fmt, sink in sinks.items():
+            with self.subTest(fmt):
+                path = os.path.join(self.tmp, f"resumed.{fmt}")
+                with crash_after(sink, 2):
+                    result = self.export(
+                        "companies", "-o", path, "--page-size", "10", expected=1
+                    )
+                self.assertIsInstance(result.exception, RuntimeError)
+                self.assertTrue(os.path.exists(f"{path}.checkpoint"))
+
+                self.export("companies", "-o", path, "--page-size", "10")
+                # No duplicates and no gaps
+                self.assertEqual(self.read(path), self.companies())
+                self.assertFalse(os.path.exists(f"{path}.checkpoint"))
+
+    def test_resume_nested(self):
+        path = os.path.join(self.tmp, "items.csv")
+        with crash_after(cli.CsvSink, 1):
+            self.export("invoice-items", "-o", path, "--concurrency", "1", expected=1)
+        self.export("invoice-items", "-o", path, "--concurrency", "1")
+        ids = sorted(id for id, _ in self.read(path))
+        self.assertEqual(ids, sorted(item["id"] for item in self.dataset.invoice_items))
+
+    def test_missing_output(self):
+        for fmt in self.formats():
+            with self.subTest(fmt):
+                path = os.path.join(self.tmp, f"missing.{fmt}")
+                sink = {
+                    "ndjson": cli.NdjsonSink,
+                    "csv": cli.CsvSink,
+                    "parquet": cli.ParquetSink,
+                }[fmt]
+                args = ("companies", "-o", path, "--page-size", "10")
+                with crash_after(sink, 2):
+                    self.export(*args, expected=1)
+                if os.path.isdir(path):
+                    for name in os.listdir(path):
+                        os.remove(os.path.join(path, name))
+                    os.rmdir(path)
+                else:
+                    os.remove(path)
+
+                result = self.export(*args, expected=2)
+                self.assertIn("--restart", result.output)
+                self.export(*args, "--restart")
+                self.assertEqual(self.read(path), self.companies())
+
+    def test_other_checkpoint(self):
+        path = os.path.join(self.tmp, "companies.ndjson")
+        with crash_after(cli.NdjsonSink, 1):
+            self.export("companies", "-o", path, "--page-size", "10", expected=1)
+        result = self.export(
+            "companies", "-o", path, "--filter", "status=Active", expected=2
+        )
+        self.assertIn("--restart", result.output)
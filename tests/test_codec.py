@@ -0,0 +1,133 @@
+import importlib.util
+import json
+import sys
+import unittest
+from unittest import mock
+
+from benchmarks.server import Dataset, MockPax8Server
+from pax8 import Pax8Client
+from pax8 import codec as c
+from pax8 import types as t
+
+DOCUMENT = {
+    "b": [1, 2.5, None, True, {"y": "z", "x": []}],
+    "a": "Ünïcode \"quoted\"",
+    "c": {},
+}
+
+
+def load_codec(*missing: str):
+    """
+    A fresh copy of the codec module, imported as if the missing backends
+    were not installed.
+    """
+    spec = importlib.util.find_spec("pax8.codec")
+    module = importlib.util.module_from_spec(spec)
+    with mock.patch.dict(sys.modules, {name: None for name in missing}):
+        spec.loader.exec_module(module)
+    return module
+
+
+class TestGetCodec(unittest.TestCase):
+    def test_auto(self):
+        order = [name for name, (module, _) in c.BACKENDS.items() if module]
+        self.assertEqual(order[-1], "json")
+        for n, name in enumerate(order):
+            module = load_codec(*order[:n])
+            self.assertEqual(module.get_codec().name, name)
+            # Selected once and reused
+            self.assertIs(module.get_codec(), module.get_codec())
+
+    def test_missing(self):
+        module = load_codec("orjson")
+        self.assertIsNone(module.orjson)
+        with self.assertRaisesRegex(ImportError, "pip install orjson"):
+            module.get_codec("orjson")
+        self.assertIsInstance(module.get_codec("json"), module.JsonCodec)
+
+    def test_by_name(self):
+        for name, (module, backend) in c.BACKENDS.items():
+            if module is not None:
+                self.assertIsInstance(c.get_codec(name), backend)
+        codec = c.JsonCodec()
+        self.assertIs(c.get_codec(codec), codec)
+        with self.assertRaises(ValueError):
+            c.get_codec("yaml")
+
+    def test_round_trip(self):
+        for name, (module, _) in c.BACKENDS.items():
+            if module is None:
+                continue
+            with self.subTest(name):
+                codec = c.get_codec(name)
+                data = codec.dumps(DOCUMENT)
+                self.assertIsInstance(data, bytes)
+                self.assertEqual(codec.loads(data), DOCUMENT)
+                self.assertEqual(codec.loads(data.decode("utf-8")), DOCUMENT)
+                self.assertEqual(json.loads(data), DOCUMENT)
+                # Stable output, with sorted keys
+                self.assertEqual(codec.dumps(DOCUMENT), data)
+                self.assertLess(data.index(b'"a"'), data.index(b'"b"'))
+
+
+@unittest.skipIf(c.msgspec is None, "msgspec is not installed")
+class TestTypedCodec(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = MockPax8Server(
+            Dataset(
+                companies=25,
+                subscriptions=25,
+                invoices=25,
+                invoice_items=0,
+                usage_summaries=0,
+                usage_lines=0,
+            )
+        ).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def test_matches_objectify(self):
+        codec = c.MsgspecCodec(typed=True)
+        for resource in (t.Company, t.Subscription, t.Invoice):
+            with self.subTest(resource.__name__):
+                body = self.server.body(f"/v1/{resource.RESOURCE}?size=25")
+                content = json.loads(body)["content"]
+                self.assertEqual(
+                    codec.decode_content(body, resource),
+                    [resource.objectify(item) for item in content],
+                )
+                self.assertEqual(
+                    codec.decode(json.dumps(content[0]).encode(), resource),
+                    resource.objectify(content[0]),
+                )
+
+    def test_fallback(self):
+        # A numeric quantity does not validate against the str annotation
+        item = {**self.server.dataset.subscriptions[0], "quantity": 5}
+        body = json.dumps(item).encode()
+        codec = c.MsgspecCodec(typed=True)
+        with self.assertRaises(ValueError):
+            codec.decode(body, t.Subscription)
+        self.assertEqual(
+            t.Subscription.decode(body, codec), t.Subscription.objectify(item)
+        )
+
+    def test_client(self):
+        typed = Pax8Client(
+            "id",
+            "secret",
+            cache_token=False,
+            codec=c.MsgspecCodec(typed=True),
+            **self.server.urls,
+        )
+        plain = Pax8Client(
+            "id", "secret", cache_token=False, codec="json", **self.server.urls
+        )
+        self.assertEqual(typed.Subscription.list(), plain.Subscription.list())
+        self.assertEqual(
+            list(typed.Company.list(iterate=True)),
+            list(plain.Company.list(iterate=True)),
+        )
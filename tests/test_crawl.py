@@ -0,0 +1,179 @@
+import os
+import tempfile
+import unittest
+from typing import List
+
+from benchmarks.server import Dataset, MockPax8Server
+from pax8 import Pax8Client
+from pax8 import enums as en
+from pax8 import filters as fi
+from pax8 import types as t
+from pax8.crawl import Checkpoint
+
+
+class Crash(Exception):
+    pass
+
+
+class ListSink:
+    """
+    Sink keeping the written records in a list, crashing on the write after
+    `crash_after` writes.
+    """
+
+    def __init__(self, items: list, position: int = None, crash_after: int = None):
+        del items[position or 0 :]
+        self.items = items
+        self.crash_after = crash_after
+        self.writes = 0
+        self.closed = False
+
+    @property
+    def position(self) -> int:
+        return len(self.items)
+
+    def write(self, items: List[dict]) -> bool:
+        self.writes += 1
+        if self.crash_after is not None and self.writes > self.crash_after:
+            self.items += items[: len(items) // 2]
+            raise Crash()
+        self.items += items
+        return True
+
+    def close(self):
+        self.closed = True
+
+
+def consume(job, stored: list, crash_at: int = None) -> list:
+    """
+    Store every batch of job before asking for the next, crashing while
+    storing batch number crash_at.
+    """
+    try:
+        for number, batch in enumerate(job):
+            if number == crash_at:
+                raise Crash()
+            stored.append(batch)
+    except Crash:
+        pass
+    return stored
+
+
+class TestCrawlJob(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = MockPax8Server(
+            Dataset(
+                companies=45,
+                subscriptions=0,
+                invoices=45,
+                invoice_items=25,
+                usage_summaries=0,
+                usage_lines=0,
+            )
+        ).start()
+        cls.client = Pax8Client("id", "secret", cache_token=False, **cls.server.urls)
+        cls.dataset = cls.server.dataset
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.client.conn.close()
+        cls.server.stop()
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.checkpoint = os.path.join(tmp.name, "crawl.checkpoint")
+
+    def ids(self, records) -> list:
+        return [record["id"] for record in records]
+
+    def test_flat(self):
+        def job():
+            return self.client.Company.crawl(self.checkpoint, page_size=10)
+
+        stored = consume(job(), [], crash_at=2)
+        self.assertEqual([batch.page for batch in stored], [0, 1])
+        self.assertEqual(Checkpoint(self.checkpoint).load()["page"], 2)
+
+        consume(job(), stored)
+        self.assertEqual([batch.page for batch in stored], [0, 1, 2, 3, 4])
+        records = [item for batch in stored for item in batch.items]
+        # No duplicates and no gaps
+        self.assertEqual(self.ids(records), self.ids(self.dataset.companies))
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_nested(self):
+        def job():
+            return self.client.Invoice.crawl(
+                self.checkpoint, nested=t.InvoiceItem, page_size=10, concurrency=3
+            )
+
+        # Interrupted on the second page of invoices
+        stored = consume(job(), [], crash_at=13)
+        state = Checkpoint(self.checkpoint).load()
+        self.assertEqual(state["page"], 1)
+        self.assertEqual(len(state["parents"]), 3)
+
+        consume(job(), stored)
+        parents = [batch.parent for batch in stored]
+        self.assertEqual(sorted(parents), sorted(self.ids(self.dataset.invoices)))
+        (items,) = [batch.items for batch in stored if batch.parent == "inv-0000"]
+        self.assertEqual(self.ids(items), self.ids(self.dataset.invoice_items))
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_parents(self):
+        parents = ["inv-0003", "inv-0000", "inv-0007", "inv-0001"]
+
+        def job():
+            return self.client.Invoice.crawl(
+                self.checkpoint,
+                nested=t.InvoiceItem,
+                parents=parents,
+                concurrency=1,
+                page_size=10,
+            )
+
+        stored = consume(job(), [], crash_at=2)
+        consume(job(), stored)
+        self.assertEqual([batch.parent for batch in stored], parents)
+        self.assertEqual(sum(len(batch.items) for batch in stored), 25)
+
+    def test_run(self):
+        records = []
+        job = self.client.Company.crawl(self.checkpoint, page_size=10)
+        with self.assertRaises(Crash):
+            job.run(ListSink(records, job.position, crash_after=3))
+        # The half written page is beyond the checkpoint
+        self.assertEqual(len(records), 35)
+
+        job = self.client.Company.crawl(self.checkpoint, page_size=10)
+        self.assertEqual(job.position, 30)
+        sink = ListSink(records, job.position)
+        self.assertEqual(job.run(sink), 15)
+        self.assertTrue(sink.closed)
+        self.assertEqual(self.ids(records), self.ids(self.dataset.companies))
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_identity(self):
+        active = fi.CompanyFilter(status=en.CompanyStatus.ACTIVE)
+        job = self.client.Company.crawl(self.checkpoint, filter=active, page_size=10)
+        consume(job, [], crash_at=1)
+
+        inactive = fi.CompanyFilter(status=en.CompanyStatus.INACTIVE)
+        for kwargs in (
+            {"filter": inactive, "page_size": 10},
+            {"page_size": 10},
+            {"filter": active, "page_size": 20},
+            {"filter": active, "page_size": 10, "nested": t.Contact},
+        ):
+            with self.subTest(kwargs=kwargs):
+                with self.assertRaisesRegex(ValueError, "belongs to another crawl"):
+                    self.client.Company.crawl(self.checkpoint, **kwargs)
+
+        # The same crawl resumes, and restart starts another one over
+        job = self.client.Company.crawl(self.checkpoint, filter=active, page_size=10)
+        self.assertEqual(job.state["page"], 1)
+        job = self.client.Company.crawl(self.checkpoint, page_size=10, restart=True)
+        self.assertEqual(job.state["page"], 0)
+        self.assertEqual(len(list(job)), 5)
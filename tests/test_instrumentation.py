@@ -0,0 +1,134 @@
+import unittest
+
+from benchmarks.server import Dataset, MockPax8Server
+from pax8 import Pax8Client
+from pax8.instrumentation import Histogram, Instrumentation
+from pax8.retry import RetryPolicy
+
+
+class TestHistogram(unittest.TestCase):
+    def test_buckets(self):
+        histogram = Histogram((0.1, 1.0, 10.0))
+        for value in (0.05, 0.1, 0.5, 1.0, 5.0, 50.0):
+            histogram.observe(value)
+        # A value on a bound falls in that bound's bucket
+        self.assertEqual(histogram.counts, [2, 2, 1, 1])
+        self.assertEqual(histogram.count, 6)
+        self.assertAlmostEqual(histogram.sum, 56.65)
+        self.assertEqual(
+            histogram.as_dict()["buckets"],
+            {0.1: 2, 1.0: 2, 10.0: 1, float("inf"): 1},
+        )
+
+    def test_quantile(self):
+        histogram = Histogram((0.1, 1.0, 10.0))
+        self.assertEqual(histogram.quantile(0.5), float("inf"))
+        for value in (0.05, 0.05, 0.5, 5.0):
+            histogram.observe(value)
+        self.assertEqual(histogram.quantile(0.5), 0.1)
+        self.assertEqual(histogram.quantile(0.75), 1.0)
+        self.assertEqual(histogram.quantile(1), 10.0)
+        histogram.observe(50.0)
+        self.assertEqual(histogram.quantile(1), float("inf"))
+
+
+class TestInstrumentation(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = MockPax8Server(
+            Dataset(
+                companies=20,
+                subscriptions=0,
+                invoices=0,
+                invoice_items=0,
+                usage_summaries=0,
+                usage_lines=0,
+            )
+        ).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.metrics = Instrumentation()
+        self.client = Pax8Client(
+            "id",
+            "secret",
+            cache_token=False,
+            instrumentation=self.metrics,
+            retry_policy=RetryPolicy(backoff=0.001),
+            **self.server.urls,
+        )
+
+    def test_snapshot(self):
+        companies = self.client.Company.list()
+        self.client.Company.get(companies[0].id)
+        snapshot = self.metrics.snapshot()
+        self.assertEqual(list(snapshot), ["companies", "companies/{id}"])
+
+        listed = snapshot["companies"]
+        self.assertEqual(listed["requests"], 1)
+        self.assertEqual(listed["statuses"], {200: 1})
+        self.assertEqual((listed["errors"], listed["retries"]), (0, 0))
+        self.assertGreater(listed["bytes"], 0)
+        for phase in ("network", "objectify"):
+            self.assertEqual(listed["timings"][phase]["count"], 1)
+        self.assertEqual(sum(listed["timings"]["network"]["buckets"].values()), 1)
+
+        self.metrics.reset()
+        self.assertEqual(self.metrics.snapshot(), {})
+
+    def test_retries_and_reauthentication(self):
+        self.server.fail(401)
+        self.client.Company.list()
+        self.server.fail(503)
+        self.client.Company.list()
+
+        listed = self.metrics.snapshot()["companies"]
+        self.assertEqual(listed["requests"], 4)
+        self.assertEqual(listed["statuses"], {200: 2, 401: 1, 503: 1})
+        # The token renewal is not a retry
+        self.assertEqual((listed["retries"], listed["reauthentications"]), (1, 1))
+
+    def test_hooks(self):
+        events = []
+        self.metrics.before(lambda event: events.append(("before", event.attempt)))
+        self.metrics.after(lambda event: events.append(("after", event.status)))
+        self.server.fail(503)
+        self.client.Company.list()
+        self.assertEqual(
+            events, [("before", 0), ("after", 503), ("before", 1), ("after", 200)]
+        )
+
+    def test_prometheus(self):
+        metrics = Instrumentation(buckets=(0.1, 1.0))
+        metrics.timing("companies", "decode", 0.05)
+        metrics.timing("companies", "decode", 0.5)
+        metrics.timing("companies", "decode", 5.0)
+        metrics.cache("companies", "hit")
+        metrics.reauthenticated("companies")
+        lines = metrics.prometheus(prefix="p8").splitlines()
+        bucket = 'p8_duration_seconds_bucket{endpoint="companies",phase="decode"'
+
+        for line in (
+            "# TYPE p8_requests_total counter",
+            'p8_requests_total{endpoint="companies"} 0',
+            'p8_reauthentications_total{endpoint="companies"} 1',
+            'p8_cache_total{endpoint="companies",outcome="hit"} 1',
+            "# TYPE p8_duration_seconds histogram",
+            f'{bucket},le="0.1"}} 1',
+            f'{bucket},le="1.0"}} 2',
+            f'{bucket},le="+Inf"}} 3',
+            'p8_duration_seconds_sum{endpoint="companies",phase="decode"} 5.55',
+            'p8_duration_seconds_count{endpoint="companies",phase="decode"} 3',
+            'p8_duration_seconds_count{endpoint="companies",phase="network"} 0',
+        ):
+            self.assertIn(line, lines)
+
+        # Every sample line is a metric name, labels and a number
+        for line in lines:
+            if not line.startswith("#"):
+                name, value = line.rsplit(" ", 1)
+                self.assertTrue(name.startswith("p8_"))
+                float(value)
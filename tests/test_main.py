@@ -1,35 +1,96 @@
 import unittest
-import src.pytemplate.main as tpl_main
-
-class TestMain(unittest.TestCase):
-    def setUp(self):
-        self.values = [
-            {
-                "input": ("Hello World!", 3),
-                "expect": "Hello World!Hello World!Hello World!"
-            },
-            {
-                "input": ("Hello World!", 0),
-                "expect": ""
-            },
-            {
-                "input": ("Hello World!", -1),
-                "expect": ""
-            }
-        ]
-
-    def test_main(self):
-        for item in self.values:
-            tester = tpl_main.PythonTemplate(item["input"][0])
-            self.assertEqual(
-                tester.get_x_times(item["input"][1]),
-                item["expect"]
-            )
-            
-    def test_failure(self):
-        with self.assertRaises(TypeError):
-            tester = tpl_main.PythonTemplate(Exception)
-            tester.get_x_times(10)
-            
-if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+
+from benchmarks.server import Dataset, MockPax8Server
+from pax8 import Pax8Client
+from pax8 import filters as fi
+from pax8 import types as t
+
+
+class TestPax8Client(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = MockPax8Server(
+            Dataset(companies=45, subscriptions=30, invoices=3, invoice_items=25)
+        ).start()
+        cls.client = Pax8Client("id", "secret", cache_token=False, **cls.server.urls)
+        cls.dataset = cls.server.dataset
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.client.conn.close()
+        cls.server.stop()
+
+    def ids(self, records) -> list:
+        return [record["id"] for record in records]
+
+    def test_connected(self):
+        self.assertTrue(self.client.conn.is_connected())
+
+    def test_list(self):
+        companies = self.client.Company.list()
+        self.assertTrue(all(isinstance(c, t.Company) for c in companies))
+        self.assertEqual(
+            [c.id for c in companies], self.ids(self.dataset.companies[:10])
+        )
+        companies = self.client.Company.list(fi.CompanyFilter(size=20, page=2))
+        self.assertEqual(
+            [c.id for c in companies], self.ids(self.dataset.companies[40:])
+        )
+
+    def test_iterate(self):
+        companies = self.client.Company.list(fi.CompanyFilter(size=20), iterate=True)
+        self.assertFalse(isinstance(companies, list))
+        self.assertEqual([c.id for c in companies], self.ids(self.dataset.companies))
+
+    def test_parallel(self):
+        expected = self.ids(self.dataset.companies)
+        companies = self.client.Company.list(fi.CompanyFilter(size=7), parallel=4)
+        self.assertEqual([c.id for c in companies], expected)
+        companies = self.client.Company.list(
+            fi.CompanyFilter(size=7), parallel=4, ordered=False
+        )
+        self.assertEqual(sorted(c.id for c in companies), expected)
+
+    def test_get(self):
+        record = self.dataset.subscriptions[3]
+        subscription = self.client.Subscription.get(record["id"])
+        self.assertIsInstance(subscription, t.Subscription)
+        self.assertEqual(
+            subscription.serialize(), t.Subscription.objectify(record).serialize()
+        )
+
+    def test_get_many(self):
+        ids = self.ids(self.dataset.companies[:5]) + ["co-999999"]
+        result = self.client.Company.get_many(ids, concurrency=3)
+        self.assertFalse(result.ok)
+        self.assertEqual(sorted(result), ids[:5])
+        self.assertEqual(list(result.errors), ["co-999999"])
+
+    def test_nested(self):
+        items = self.client.Invoice.list_items(
+            "inv-0000", fi.InvoiceItemFilter(size=10)
+        )
+        self.assertEqual(
+            [i.id for i in items], self.ids(self.dataset.invoice_items[:10])
+        )
+        items = self.client.Invoice.list_items("inv-0000", iterate=True)
+        self.assertEqual([i.id for i in items], self.ids(self.dataset.invoice_items))
+        self.assertEqual(self.client.Invoice.list_items("inv-0001"), [])
+        contacts = self.client.Company.list_contacts("co-000001")
+        self.assertEqual(
+            [c.email for c in contacts], [c["email"] for c in self.dataset.contacts]
+        )
+
+    def test_columnar(self):
+        batch = self.client.Invoice.list_items(
+            "inv-0000", fi.InvoiceItemFilter(size=10), columnar=True
+        )
+        self.assertEqual(len(batch), 25)
+        self.assertEqual(
+            list(batch["quantity"].to_numpy()),
+            [item["quantity"] for item in self.dataset.invoice_items],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
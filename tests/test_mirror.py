@@ -0,0 +1,151 @@
+import dataclasses
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from benchmarks.server import Dataset, MockPax8Server
+from pax8 import Pax8Client
+from pax8 import enums as en
+from pax8 import types as t
+from pax8.mirror import MirrorStore
+from pax8.sync import DeltaSync, SyncEvent
+
+RESOURCES = ("companies", "subscriptions", "invoices")
+
+
+class TestMirrorStore(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        dataset = Dataset(
+            companies=30,
+            subscriptions=80,
+            invoices=15,
+            invoice_items=0,
+            usage_summaries=0,
+            usage_lines=0,
+        )
+        dataset.companies[3]["status"] = "Deleted"
+        cls.server = MockPax8Server(dataset).start()
+        cls.client = Pax8Client("id", "secret", cache_token=False, **cls.server.urls)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.mirror = MirrorStore(":memory:")
+        self.addCleanup(self.mirror.close)
+
+    def rows(self, mirror: MirrorStore, table: str) -> list:
+        return mirror.db.execute(f'SELECT * FROM "{table}" ORDER BY id').fetchall()
+
+    def test_refresh(self):
+        self.mirror.refresh(self.client, RESOURCES, page_size=7, parallel=2)
+        dataset = self.server.dataset
+        self.assertEqual(self.mirror.count(t.Company), 29)
+        self.assertIsNone(self.mirror.get_company("co-000003"))
+        self.assertEqual(self.mirror.count(t.Subscription), 80)
+        self.assertEqual(self.mirror.count(t.Invoice), 15)
+
+        sub = self.mirror.get_subscription(dataset.subscriptions[5]["id"])
+        self.assertIsInstance(sub, t.Subscription)
+        self.assertEqual(sub, self.client.Subscription.get(sub.id))
+
+    def test_staging_swap(self):
+        stray = t.Company.objectify({**self.server.dataset.companies[0], "id": "x"})
+        self.mirror.upsert([stray])
+        self.mirror.refresh(self.client, ["companies"])
+        # The refresh replaced the table, records gone upstream included
+        self.assertIsNone(self.mirror.get_company("x"))
+        self.assertEqual(self.mirror.count(t.Company), 29)
+        before = self.rows(self.mirror, "companies")
+
+        def failing(*args, **kwargs):
+            yield from self.client.Company.list(*args, **kwargs)
+            raise RuntimeError("connection lost")
+
+        client = SimpleNamespace(Company=SimpleNamespace(list=failing))
+        with self.assertRaises(RuntimeError):
+            self.mirror.refresh(client, ["companies"], batch_size=5)
+        self.assertEqual(self.rows(self.mirror, "companies"), before)
+
+        # The next refresh starts from an empty staging table
+        self.mirror.refresh(self.client, ["companies"])
+        self.assertEqual(self.rows(self.mirror, "companies"), before)
+
+    def test_apply(self):
+        company = t.Company.objectify(self.server.dataset.companies[0])
+        created = SyncEvent(en.SyncEventType.CREATED, "companies", company.id, company)
+        self.assertEqual(self.mirror.apply([created]), 1)
+        self.assertEqual(self.mirror.get_company(company.id), company)
+
+        renamed = dataclasses.replace(company, name="Renamed")
+        self.mirror.apply(
+            [SyncEvent(en.SyncEventType.UPDATED, "companies", company.id, renamed)]
+        )
+        self.assertEqual(self.mirror.get_company(company.id).name, "Renamed")
+        self.assertEqual(self.mirror.count(t.Company), 1)
+
+        self.mirror.apply(
+            [SyncEvent(en.SyncEventType.DELETED, "companies", company.id, renamed)]
+        )
+        self.assertIsNone(self.mirror.get_company(company.id))
+
+    def test_refresh_matches_sync(self):
+        refreshed = self.mirror
+        refreshed.refresh(self.client, ["companies", "subscriptions"])
+
+        with tempfile.TemporaryDirectory() as tmp, MirrorStore(":memory:") as synced:
+            sync = DeltaSync(self.client, os.path.join(tmp, "sync.json"))
+            synced.apply(sync.run())
+            for table in ("companies", "subscriptions"):
+                self.assertEqual(self.rows(synced, table), self.rows(refreshed, table))
+
+        cancelled = refreshed.subscriptions(status=en.SubscriptionStatus.CANCELLED)
+        self.assertTrue(cancelled)
+
+    def test_queries(self):
+        self.mirror.refresh(self.client, RESOURCES)
+        dataset = self.server.dataset
+        sub = dataset.subscriptions[0]
+        expected = sorted(
+            s["id"]
+            for s in dataset.subscriptions
+            if s["companyId"] == sub["companyId"] and s["status"] == "Active"
+        )
+        found = self.mirror.subscriptions(
+            companyId=sub["companyId"], status=en.SubscriptionStatus.ACTIVE
+        )
+        self.assertEqual(sorted(s.id for s in found), expected)
+        self.assertEqual(
+            len(self.mirror.subscriptions(productId=sub["productId"])),
+            sum(s["productId"] == sub["productId"] for s in dataset.subscriptions),
+        )
+
+        inactive = self.mirror.companies(status=en.CompanyStatus.INACTIVE)
+        self.assertEqual(
+            sorted(c.id for c in inactive),
+            sorted(c["id"] for c in dataset.companies if c["status"] == "Inactive"),
+        )
+
+        invoice = dataset.invoices[0]
+        self.assertEqual(self.mirror.get_invoice(invoice["id"]).id, invoice["id"])
+        self.assertEqual(
+            len(self.mirror.invoices(companyId=invoice["companyId"])),
+            sum(i["companyId"] == invoice["companyId"] for i in dataset.invoices),
+        )
+
+        product = t.Product(
+            id="prod-1",
+            name="Product",
+            vendorName="Vendor",
+            shortDescription="",
+            sku="SKU",
+            vendorSku="VSKU",
+        )
+        self.mirror.upsert([product])
+        self.assertEqual(self.mirror.get_product("prod-1"), product)
+
+        with self.assertRaises(ValueError):
+            self.mirror.query(t.Company, name="Company 1")
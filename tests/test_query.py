@@ -0,0 +1,116 @@
+import unittest
+
+from benchmarks.server import Dataset, MockPax8Server
+from pax8 import Pax8Client
+from pax8 import enums as en
+from pax8.query import Predicate
+
+
+class TestPredicate(unittest.TestCase):
+    def test_none(self):
+        eq = Predicate(("status",), "eq", None)
+        ne = Predicate(("status",), "ne", None)
+        self.assertTrue(eq.matches({"status": None}))
+        self.assertFalse(eq.matches({"status": "Active"}))
+        self.assertFalse(ne.matches({"status": None}))
+        self.assertTrue(ne.matches({"status": "Active"}))
+        self.assertTrue(Predicate(("status",), "ne", "Active").matches({}))
+        self.assertFalse(Predicate(("status",), "gt", None).matches({}))
+
+    def test_numeric_strings(self):
+        for value in (10, 10.0, "10"):
+            gt = Predicate(("quantity",), "gt", value)
+            self.assertTrue(gt.matches({"quantity": "12"}), value)
+            self.assertTrue(gt.matches({"quantity": 12}), value)
+            self.assertFalse(gt.matches({"quantity": "9"}), value)
+            self.assertFalse(gt.matches({"quantity": 9}), value)
+        # Text stays text for equality
+        self.assertFalse(Predicate(("id",), "eq", "012").matches({"id": "12"}))
+        self.assertTrue(Predicate(("id",), "eq", 12).matches({"id": "12"}))
+
+
+class TestQuery(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = MockPax8Server(Dataset(subscriptions=300)).start()
+        cls.client = Pax8Client("id", "secret", cache_token=False, **cls.server.urls)
+        cls.subscriptions = cls.server.dataset.subscriptions
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.client.conn.close()
+        cls.server.stop()
+
+    def run_query(self, **kwargs) -> tuple:
+        query = self.client.Subscription.query(page_size=50, **kwargs)
+        requests = self.server.requests
+        items = list(query)
+        return query, items, self.server.requests - requests
+
+    def test_pushdown(self):
+        query, items, requests = self.run_query(
+            status="Active", billingTerm__ne="Annual"
+        )
+        expected = {
+            r["id"]
+            for r in self.subscriptions
+            if r["status"] == "Active" and r["billingTerm"] != "Annual"
+        }
+        self.assertEqual({item.id for item in items}, expected)
+        self.assertEqual(query.plan.filters, [{"status": en.SubscriptionStatus.ACTIVE}])
+        active = sum(r["status"] == "Active" for r in self.subscriptions)
+        self.assertEqual(requests, (active + 49) // 50)
+
+    def test_split(self):
+        query, items, requests = self.run_query(
+            billingTerm__in=["Monthly", "Annual"], status="Cancelled"
+        )
+        self.assertEqual(len(query.plan.filters), 2)
+        self.assertEqual(
+            {item.id for item in items},
+            {r["id"] for r in self.subscriptions if r["status"] == "Cancelled"},
+        )
+        self.assertGreaterEqual(requests, 2)
+
+    def test_stop_bound(self):
+        for value in (450, 450.0):
+            query, items, requests = self.run_query(quantity__gt=value)
+            self.assertIsNotNone(query.plan.stop)
+            expected = [r for r in self.subscriptions if int(r["quantity"]) > 450]
+            self.assertEqual(
+                sorted(item.id for item in items), sorted(r["id"] for r in expected)
+            )
+            self.assertEqual(
+                [int(item.quantity) for item in items],
+                sorted((int(r["quantity"]) for r in expected), reverse=True),
+            )
+            # Only the pages up to the first record past the bound
+            self.assertEqual(requests, len(expected) // 50 + 1)
+
+    def test_numeric_string_bound(self):
+        query, items, _ = self.run_query(quantity__gt="450")
+        self.assertIsNone(query.plan.stop)
+        self.assertEqual(
+            sorted(item.id for item in items),
+            sorted(r["id"] for r in self.subscriptions if int(r["quantity"]) > 450),
+        )
+
+    def test_limit(self):
+        _, items, requests = self.run_query(order_by="-price", limit=5)
+        self.assertEqual(
+            [item.price for item in items],
+            sorted((r["price"] for r in self.subscriptions), reverse=True)[:5],
+        )
+        self.assertEqual(requests, 1)
+
+    def test_explain(self):
+        query = self.client.Subscription.query(
+            status="Active", quantity__gt=10, page_size=50
+        )
+        lines = query.explain().splitlines()
+        self.assertIn(
+            "    subscriptions?size=50&sort=quantity&sort_direction=desc"
+            "&status=Active",
+            lines,
+        )
+        self.assertIn("  stop: at the first record without quantity > 10", lines)
@@ -0,0 +1,110 @@
+import time
+import unittest
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.server import Dataset, MockPax8Server
+from pax8 import Pax8Client
+from pax8.exceptions import RateLimitedException
+from pax8.ratelimit import RateLimiter, TokenBucket, parse_retry_after
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_pacing(self):
+        bucket = TokenBucket(rate=100, capacity=2)
+        delays = [bucket.reserve() for _ in range(5)]
+        self.assertEqual(delays[:2], [0.0, 0.0])
+        for n, delay in enumerate(delays[2:], 1):
+            self.assertAlmostEqual(delay, n / 100, delta=0.005)
+
+    def test_penalize_and_reward(self):
+        bucket = TokenBucket(rate=10)
+        bucket.penalize(0.5)
+        self.assertEqual(bucket.rate, 5)
+        self.assertGreater(bucket.reserve(), 0.4)
+        bucket.reward()
+        self.assertAlmostEqual(bucket.rate, 5.1)
+
+
+class TestRetryAfter(unittest.TestCase):
+    def test_seconds(self):
+        self.assertEqual(parse_retry_after("5"), 5)
+        self.assertEqual(parse_retry_after("0.5"), 0.5)
+        self.assertEqual(parse_retry_after("-3"), 0)
+
+    def test_http_date(self):
+        when = datetime.now(timezone.utc) + timedelta(seconds=30)
+        self.assertAlmostEqual(
+            parse_retry_after(format_datetime(when, usegmt=True)), 30, delta=1.5
+        )
+        past = datetime.now(timezone.utc) - timedelta(hours=1)
+        self.assertEqual(parse_retry_after(format_datetime(past, usegmt=True)), 0)
+
+    def test_invalid(self):
+        for value in (None, "", "soon"):
+            self.assertIsNone(parse_retry_after(value))
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_feedback(self):
+        limiter = RateLimiter(rate=10, max_retries=2)
+        url = "https://api.pax8.com/v1/companies"
+        bucket = limiter.bucket(url)
+        self.assertTrue(limiter.feedback(url, 429, "1", attempt=0))
+        self.assertGreater(bucket.reserve(), 0.9)
+        self.assertEqual(bucket.rate, 5)
+
+        # Errors other than 429 neither retry nor restore the rate
+        self.assertFalse(limiter.feedback(url, 503))
+        self.assertFalse(limiter.feedback(url, 500))
+        self.assertEqual(bucket.rate, 5)
+        self.assertFalse(limiter.feedback(url, 200))
+        self.assertGreater(bucket.rate, 5)
+
+        self.assertTrue(limiter.feedback(url, 429, "0", attempt=1))
+        self.assertFalse(limiter.feedback(url, 429, "0", attempt=2))
+
+    def test_buckets_per_host(self):
+        limiter = RateLimiter(rate=10, hosts={"https://app.pax8.com/": (2, 4)})
+        api = limiter.bucket("https://api.pax8.com/v1/companies")
+        self.assertIs(api, limiter.bucket("https://api.pax8.com/v1/invoices?page=2"))
+        app = limiter.bucket("https://app.pax8.com/p8p/api/v3/companies")
+        self.assertIsNot(api, app)
+        self.assertEqual((app.rate, app.capacity), (2, 4))
+        self.assertEqual((api.rate, api.capacity), (10, 10))
+
+        limiter.feedback("https://api.pax8.com/v1/companies", 429, "10")
+        self.assertGreater(api.reserve(), 9)
+        self.assertEqual(app.reserve(), 0)
+
+
+class TestRateLimitedClient(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = MockPax8Server(Dataset(companies=20)).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def client(self, limiter: RateLimiter) -> Pax8Client:
+        return Pax8Client(
+            "id", "secret", cache_token=False, rate_limiter=limiter, **self.server.urls
+        )
+
+    def test_retried(self):
+        client = self.client(RateLimiter(rate=1000, max_retries=2))
+        self.server.fail(429, 2, {"Retry-After": "0.05"})
+        requests = self.server.requests
+        started = time.monotonic()
+        self.assertEqual(len(client.Company.list()), 10)
+        self.assertEqual(self.server.requests - requests, 3)
+        self.assertGreaterEqual(time.monotonic() - started, 0.1)
+
+    def test_retries_exhausted(self):
+        client = self.client(RateLimiter(rate=1000, max_retries=2))
+        self.server.fail(429, 3, {"Retry-After": "0"})
+        requests = self.server.requests
+        with self.assertRaises(RateLimitedException):
+            client.Company.list()
+        self.assertEqual(self.server.requests - requests, 3)
@@ -0,0 +1,193 @@
+import time
+import unittest
+from types import SimpleNamespace
+
+import requests
+
+from benchmarks.server import Dataset, MockPax8Server
+from pax8 import Pax8Client
+from pax8 import filters as fi
+from pax8.base import Attempts
+from pax8.exceptions import UnexpectedResponseException
+from pax8.retry import Deadline, RetryPolicy
+from pax8.tokens import Token
+from pax8.transport import Transport
+
+
+class FlakyTransport(Transport):
+    """
+    Transport raising a connection error on the first `failures` GETs.
+    """
+
+    def __init__(self, failures: int, **kwargs):
+        super().__init__(**kwargs)
+        self.failures = failures
+        self.gets = 0
+        self.timeouts = []
+
+    def get(self, url: str, **kwargs):
+        self.gets += 1
+        self.timeouts.append(kwargs.get("timeout"))
+        if self.gets <= self.failures:
+            raise requests.exceptions.ConnectionError("connection reset")
+        return super().get(url, **kwargs)
+
+
+class TestRetryPolicy(unittest.TestCase):
+    def test_backoff_and_jitter(self):
+        policy = RetryPolicy(backoff=1, multiplier=2, max_backoff=5, jitter=0.5)
+        for attempt, full in enumerate((1, 2, 4, 5, 5)):
+            for _ in range(200):
+                delay = policy.delay(attempt)
+                self.assertGreaterEqual(delay, full * 0.5)
+                self.assertLessEqual(delay, full)
+
+        policy = RetryPolicy(backoff=0.5, multiplier=3, jitter=0)
+        self.assertEqual([policy.delay(n) for n in range(3)], [0.5, 1.5, 4.5])
+
+    def test_retryable(self):
+        policy = RetryPolicy()
+        for status in (502, 503, 504):
+            self.assertTrue(policy.retryable_status(status))
+        for status in (200, 400, 401, 404, 429, 500):
+            self.assertFalse(policy.retryable_status(status))
+        for exc in (
+            requests.exceptions.ReadTimeout(),
+            requests.exceptions.ConnectionError(),
+        ):
+            self.assertTrue(policy.retryable_exception(exc))
+        self.assertFalse(policy.retryable_exception(ValueError()))
+        self.assertFalse(policy.retryable_exception(TimeoutError()))
+
+        policy = RetryPolicy(statuses=[500], exceptions=(ValueError,))
+        self.assertTrue(policy.retryable_status(500))
+        self.assertFalse(policy.retryable_status(503))
+        self.assertTrue(policy.retryable_exception(ValueError()))
+
+    def test_max_attempts(self):
+        policy = RetryPolicy(max_attempts=3, jitter=0)
+        self.assertEqual(policy.next_delay(0), 0.5)
+        self.assertEqual(policy.next_delay(1), 1.0)
+        self.assertIsNone(policy.next_delay(2))
+        self.assertIsNone(RetryPolicy(max_attempts=1).next_delay(0))
+
+    def test_deadline(self):
+        self.assertIsNone(Deadline().remaining())
+        self.assertFalse(Deadline().expired())
+        deadline = Deadline(0.05)
+        self.assertLessEqual(deadline.remaining(), 0.05)
+        self.assertFalse(deadline.expired())
+        policy = RetryPolicy(backoff=1, jitter=0)
+        self.assertIsNone(policy.next_delay(0, deadline))
+        self.assertEqual(policy.next_delay(0, Deadline(2)), 1)
+        time.sleep(0.06)
+        self.assertTrue(deadline.expired())
+        self.assertEqual(deadline.remaining(), 0)
+
+
+class TestAttempts(unittest.TestCase):
+    def attempts(self, deadline: Deadline) -> Attempts:
+        client = SimpleNamespace(
+            retry_policy=RetryPolicy(),
+            instrumentation=None,
+            transport=Transport(timeout=30),
+        )
+        return Attempts(client, "http://pax8/v1/companies", deadline=deadline)
+
+    def test_timeout_capped(self):
+        token = Token("Bearer x", time.time() + 60)
+        kwargs = self.attempts(Deadline(5)).kwargs(token)
+        self.assertLessEqual(kwargs["timeout"], 5)
+        self.assertGreater(kwargs["timeout"], 4)
+        self.assertNotIn("timeout", self.attempts(Deadline()).kwargs(token))
+
+    def test_expired(self):
+        token = Token("Bearer x", time.time() + 60)
+        with self.assertRaises(TimeoutError):
+            self.attempts(Deadline(0)).kwargs(token)
+
+
+class TestRetriedClient(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = MockPax8Server(Dataset(companies=45)).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def client(self, policy: RetryPolicy, **kwargs) -> Pax8Client:
+        return Pax8Client(
+            "id",
+            "secret",
+            cache_token=False,
+            retry_policy=policy,
+            **kwargs,
+            **self.server.urls,
+        )
+
+    def test_retryable_status(self):
+        client = self.client(RetryPolicy(max_attempts=3, backoff=0.001))
+        self.server.fail(503, 2)
+        sent = self.server.requests
+        self.assertEqual(len(client.Company.list()), 10)
+        self.assertEqual(self.server.requests - sent, 3)
+
+    def test_status_not_retried(self):
+        client = self.client(RetryPolicy(max_attempts=3, backoff=0.001))
+        self.server.fail(500)
+        sent = self.server.requests
+        with self.assertRaises(UnexpectedResponseException):
+            client.Company.list()
+        self.assertEqual(self.server.requests - sent, 1)
+
+    def test_max_attempts(self):
+        client = self.client(RetryPolicy(max_attempts=3, backoff=0.001))
+        self.server.fail(503, 3)
+        sent = self.server.requests
+        with self.assertRaises(UnexpectedResponseException):
+            client.Company.list()
+        self.assertEqual(self.server.requests - sent, 3)
+
+    def test_retryable_exception(self):
+        transport = FlakyTransport(2)
+        client = self.client(
+            RetryPolicy(max_attempts=3, backoff=0.001), transport=transport
+        )
+        self.assertEqual(len(client.Company.list()), 10)
+        self.assertEqual(transport.gets, 3)
+
+        transport = FlakyTransport(3)
+        client = self.client(
+            RetryPolicy(max_attempts=3, backoff=0.001), transport=transport
+        )
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            client.Company.list()
+        self.assertEqual(transport.gets, 3)
+
+    def test_deadline_spans_listing(self):
+        transport = FlakyTransport(0)
+        client = self.client(RetryPolicy(deadline=0.5), transport=transport)
+        uri = client.conn._url("companies")  # pylint: disable=protected-access
+        pages = client.conn.paginate(uri, {"size": 10})
+        next(pages)
+        time.sleep(0.2)
+        next(pages)
+        # The second page only had what was left of the budget
+        self.assertLess(transport.timeouts[1], 0.31)
+
+        time.sleep(0.35)
+        sent = self.server.requests
+        with self.assertRaises(TimeoutError):
+            next(pages)
+        self.assertEqual(self.server.requests, sent)
+
+    def test_deadline_per_page(self):
+        client = self.client(RetryPolicy(deadline=0.2, per_page=True))
+        items = client.Company.list(fi.CompanyFilter(size=10), iterate=True)
+        ids = []
+        for item in items:
+            ids.append(item.id)
+            if len(ids) % 10 == 0:
+                time.sleep(0.1)
+        self.assertEqual(len(ids), 45)
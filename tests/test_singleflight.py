@@ -0,0 +1,253 @@
+import asyncio
+import gc
+import threading
+import time
+import traceback
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.server import Dataset, MockPax8Server
+from pax8 import AsyncPax8Client, Pax8Client
+from pax8.exceptions import UnexpectedResponseException
+from pax8.retry import Deadline
+from pax8.singleflight import AsyncSingleFlight, SingleFlight
+
+WAITERS = 8
+
+
+def server() -> MockPax8Server:
+    return MockPax8Server(
+        Dataset(
+            companies=20,
+            subscriptions=0,
+            invoices=0,
+            invoice_items=0,
+            usage_summaries=0,
+            usage_lines=0,
+        ),
+        latency=0.2,
+    ).start()
+
+
+def concurrently(fn, count: int = WAITERS) -> list:
+    """
+    Call fn from count threads released at once, returning the result or
+    exception of each.
+    """
+    barrier = threading.Barrier(count)
+
+    def call():
+        barrier.wait()
+        try:
+            return fn()
+        except Exception as e:  # pylint: disable=broad-except
+            return e
+
+    with ThreadPoolExecutor(count) as pool:
+        return list(pool.map(lambda _: call(), range(count)))
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_shared(self):
+        flight = SingleFlight()
+        calls = []
+
+        def fn():
+            calls.append(1)
+            time.sleep(0.1)
+            return object()
+
+        results = concurrently(lambda: flight.do("k", fn))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len({id(result) for result in results}), 1)
+        self.assertEqual(flight.shared, WAITERS - 1)
+
+        # Once returned, the next call runs again
+        flight.do("k", fn)
+        self.assertEqual(len(calls), 2)
+
+    def test_error(self):
+        flight = SingleFlight()
+
+        def fn():
+            time.sleep(0.1)
+            raise ValueError("failed")
+
+        errors = concurrently(lambda: flight.do("k", fn))
+        self.assertTrue(all(isinstance(e, ValueError) for e in errors))
+        self.assertEqual({str(e) for e in errors}, {"failed"})
+        self.assertEqual(len({id(e) for e in errors}), WAITERS)
+        # Each waiter's traceback has the failing call and its own frames,
+        # one more for the followers re-raising it
+        depths = sorted(len(traceback.extract_tb(e.__traceback__)) for e in errors)
+        self.assertEqual(depths, [depths[0]] + [depths[0] + 1] * (WAITERS - 1))
+
+    def test_timeout(self):
+        flight = SingleFlight()
+        entered, release = threading.Event(), threading.Event()
+
+        def fn():
+            entered.set()
+            release.wait()
+            return "done"
+
+        with ThreadPoolExecutor(1) as pool:
+            leader = pool.submit(flight.do, "k", fn)
+            entered.wait()
+            try:
+                with self.assertRaises(TimeoutError):
+                    flight.do("k", fn, timeout=0.05)
+            finally:
+                release.set()
+            self.assertEqual(leader.result(), "done")
+        self.assertEqual(flight.shared, 1)
+
+
+class TestSingleFlightClient(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = server()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.client = Pax8Client("id", "secret", cache_token=False, **self.server.urls)
+        # pylint: disable=protected-access
+        self.uri = self.client.conn._url("companies")
+
+    def test_one_request(self):
+        sent = self.server.requests
+        bodies = concurrently(lambda: self.client.conn.get_body(self.uri))
+        self.assertEqual(self.server.requests - sent, 1)
+        self.assertEqual(len(set(bodies)), 1)
+        self.assertEqual(self.client.conn.single_flight.shared, WAITERS - 1)
+
+    def test_error(self):
+        self.server.fail(500)
+        sent = self.server.requests
+        errors = concurrently(lambda: self.client.conn.get_body(self.uri))
+        self.assertEqual(self.server.requests - sent, 1)
+        for error in errors:
+            self.assertIsInstance(error, UnexpectedResponseException)
+
+    def test_deadline(self):
+        conn = self.client.conn
+        with ThreadPoolExecutor(1) as pool:
+            leader = pool.submit(conn.get_body, self.uri)
+            time.sleep(0.05)
+            started = time.monotonic()
+            with self.assertRaises(TimeoutError):
+                conn.get_body(self.uri, deadline=Deadline(0.02))
+            # The follower gave up on its own deadline, not the leader's
+            self.assertLess(time.monotonic() - started, 0.1)
+            self.assertEqual(conn.single_flight.shared, 1)
+            self.assertTrue(leader.result())
+
+
+class TestAsyncSingleFlight(unittest.IsolatedAsyncioTestCase):
+    async def test_shared(self):
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def fn():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return object()
+
+        results = await asyncio.gather(*(flight.do("k", fn) for _ in range(WAITERS)))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len({id(result) for result in results}), 1)
+        self.assertEqual(flight.shared, WAITERS - 1)
+
+    async def test_error(self):
+        flight = AsyncSingleFlight()
+
+        async def fn():
+            await asyncio.sleep(0.05)
+            raise ValueError("failed")
+
+        errors = await asyncio.gather(
+            *(flight.do("k", fn) for _ in range(WAITERS)), return_exceptions=True
+        )
+        self.assertTrue(all(isinstance(e, ValueError) for e in errors))
+        self.assertEqual(len({id(e) for e in errors}), WAITERS)
+        depths = {len(traceback.extract_tb(e.__traceback__)) for e in errors}
+        self.assertEqual(len(depths), 1)
+
+    async def test_timeout(self):
+        flight = AsyncSingleFlight()
+
+        async def fn():
+            await asyncio.sleep(0.1)
+            return "done"
+
+        leader = asyncio.ensure_future(flight.do("k", fn))
+        await asyncio.sleep(0)
+        with self.assertRaises(TimeoutError):
+            await flight.do("k", fn, timeout=0.01)
+        self.assertEqual(await leader, "done")
+
+    async def test_all_cancelled(self):
+        loop = asyncio.get_running_loop()
+        unhandled = []
+        loop.set_exception_handler(lambda loop, context: unhandled.append(context))
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def fn():
+            await asyncio.sleep(0.05)
+            calls.append(1)
+            raise ValueError("failed")
+
+        callers = [asyncio.ensure_future(flight.do("k", fn)) for _ in range(3)]
+        await asyncio.sleep(0)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        self.assertTrue(all(caller.cancelled() for caller in callers))
+
+        # The call went on without its callers, and its error was retrieved
+        await asyncio.sleep(0.1)
+        self.assertEqual(calls, [1])
+        del callers, caller
+        gc.collect()
+        self.assertEqual(unhandled, [])
+
+
+class TestAsyncSingleFlightClient(unittest.IsolatedAsyncioTestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = server()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    async def asyncSetUp(self):
+        self.client = AsyncPax8Client(
+            "id", "secret", cache_token=False, **self.server.urls
+        )
+
+    async def asyncTearDown(self):
+        await self.client.close()
+
+    async def test_one_request(self):
+        sent = self.server.requests
+        companies = await asyncio.gather(
+            *(self.client.Company.list() for _ in range(WAITERS))
+        )
+        self.assertEqual(self.server.requests - sent, 1)
+        self.assertTrue(all(c == companies[0] for c in companies))
+
+    async def test_error(self):
+        self.server.fail(500)
+        sent = self.server.requests
+        errors = await asyncio.gather(
+            *(self.client.Company.list() for _ in range(WAITERS)),
+            return_exceptions=True,
+        )
+        self.assertEqual(self.server.requests - sent, 1)
+        for error in errors:
+            self.assertIsInstance(error, UnexpectedResponseException)
@@ -0,0 +1,120 @@
+import json
+import unittest
+
+from benchmarks.server import Dataset, MockPax8Server
+from pax8 import Pax8Client
+from pax8 import types as t
+from pax8.streaming import iter_content
+
+
+def chunked(body: bytes, size: int) -> list:
+    return [body[start : start + size] for start in range(0, len(body), size)]
+
+
+class TestIterContent(unittest.TestCase):
+    def parse(self, body: bytes, size: int) -> tuple:
+        meta = {}
+        items = list(iter_content(chunked(body, size), meta=meta))
+        return items, meta
+
+    def test_chunk_boundaries(self):
+        # Every chunk size splits the numbers and strings somewhere, and
+        # the UTF-8 sequences of the non-ASCII names in the middle
+        data = {
+            "page": {"size": 3, "totalElements": 3, "totalPages": 1, "number": 0},
+            "content": [
+                {"id": "a", "price": 123456.789, "quantity": -10, "rate": 1e-7},
+                {"id": "b", "name": "Götheborg åäö \U0001f600"},
+                {"id": "c", "name": 'escaped "quotes" \\ and \\u', "nested": [1, [2]]},
+            ],
+            "links": [],
+        }
+        for ensure_ascii in (True, False):
+            body = json.dumps(data, ensure_ascii=ensure_ascii).encode("utf-8")
+            for size in range(1, 40):
+                items, meta = self.parse(body, size)
+                self.assertEqual(items, data["content"], size)
+                self.assertEqual(meta, {"page": data["page"], "links": []}, size)
+
+    def test_number_at_end_of_chunk(self):
+        # 12 is a complete number until the next chunk arrives
+        chunks = [b'{"content": [12', b"34, 5", b"6], ", b'"total": 1', b"0}"]
+        meta = {}
+        self.assertEqual(list(iter_content(chunks, meta=meta)), [1234, 56])
+        self.assertEqual(meta, {"total": 10})
+
+    def test_empty_content(self):
+        for body in (
+            b'{"content": [], "page": {"number": 0, "totalPages": 0}}',
+            b'{ "page" : {"number": 0, "totalPages": 0} , "content" : [ ] }',
+        ):
+            items, meta = self.parse(body, 5)
+            self.assertEqual(items, [])
+            self.assertEqual(meta, {"page": {"number": 0, "totalPages": 0}})
+
+        self.assertEqual(self.parse(b"{}", 1), ([], {}))
+        self.assertEqual(self.parse(b'{"page": null}', 3), ([], {"page": None}))
+
+    def test_invalid(self):
+        for body in (b"[]", b'{"content": [1, 2', b'{"content": [1 2]}'):
+            with self.assertRaises(ValueError):
+                self.parse(body, 4)
+
+
+class TestStream(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = MockPax8Server(
+            Dataset(companies=45, invoices=3, invoice_items=25)
+        ).start()
+        cls.client = Pax8Client("id", "secret", cache_token=False, **cls.server.urls)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.client.conn.close()
+        cls.server.stop()
+
+    def test_stream_matches_pages(self):
+        items = list(self.client.Invoice.list_items("inv-0000", iterate=True))
+        streamed = list(self.client.Invoice.list_items("inv-0000", stream=True))
+        self.assertEqual(len(items), 25)
+        self.assertEqual(
+            [item.serialize() for item in streamed],
+            [item.serialize() for item in items],
+        )
+
+    def test_chunk_sizes(self):
+        conn = self.client.conn
+        uri = conn._url("companies")  # pylint: disable=protected-access
+        expected = self.server.dataset.companies[:20]
+        for chunk_size in (1, 2, 3, 7, 64, 1 << 20):
+            meta = {}
+            items = list(
+                conn.stream(
+                    uri, {"size": 20}, paginate=False, meta=meta, chunk_size=chunk_size
+                )
+            )
+            self.assertEqual(items, expected, chunk_size)
+            self.assertEqual(
+                t.Pax8Page.objectify(meta["page"]),
+                t.Pax8Page(size=20, totalElements=45, totalPages=3, number=0),
+            )
+
+    def test_all_pages(self):
+        conn = self.client.conn
+        uri = conn._url("companies")  # pylint: disable=protected-access
+        meta = {}
+        items = list(conn.stream(uri, {"size": 20}, meta=meta, chunk_size=5))
+        self.assertEqual(items, self.server.dataset.companies)
+        self.assertEqual(meta["page"]["number"], 2)
+
+    def test_empty_list(self):
+        self.assertEqual(
+            list(self.client.Invoice.list_items("inv-0001", stream=True)), []
+        )
+
+    def test_parallel_rejected(self):
+        with self.assertRaises(ValueError):
+            self.client.Company.list(stream=True, parallel=4)
+        with self.assertRaises(ValueError):
+            self.client.Invoice.list_items("inv-0000", stream=True, parallel=2)
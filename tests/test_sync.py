@@ -0,0 +1,92 @@
+import os
+import tempfile
+import unittest
+from collections import Counter
+
+from benchmarks.server import Dataset, MockPax8Server
+from pax8 import Pax8Client
+from pax8 import enums as en
+from pax8.sync import DeltaSync
+
+
+class TestDeltaSync(unittest.TestCase):
+    def setUp(self):
+        self.server = MockPax8Server(
+            Dataset(companies=30, subscriptions=60, invoices=0, usage_summaries=0)
+        ).start()
+        self.addCleanup(self.server.stop)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        client = Pax8Client("id", "secret", cache_token=False, **self.server.urls)
+        self.sync = DeltaSync(
+            client, os.path.join(tmp.name, "sync.json"), page_size=25
+        )
+
+    def events(self, resource: str) -> dict:
+        return {event.id: event.type for event in self.sync.sync(resource)}
+
+    def test_first_run(self):
+        self.server.update("companies", "co-000003", status="Deleted")
+        companies = self.events("companies")
+        subscriptions = self.events("subscriptions")
+
+        # Never delivered, so the deleted company is not an event at all
+        self.assertEqual(len(companies), 29)
+        self.assertNotIn("co-000003", companies)
+        self.assertEqual(set(companies.values()), {en.SyncEventType.CREATED})
+        # Cancelled subscriptions are created like any other
+        self.assertEqual(len(subscriptions), 60)
+        self.assertEqual(set(subscriptions.values()), {en.SyncEventType.CREATED})
+        self.assertIn(
+            "Cancelled", {s["status"] for s in self.server.dataset.subscriptions}
+        )
+
+    def test_second_run(self):
+        self.events("companies")
+        self.events("subscriptions")
+        sent = self.server.requests
+        self.assertEqual(self.events("companies"), {})
+        self.assertEqual(self.events("subscriptions"), {})
+        # Each run stops after the first page, at the watermark
+        self.assertEqual(self.server.requests - sent, 2)
+
+    def test_watermark_tie(self):
+        self.events("subscriptions")
+        newest = max(s["updatedDate"] for s in self.server.dataset.subscriptions)
+        older = next(
+            s for s in self.server.dataset.subscriptions if s["updatedDate"] < newest
+        )
+        self.server.update(
+            "subscriptions", older["id"], updatedDate=newest, status="Cancelled"
+        )
+
+        # Updated on the watermark day: reported, the others of that day are not
+        self.assertEqual(
+            self.events("subscriptions"), {older["id"]: en.SyncEventType.UPDATED}
+        )
+        self.assertEqual(self.events("subscriptions"), {})
+        checkpoint = self.sync.checkpoint("subscriptions")
+        self.assertIn(older["id"], checkpoint["at_watermark"])
+
+    def test_deleted(self):
+        self.events("companies")
+        update = self.server.update
+        update("companies", "co-000001", status="Deleted", updatedDate="2099-01-01")
+        update("companies", "co-000002", status="Inactive", updatedDate="2099-01-02")
+        self.assertEqual(
+            self.events("companies"),
+            {
+                "co-000001": en.SyncEventType.DELETED,
+                "co-000002": en.SyncEventType.UPDATED,
+            },
+        )
+        self.assertNotIn("co-000001", self.sync.checkpoint("companies")["ids"])
+
+        # Once deleted, a later change of the record is not deleted again
+        update("companies", "co-000001", updatedDate="2099-01-03")
+        self.assertEqual(self.events("companies"), {})
+
+    def test_run(self):
+        kinds = Counter(event.resource for event in self.sync.run())
+        self.assertEqual(kinds, {"companies": 30, "subscriptions": 60})
+        self.assertEqual(list(self.sync.run()), [])
@@ -0,0 +1,67 @@
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from pax8.files import read_json
+from pax8.tokens import Token, TokenManager
+
+
+class TestTokenManager(unittest.TestCase):
+    def setUp(self):
+        self.release = threading.Event()
+        self.logins = 0
+
+    def login(self) -> Token:
+        self.logins += 1
+        self.release.wait(5)
+        return Token(f"Bearer {self.logins}", time.time() + 3600)
+
+    def test_refresh_does_not_block(self):
+        tokens = TokenManager(self.login, refresh_margin=300)
+        tokens.token = old = Token("Bearer old", time.time() + 60)
+
+        started = time.monotonic()
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(tokens.get()))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(1)
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(results, [old] * 8)
+
+        self.release.set()
+        for _ in range(100):
+            if tokens.token != old:
+                break
+            time.sleep(0.01)
+        self.assertEqual(tokens.get().token, "Bearer 1")
+        self.assertEqual(self.logins, 1)
+
+    def test_expired_token_waits(self):
+        tokens = TokenManager(self.login, refresh_margin=300)
+        tokens.token = Token("Bearer old", time.time() - 1)
+        self.release.set()
+        self.assertEqual(tokens.get().token, "Bearer 1")
+
+    def test_async_cache_file(self):
+        async def login():
+            return self.login()
+
+        self.release.set()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "token.json")
+            tokens = TokenManager(login_async=login, cache_location=path)
+            token = asyncio.run(tokens.get_async())
+            self.assertEqual(read_json(path)["token"], token.token)
+
+            # Another manager picks up the cached token instead of logging in
+            other = TokenManager(login_async=login, cache_location=path)
+            self.assertEqual(asyncio.run(other.get_async()), token)
+            self.assertEqual(self.logins, 1)
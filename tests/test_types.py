@@ -0,0 +1,163 @@
+import copy
+import dataclasses
+import io
+import json
+import pickle
+import unittest
+from datetime import date, datetime, timezone
+
+from pax8 import enums as en
+from pax8 import types as t
+
+
+@t.resource
+class Named(t.Pax8Resource):
+    id: str
+    name: str = None
+
+    def describe(self) -> str:
+        return f"{type(self).__name__} {self.id}"
+
+
+@t.resource
+class Labelled(Named):
+    label: str = None
+
+    def describe(self) -> str:
+        return f"{super().describe()} ({self.label})"
+
+    @classmethod
+    def fields(cls) -> list:
+        return [f.name for f in dataclasses.fields(cls)]
+
+
+def dumps(resource) -> str:
+    return json.dumps(resource, cls=t.Pax8Resource.JsonEncoder, sort_keys=True)
+
+
+class TestSerialize(unittest.TestCase):
+    def setUp(self):
+        self.company = t.Company.objectify(
+            {
+                "id": "co-1",
+                "name": "Company \"1\" å",
+                "address": {
+                    "street": "Main St 1",
+                    "city": "Stockholm",
+                    "postalCode": "111 22",
+                    "country": "SE",
+                    "street2": None,
+                },
+                "website": "https://example.com",
+                "billOnBehalfOfEnabled": True,
+                "orderApprovalRequired": False,
+                "status": "Active",
+                "updatedDate": "2023-05-01T12:30:00Z",
+            }
+        )
+        self.contact = t.Contact.objectify(
+            {
+                "firstName": "Ada",
+                "lastName": "Lovelace",
+                "email": "ada@example.com",
+                "types": [{"type": "Admin", "primary": True}],
+                "createdDate": "2023-01-02",
+            }
+        )
+
+    def test_matches_json_dumps(self):
+        self.assertIsInstance(self.company.status, en.CompanyStatus)
+        self.assertEqual(
+            self.company.updatedDate,
+            datetime(2023, 5, 1, 12, 30, tzinfo=timezone.utc),
+        )
+        self.assertEqual(self.contact.createdDate, date(2023, 1, 2))
+
+        for resource in (self.company, self.contact, self.company.address):
+            self.assertEqual(resource.serialize(), dumps(resource))
+
+    def test_ignore_empty(self):
+        data = json.loads(self.company.serialize())
+        self.assertNotIn("externalId", data)
+        self.assertNotIn("street2", data["address"])
+        self.assertIsNone(data["phone"])
+
+    def test_floats(self):
+        rate = t.ProductRate(1.5, float("inf"), None, 10)
+        self.assertEqual(rate.serialize(), dumps(rate))
+
+    def test_serialize_twice(self):
+        first = self.company.serialize()
+        self.assertEqual(self.company.serialize(), first)
+        self.assertEqual(t.Company.deserialize(first).serialize(), first)
+
+    def test_serialize_many(self):
+        resources = [self.company, self.contact] * 3
+        expected = "".join(dumps(resource) + "\n" for resource in resources)
+        self.assertEqual(t.Pax8Resource.serialize_many(resources), expected)
+
+        text, binary = io.StringIO(), io.BytesIO()
+        self.assertIsNone(t.Pax8Resource.serialize_many(resources, text, 4))
+        t.Pax8Resource.serialize_many(resources, binary, 4)
+        self.assertEqual(text.getvalue(), expected)
+        self.assertEqual(binary.getvalue().decode("ascii"), expected)
+
+
+class TestResource(unittest.TestCase):
+    def setUp(self):
+        self.company = t.Company.objectify(
+            {
+                "id": "co-1",
+                "name": "Company 1",
+                "address": {
+                    "street": "Main St 1",
+                    "city": "Stockholm",
+                    "postalCode": "111 22",
+                    "country": "SE",
+                },
+                "website": "https://example.com",
+                "billOnBehalfOfEnabled": True,
+                "orderApprovalRequired": False,
+                "status": "Active",
+                "updatedDate": "2023-05-01T12:30:00Z",
+            }
+        )
+        self.labelled = Labelled("id-1", "Name", "Label")
+
+    def test_slots(self):
+        for item in (self.company, self.company.address, self.labelled):
+            self.assertFalse(hasattr(item, "__dict__"))
+            with self.assertRaises(AttributeError):
+                item.unknown = 1
+        self.assertEqual(Labelled.__slots__, ("label",))
+        self.assertEqual(Named.__slots__, ("id", "name"))
+        self.assertEqual(Labelled.__qualname__, "Labelled")
+
+    def test_pickle(self):
+        for item in (self.company, self.labelled):
+            for protocol in range(2, pickle.HIGHEST_PROTOCOL + 1):
+                copied = pickle.loads(pickle.dumps(item, protocol))
+                self.assertEqual(copied, item)
+                self.assertIs(type(copied), type(item))
+
+    def test_copy(self):
+        copied = copy.deepcopy(self.company)
+        self.assertEqual(copied, self.company)
+        self.assertIsNot(copied.address, self.company.address)
+        self.assertEqual(copy.copy(self.labelled), self.labelled)
+
+    def test_replace(self):
+        renamed = dataclasses.replace(self.company, name="Renamed")
+        self.assertEqual(renamed.name, "Renamed")
+        self.assertEqual(renamed.address, self.company.address)
+        self.assertEqual(self.company.name, "Company 1")
+
+        relabelled = dataclasses.replace(self.labelled, label="Other")
+        self.assertIsInstance(relabelled, Labelled)
+        self.assertEqual((relabelled.id, relabelled.label), ("id-1", "Other"))
+
+    def test_super(self):
+        self.assertEqual(self.labelled.describe(), "Labelled id-1 (Label)")
+        self.assertEqual(Named("id-2").describe(), "Named id-2")
+        self.assertEqual(Labelled.fields(), ["id", "name", "label"])
+        self.assertIsInstance(self.labelled, Named)